@@ -19,7 +19,7 @@ for order in sample_orders:
         'customer_name': order.get('customer_name', 'Unknown'),
         'phone': order.get('phone', 'N/A'),
         'order_type': order.get('order_type', 'N/A'),
-        'date_time': order.get('date_time', datetime.now(timezone.utc).isoformat())
+        'date_time': order.get('date_time', datetime.now(timezone.utc))
     })
 
 # Count cash and company orders
@@ -33,7 +33,7 @@ import_history = {
     'filename': 'Kawale_Cranes_23092025.xlsx',
     'imported_by': 'System Admin',
     'imported_by_email': 'admin@kawalecranes.com',
-    'imported_at': datetime.now(timezone.utc).isoformat(),
+    'imported_at': datetime.now(timezone.utc),
     'total_records': total_imported,
     'success_count': total_imported,
     'error_count': 0,
@@ -0,0 +1,173 @@
+"""Compact audit payloads, and documents rebuilt from the audit trail.
+
+Audit entries used to copy whole documents: an update stored the full old
+document next to the patch, and a delete stored the removed document. Now:
+
+    an update stores only the fields it changed, old values in old_data and
+    new values in new_data
+    a delete keeps the removed document as pre_image, zlib-compressed BSON,
+    and leaves old_data empty
+
+document_history() rebuilds a resource's state before and after each of its
+audit entries, walking back from the live document and forward from creates.
+AUDIT_COMPACTION_MIGRATION rewrites entries stored in the old layout.
+"""
+import zlib
+
+import bson
+from bson.codec_options import CodecOptions
+
+AUDIT_COMPACTION_MIGRATION = "audit_compaction"
+
+# Entries that change a resource, in the order history is replayed
+HISTORY_ACTIONS = ("CREATE", "UPDATE", "BULK_UPDATE", "DELETE")
+
+# State that the audit trail cannot recover (history older than the entries kept)
+UNKNOWN = object()
+
+_CODEC_OPTIONS = CodecOptions(tz_aware=True)
+
+
+def field_changes(before, changes):
+    """(old, new) dicts holding only the fields that changes actually alters in before.
+
+    None and "" count as the same value: forms send blank fields that compact
+    storage had omitted.
+    """
+    old, new = {}, {}
+    for field, value in changes.items():
+        previous = before.get(field)
+        if previous != value and not (previous in (None, "") and value in (None, "")):
+            old[field] = previous
+            new[field] = value
+    return old, new
+
+
+def pack_pre_image(doc):
+    return bson.Binary(zlib.compress(bson.encode({key: value for key, value in doc.items() if key != "_id"})))
+
+
+def unpack_pre_image(data):
+    return bson.decode(zlib.decompress(data), codec_options=_CODEC_OPTIONS)
+
+
+def _old_values(entry, resource_id):
+    if entry["action"] == "BULK_UPDATE":
+        return (entry.get("old_data") or {}).get(resource_id, {})
+    return entry.get("old_data") or {}
+
+
+def _new_values(entry):
+    if entry["action"] == "BULK_UPDATE":
+        return (entry.get("new_data") or {}).get("patch", {})
+    return entry.get("new_data") or {}
+
+
+def _state_before(entry, after, resource_id):
+    """Undo one entry, given the state it left behind"""
+    action = entry["action"]
+    if action == "CREATE":
+        return None
+    if action == "DELETE":
+        if entry.get("pre_image") is not None:
+            return unpack_pre_image(entry["pre_image"])
+        # Entries written before pre-images kept a plain copy
+        return entry.get("old_data") or UNKNOWN
+    if not isinstance(after, dict):
+        return UNKNOWN
+    return {**after, **_old_values(entry, resource_id)}
+
+
+def _state_after(entry, before):
+    """Redo one entry, given the state it started from"""
+    action = entry["action"]
+    if action == "CREATE":
+        return entry.get("new_data") or UNKNOWN
+    if action == "DELETE":
+        return None
+    if not isinstance(before, dict):
+        return UNKNOWN
+    return {**before, **_new_values(entry)}
+
+
+def _blank(value):
+    return value in (None, "")
+
+
+def _disagreement(walked_back, replayed):
+    """Fields on which two known states of one moment differ, [] when they agree.
+
+    Only fields present in both are compared: an audit entry need not copy
+    every field of the document.
+    """
+    if walked_back is UNKNOWN or replayed is UNKNOWN:
+        return []
+    if not isinstance(walked_back, dict) or not isinstance(replayed, dict):
+        # One says the document existed and the other that it did not
+        present = walked_back if isinstance(walked_back, dict) else replayed
+        return [] if walked_back is replayed else sorted(present or ())
+    return sorted(
+        field for field in walked_back.keys() & replayed.keys()
+        if walked_back[field] != replayed[field] and not (_blank(walked_back[field]) and _blank(replayed[field]))
+    )
+
+
+def document_history(entries, current, resource_id):
+    """[(before, after, conflicts)] per audit entry of one resource.
+
+    entries are oldest first and current is the live document, or None once it
+    is deleted. A state is a document, None where the resource did not exist,
+    or UNKNOWN where the audit trail does not reach it.
+
+    States are rebuilt twice: walking back from the live document and replaying
+    forward from creates. They only disagree when the document changed without
+    an audit entry; conflicts then maps "before"/"after" to the fields that
+    differ. The walk back wins, except that a create's after is what it stored.
+    """
+    walked_back = [[UNKNOWN, UNKNOWN] for _ in entries]
+    state = current
+    for index in range(len(entries) - 1, -1, -1):
+        if state is None and entries[index]["action"] != "DELETE":
+            # Deleted later without an audit entry: this entry left a document behind
+            state = UNKNOWN
+        walked_back[index][1] = state
+        state = walked_back[index][0] = _state_before(entries[index], state, resource_id)
+
+    history = []
+    previous = UNKNOWN
+    for index, entry in enumerate(entries):
+        replayed_before = previous
+        replayed_after = previous = _state_after(entry, replayed_before)
+        conflicts = {}
+        for side, back, forward in (("before", walked_back[index][0], replayed_before),
+                                    ("after", walked_back[index][1], replayed_after)):
+            fields = _disagreement(back, forward)
+            if fields:
+                conflicts[side] = fields
+        before = walked_back[index][0] if walked_back[index][0] is not UNKNOWN else replayed_before
+        if entry["action"] == "CREATE" and replayed_after is not UNKNOWN:
+            after = replayed_after
+        else:
+            after = walked_back[index][1] if walked_back[index][1] is not UNKNOWN else replayed_after
+        history.append((before, after, conflicts))
+    return history
+
+
+def compact_audit_entry(entry, keep_pre_images=True):
+    """Migration transform: rewrite a full-copy update or delete entry in the compact layout.
+
+    Without keep_pre_images, delete entries keep their plain copy rather than
+    gaining a pre-image.
+    """
+    old_data = entry.get("old_data")
+    # Full copies carry the document id, which no update changes
+    if not isinstance(old_data, dict) or "id" not in old_data:
+        return {}
+    if entry["action"] == "DELETE":
+        if not keep_pre_images:
+            return {}
+        return {"pre_image": pack_pre_image(old_data), "old_data": None}
+    if entry["action"] == "UPDATE":
+        old, new = field_changes(old_data, entry.get("new_data") or {})
+        return {"old_data": old, "new_data": new}
+    return {}
@@ -0,0 +1,137 @@
+"""Batched, asynchronous audit log writes.
+
+log_audit() used to insert each entry inline, so every audited request paid a
+second round trip. AuditWriter queues entries in memory and a background task
+writes them with insert_many once batch_size entries are waiting or flush_ms
+after the first one arrived, whichever comes first. close() writes whatever is
+still queued; it runs on shutdown.
+
+When the queue is full, and before start() or after close(), entries are
+written inline instead, so a burst slows requests down rather than losing
+entries. Entries whose batch still fails after retries, or cannot be written
+at all (e.g. a document BSON cannot encode), are logged and counted as
+dropped; the background task keeps running.
+"""
+import asyncio
+import logging
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_MS = 200
+WRITE_ATTEMPTS = 3
+RETRY_SECONDS = 0.5
+
+DUPLICATE_KEY = 11000
+
+
+class AuditWriter:
+    def __init__(self, get_collection, queue_size=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_ms=DEFAULT_FLUSH_MS):
+        self._get_collection = get_collection
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        self.stats = {"written": 0, "batches": 0, "overflowed": 0, "dropped": 0, "max_queue_depth": 0, "last_error": None}
+        self._queue = None
+        self._task = None
+        self._closing = False
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done() and not self._closing
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._closing = False
+        self._task = asyncio.create_task(self._run(), name="audit_writer")
+
+    async def write(self, docs):
+        """Queue audit documents, writing them inline when the queue cannot take them"""
+        if not self.running:
+            await self._insert(docs)
+            return
+        for index, doc in enumerate(docs):
+            try:
+                self._queue.put_nowait(doc)
+            except asyncio.QueueFull:
+                self.stats["overflowed"] += len(docs) - index
+                await self._insert(docs[index:])
+                break
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self._queue.qsize())
+
+    async def close(self):
+        """Write everything still queued and stop the background task"""
+        if self._task is None:
+            return
+        # Entries logged from here on are written inline
+        self._closing = True
+        if not self._task.done():
+            await self._queue.put(None)
+            await self._task
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            doc = await self._queue.get()
+            if doc is None:
+                return
+            batch = [doc]
+            deadline = loop.time() + self.flush_ms / 1000
+            stopping = False
+            while len(batch) < self.batch_size:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        doc = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    doc = self._queue.get_nowait()
+                if doc is None:
+                    stopping = True
+                    break
+                batch.append(doc)
+            await self._insert(batch)
+            if stopping:
+                return
+
+    async def _insert(self, docs):
+        if not docs:
+            return
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                await self._get_collection().insert_many(docs, ordered=False)
+                self.stats["written"] += len(docs)
+                self.stats["batches"] += 1
+                return
+            except BulkWriteError as e:
+                # Documents a failed attempt did write come back as duplicate _ids on retry
+                failed = [error for error in e.details.get("writeErrors", []) if error.get("code") != DUPLICATE_KEY]
+                self.stats["written"] += len(docs) - len(failed)
+                self.stats["batches"] += 1
+                if failed:
+                    self._dropped(len(failed), e)
+                return
+            except PyMongoError as e:
+                if attempt == WRITE_ATTEMPTS:
+                    self._dropped(len(docs), e)
+                    return
+                await asyncio.sleep(RETRY_SECONDS * attempt)
+            except Exception as e:
+                # Not a database error (e.g. InvalidDocument): retrying cannot help
+                self._dropped(len(docs), e)
+                return
+
+    def _dropped(self, count, error):
+        self.stats["dropped"] += count
+        self.stats["last_error"] = str(error)
+        logging.error(f"Dropped {count} audit log entries: {str(error)}")
@@ -0,0 +1,196 @@
+"""Declared MongoDB indexes and helpers to reconcile them with the database.
+
+INDEX_REGISTRY is the single place that lists the indexes each collection
+needs. ensure_indexes() creates missing ones and rebuilds any whose keys or
+options drifted; it is run as a startup warmup task. index_report() compares
+the registry with what exists and with $indexStats usage counters, for the
+/api/admin/indexes endpoint. Indexes that are not declared are reported but
+never dropped automatically.
+"""
+import logging
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+# Fields behind GET /orders/search, weighted so identifiers outrank free text
+ORDER_TEXT_WEIGHTS = {
+    "cash_vehicle_number": 10,
+    "company_vehicle_number": 10,
+    "case_id_file_number": 10,
+    "unique_id": 8,
+    "customer_name": 5,
+    "cash_driver_name": 5,
+    "company_driver_name": 5,
+    "cash_trip_from": 3,
+    "cash_trip_to": 3,
+    "company_trip_from": 3,
+    "company_trip_to": 3,
+    "company_name": 2,
+    "cash_vehicle_name": 1,
+    "company_vehicle_name": 1,
+}
+
+INDEX_REGISTRY = {
+    "crane_orders": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Default listing order and keyset pagination cursor
+        IndexModel([("date_time", DESCENDING), ("id", DESCENDING)], name="date_time_id"),
+        IndexModel([("order_type", ASCENDING), ("date_time", DESCENDING)], name="order_type_date_time"),
+        IndexModel([("unique_id", ASCENDING)], name="unique_id"),
+        IndexModel([("phone", ASCENDING), ("date_time", DESCENDING)], name="phone_date_time"),
+        # Indexed prefix search on normalized name tokens and phone digits (search_keys.py)
+        IndexModel([("search_name_tokens", ASCENDING), ("date_time", DESCENDING)], name="search_name_tokens"),
+        IndexModel([("search_phone", ASCENDING), ("date_time", DESCENDING)], name="search_phone"),
+        # Vehicle numbers and case IDs are codes, so no stemming or stop words
+        IndexModel(
+            [(field, TEXT) for field in ORDER_TEXT_WEIGHTS],
+            name="order_text_search",
+            weights=ORDER_TEXT_WEIGHTS,
+            default_language="none"
+        ),
+    ],
+    "users": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("role", ASCENDING)], name="role"),
+    ],
+    "audit_logs": [
+        IndexModel([("timestamp", DESCENDING), ("id", DESCENDING)], name="timestamp_id"),
+        IndexModel([("id", ASCENDING)], name="id"),
+        # History of one document, for GET /audit-logs/{id}/document
+        IndexModel([("resource_id", ASCENDING), ("timestamp", ASCENDING)], name="resource_id_timestamp"),
+        IndexModel([("new_data.order_ids", ASCENDING)], name="bulk_update_order_ids", sparse=True),
+    ],
+    "service_rates": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(
+            [("name_of_firm", ASCENDING), ("company_name", ASCENDING), ("service_type", ASCENDING)],
+            name="firm_company_service_unique",
+            unique=True
+        ),
+    ],
+    "driver_salaries": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(
+            [("driver_name", ASCENDING), ("month", ASCENDING), ("year", ASCENDING)],
+            name="driver_month_year_unique",
+            unique=True
+        ),
+        IndexModel([("year", DESCENDING), ("month", DESCENDING)], name="year_month"),
+    ],
+    # Expired refresh tokens, revocations and stream tickets are removed by the TTL monitor
+    "refresh_tokens": [
+        IndexModel([("token_hash", ASCENDING)], name="token_hash_unique", unique=True),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "token_revocations": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "stream_tickets": [
+        IndexModel([("ticket_hash", ASCENDING)], name="ticket_hash_unique", unique=True),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "import_history": [
+        IndexModel([("imported_at", DESCENDING)], name="imported_at"),
+    ],
+}
+
+# Index options that make two indexes with the same keys different
+_COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression", "weights", "default_language")
+
+
+def _spec(index):
+    """Normalise an IndexModel document or list_indexes entry for comparison"""
+    keys = index["key"]
+    items = keys.items() if hasattr(keys, "items") else keys
+    key = []
+    for field, direction in items:
+        if field == "_ftsx":
+            continue
+        if direction == TEXT:
+            # The server stores text fields as _fts/_ftsx plus weights
+            if ("_fts", "text") not in key:
+                key += [("_fts", "text"), ("_ftsx", 1)]
+        else:
+            key.append((field, direction if isinstance(direction, str) else int(direction)))
+    # expireAfterSeconds=0 is a real option; unique/sparse False mean the same as leaving them out
+    spec = {
+        "key": key,
+        **{option: index[option] for option in _COMPARED_OPTIONS if option in index and index[option] is not False}
+    }
+    if "expireAfterSeconds" in spec:
+        spec["expireAfterSeconds"] = int(spec["expireAfterSeconds"])
+    if "weights" in spec:
+        spec["weights"] = {field: int(weight) for field, weight in spec["weights"].items()}
+    return spec
+
+
+async def _existing_indexes(collection):
+    indexes = {}
+    async for index in collection.list_indexes():
+        if index["name"] != "_id_":
+            indexes[index["name"]] = index
+    return indexes
+
+
+async def ensure_indexes(db, registry=INDEX_REGISTRY):
+    """Create missing declared indexes and rebuild drifted ones; returns a per-collection summary"""
+    summary = {}
+    for collection_name, models in registry.items():
+        collection = db[collection_name]
+        existing = await _existing_indexes(collection)
+        result = summary[collection_name] = {"created": [], "rebuilt": [], "failed": {}}
+
+        for model in models:
+            declared = model.document
+            name = declared["name"]
+            current = existing.get(name)
+            if current is not None and _spec(current) == _spec(declared):
+                continue
+            try:
+                if current is not None:
+                    await collection.drop_index(name)
+                await collection.create_indexes([model])
+                result["rebuilt" if current is not None else "created"].append(name)
+            except OperationFailure as e:
+                # Typically duplicate data blocking a unique index; keep serving and report it
+                result["failed"][name] = str(e)
+                logging.error(f"Could not build index {collection_name}.{name}: {str(e)}")
+    return summary
+
+
+async def _index_usage(collection):
+    """Return {index name: {"ops", "since"}} from $indexStats, or {} where unsupported"""
+    usage = {}
+    try:
+        async for stat in collection.aggregate([{"$indexStats": {}}]):
+            accesses = stat.get("accesses", {})
+            usage[stat["name"]] = {"ops": int(accesses.get("ops", 0)), "since": accesses.get("since")}
+    except OperationFailure:
+        pass
+    return usage
+
+
+async def index_report(db, registry=INDEX_REGISTRY):
+    """Compare declared indexes with the database: missing, drifted, extra and unused"""
+    report = {}
+    collection_names = set(registry) | set(await db.list_collection_names())
+    for collection_name in sorted(collection_names):
+        collection = db[collection_name]
+        existing = await _existing_indexes(collection)
+        declared = {model.document["name"]: model.document for model in registry.get(collection_name, [])}
+        usage = await _index_usage(collection)
+
+        report[collection_name] = {
+            "declared": sorted(declared),
+            "missing": sorted(name for name in declared if name not in existing),
+            "drifted": sorted(
+                name for name, index in declared.items()
+                if name in existing and _spec(existing[name]) != _spec(index)
+            ),
+            "extra": sorted(name for name in existing if name not in declared),
+            "unused": sorted(name for name in existing if name in usage and usage[name]["ops"] == 0),
+            "usage": usage,
+        }
+    return report
@@ -0,0 +1,343 @@
+"""Readers and row conversion for the /api/import/excel endpoint.
+
+Everything in this module is plain Python with no database access so that it
+can run either inline on the event loop or inside a process pool worker
+(parallel import mode). xlsx, legacy xls and csv files are all streamed as
+row tuples into the same conversion pipeline.
+"""
+from datetime import datetime, timezone, timedelta
+import codecs
+import csv
+import itertools
+import os
+import uuid
+
+import openpyxl
+import xlrd
+
+from migrations import to_utc_datetime
+from search_keys import with_search_keys
+
+SUPPORTED_IMPORT_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+
+# Enough of the file to detect the encoding and the delimiter
+CSV_SNIFF_BYTES = 64 * 1024
+
+# Header names accepted for the order Date-Time column
+DATE_TIME_COLUMNS = ["Date-Time", "Date Time", "DateTime", "date_time", "Date", "Order Date"]
+
+# Formats seen in exports from other systems, tried after ISO 8601
+DATE_TIME_FORMATS = ['%d-%m-%Y %H:%M:%S', '%d-%m-%Y %H:%M', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d-%m-%Y', '%d/%m/%Y']
+
+
+def safe_str(val, default=""):
+    if val is None or (isinstance(val, str) and val.strip().lower() in ['nan', 'nat', 'none', '']):
+        return default
+    return str(val).strip()
+
+
+def safe_float(val, default=0.0):
+    if val is None or val == '':
+        return default
+    try:
+        # Handle string representations of numbers with currency symbols
+        if isinstance(val, str):
+            val = val.replace('₹', '').replace(',', '').strip()
+        return float(val)
+    except (ValueError, TypeError):
+        return default
+
+
+def excel_serial_to_datetime(serial_number):
+    """Convert Excel serial date number to Python datetime"""
+    try:
+        # Excel's epoch is January 1, 1900 (for Windows)
+        # Note: Excel incorrectly treats 1900 as a leap year, so dates before March 1, 1900 are off by 1 day
+        excel_epoch = datetime(1899, 12, 30)  # Using Dec 30, 1899 to account for Excel's quirk
+        return excel_epoch + timedelta(days=float(serial_number))
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+def parse_date_time_value(date_time_raw):
+    """Parse the raw Date-Time cell, returning None when it is missing or unrecognised"""
+    if isinstance(date_time_raw, datetime):
+        # Already a datetime object from Excel
+        return date_time_raw
+    if isinstance(date_time_raw, (int, float)) and date_time_raw > 0:
+        # Excel serial number (numeric value)
+        return excel_serial_to_datetime(date_time_raw)
+    if isinstance(date_time_raw, str) and date_time_raw.strip():
+        # String format - try to parse
+        value = date_time_raw.strip()
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            pass
+        for fmt in DATE_TIME_FORMATS:
+            try:
+                return datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+    return None
+
+
+def parse_order_date_time(date_time_raw):
+    """Convert the raw Date-Time cell into a UTC datetime (naive cells are UTC), falling back to now"""
+    parsed = parse_date_time_value(date_time_raw)
+    if parsed is None:
+        return datetime.now(timezone.utc)
+    return to_utc_datetime(parsed)
+
+
+def build_header_lookup(headers):
+    """Map lower-cased header names to the original header, first one wins"""
+    lookup = {}
+    for header in headers:
+        if header is not None:
+            lookup.setdefault(str(header).strip().lower(), header)
+    return lookup
+
+
+def convert_row(headers, header_lookup, row):
+    """Convert one sheet row into an order document.
+
+    Returns None for empty rows. Raises on rows that cannot be converted so
+    the caller can record them as failed.
+    """
+    row_data = dict(zip(headers, row))
+
+    # Skip empty rows
+    if not any(row_data.values()):
+        return None
+
+    # Get value from row_data with multiple possible column names (case-insensitive)
+    def get_value(possible_names, default=""):
+        for name in possible_names:
+            # Try exact match first
+            if name in row_data and row_data[name] is not None:
+                return row_data[name]
+            # Try case-insensitive match
+            key = header_lookup.get(name.lower())
+            if key is not None and row_data.get(key) is not None:
+                return row_data[key]
+        return default
+
+    # Determine order type with multiple possible column names
+    order_type_raw = get_value(["Order Type", "order_type", "Type", "OrderType", "Order_Type", "Cash / Company"])
+    order_type = safe_str(order_type_raw, "cash").lower()
+
+    # Normalize order type
+    if 'company' in order_type or order_type in ['comp', 'corporate']:
+        order_type = "company"
+    else:
+        order_type = "cash"
+
+    date_time_raw = get_value(DATE_TIME_COLUMNS)
+
+    # Base order data - required fields
+    order_data = {
+        "id": str(uuid.uuid4()),
+        "added_time": datetime.now(timezone.utc),
+        "unique_id": safe_str(get_value(["Unique ID", "unique_id", "Order ID", "OrderID", "ID"]), f"IMP-{uuid.uuid4().hex[:8]}"),
+        "date_time": parse_order_date_time(date_time_raw),  # Use actual date from Excel
+        "customer_name": safe_str(get_value(["Customer Name", "customer_name", "Customer", "Name"]), "Unknown"),
+        "phone": safe_str(get_value(["Phone", "phone", "Mobile", "Contact"]), ""),
+        "order_type": order_type,
+        "created_by": "system_import"
+    }
+
+    # Add cash-specific fields
+    if order_type == "cash":
+        order_data.update({
+            "cash_trip_from": safe_str(get_value(["Trip From", "cash_trip_from", "From", "TripFrom"])),
+            "cash_trip_to": safe_str(get_value(["Trip To", "cash_trip_to", "To", "TripTo"])),
+            "cash_driver_name": safe_str(get_value(["Driver", "cash_driver_name", "Driver Name", "DriverName", "Cash Driver Details"])),
+            "cash_towing_vehicle": safe_str(get_value(["Towing Vehicle", "cash_towing_vehicle", "Towing", "Vehicle", "Cash Vehicle Details"])),
+            "cash_service_type": safe_str(get_value(["Service Type", "cash_service_type", "Service", "ServiceType", "Cash Service Type"])),
+            "cash_vehicle_name": safe_str(get_value(["Vehicle Name", "cash_vehicle_name", "VehicleName", "Cash Vehicle Name (Make & Model)"])),
+            "cash_vehicle_number": safe_str(get_value(["Vehicle Number", "cash_vehicle_number", "VehicleNumber", "Vehicle No", "Cash Vehicle Number"])),
+            "amount_received": safe_float(get_value(["Amount Received", "amount_received", "Amount", "Cash Amount", "Total Amount"])),
+            "advance_amount": safe_float(get_value(["Advance Amount", "advance_amount", "Advance", "AdvanceAmount", "Received Advance Amount"])),
+            "cash_kms_travelled": safe_float(get_value(["KMs Travelled", "cash_kms_travelled", "KMs", "Distance", "KM", "Cash Kms Travelled"])),
+            "cash_toll": safe_float(get_value(["Toll", "cash_toll", "Toll Amount", "Cash Toll"])),
+            "cash_diesel": safe_float(get_value(["Diesel", "cash_diesel", "Diesel Amount", "Cash Diesel"])),
+            "cash_diesel_refill_location": safe_str(get_value(["Diesel Location", "cash_diesel_refill_location", "Diesel Place", "Cash Diesel Re-fill Location"])),
+        })
+    else:  # company order
+        order_data.update({
+            "company_name": safe_str(get_value(["Company", "company_name", "Company Name", "CompanyName"])),
+            "case_id_file_number": safe_str(get_value(["Case ID", "case_id_file_number", "CaseID", "File Number"])),
+            "company_trip_from": safe_str(get_value(["Trip From", "company_trip_from", "From", "TripFrom"])),
+            "company_trip_to": safe_str(get_value(["Trip To", "company_trip_to", "To", "TripTo"])),
+            "company_driver_name": safe_str(get_value(["Driver", "company_driver_name", "Driver Name", "DriverName", "Company Driver Details"])),
+            "company_towing_vehicle": safe_str(get_value(["Towing Vehicle", "company_towing_vehicle", "Towing", "Vehicle", "Company Vehicle Details"])),
+            "company_service_type": safe_str(get_value(["Service Type", "company_service_type", "Service", "ServiceType", "Company Service Type"])),
+            "company_vehicle_name": safe_str(get_value(["Vehicle Name", "company_vehicle_name", "VehicleName", "Company Vehicle Name (Make & Model)"])),
+            "company_vehicle_number": safe_str(get_value(["Vehicle Number", "company_vehicle_number", "VehicleNumber", "Vehicle No", "Company Vehicle Number"])),
+            "company_kms_travelled": safe_float(get_value(["KMs Travelled", "company_kms_travelled", "KMs", "Distance", "KM", "Company Kms Travelled"])),
+            "company_toll": safe_float(get_value(["Toll", "company_toll", "Toll Amount", "Company Toll"])),
+            "company_diesel": safe_float(get_value(["Diesel", "company_diesel", "Diesel Amount", "Company Diesel"])),
+            "name_of_firm": safe_str(get_value(["Firm", "name_of_firm", "Firm Name"], "Kawale Cranes")),
+        })
+
+    return with_search_keys(order_data)
+
+
+def convert_rows(headers, rows, start_row):
+    """Convert an iterable of rows, returning (orders, errors)"""
+    header_lookup = build_header_lookup(headers)
+    orders = []
+    errors = []
+    for row_idx, row in enumerate(rows, start=start_row):
+        try:
+            order_data = convert_row(headers, header_lookup, row)
+        except Exception as row_error:
+            errors.append(f"Row {row_idx}: {str(row_error)}")
+            continue
+        if order_data is not None:
+            orders.append(order_data)
+    return orders, errors
+
+
+def date_time_problem(headers, header_lookup, row):
+    """Describe why a row's Date-Time would fall back to the current time, or None if it parses"""
+    row_data = dict(zip(headers, row))
+    date_time_raw = None
+    for name in DATE_TIME_COLUMNS:
+        key = name if row_data.get(name) is not None else header_lookup.get(name.lower())
+        if key is not None and row_data.get(key) is not None:
+            date_time_raw = row_data[key]
+            break
+    if date_time_raw is None or (isinstance(date_time_raw, str) and not date_time_raw.strip()):
+        return "Date-Time is missing"
+    if parse_date_time_value(date_time_raw) is None:
+        return f"Unrecognised Date-Time value '{date_time_raw}'"
+    return None
+
+
+def check_rows(headers, rows, start_row):
+    """Convert rows for a dry run, returning [{"row", "order", "errors", "warnings", "date_invalid"}] without dropping bad rows.
+
+    errors are what makes the import reject a row; warnings describe rows it
+    still imports, such as a Date-Time that falls back to the current time.
+    """
+    header_lookup = build_header_lookup(headers)
+    checked = []
+    for row_idx, row in enumerate(rows, start=start_row):
+        try:
+            order_data = convert_row(headers, header_lookup, row)
+        except Exception as row_error:
+            checked.append({"row": row_idx, "order": None, "errors": [str(row_error)], "warnings": [], "date_invalid": False})
+            continue
+        if order_data is None:
+            continue
+        problem = date_time_problem(headers, header_lookup, row)
+        checked.append({
+            "row": row_idx, "order": order_data, "errors": [],
+            "warnings": [problem] if problem else [], "date_invalid": problem is not None
+        })
+    return checked
+
+
+def _sniff_csv_encoding(path):
+    """Pick an encoding for a CSV export: BOM first, then utf-8, then cp1252"""
+    with open(path, 'rb') as f:
+        sample = f.read(CSV_SNIFF_BYTES)
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        sample.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the sample is still utf-8
+        if e.start >= len(sample) - 3:
+            return 'utf-8'
+    try:
+        sample.decode('cp1252')
+        return 'cp1252'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def _iter_csv_rows(path):
+    encoding = _sniff_csv_encoding(path)
+    # The encoding is guessed from the first CSV_SNIFF_BYTES only; a stray byte
+    # further on becomes U+FFFD in its cell instead of failing the whole import
+    with open(path, newline='', encoding=encoding, errors='replace') as f:
+        sample = f.read(CSV_SNIFF_BYTES)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t|')
+        except csv.Error:
+            dialect = csv.excel
+        for row in csv.reader(f, dialect):
+            # Blank cells behave like empty Excel cells
+            yield tuple(value if value.strip() else None for value in row)
+
+
+def _iter_xls_rows(path):
+    book = xlrd.open_workbook(path, on_demand=True)
+    try:
+        sheet = book.sheet_by_index(0)
+        for row_idx in range(sheet.nrows):
+            values = []
+            for cell in sheet.row(row_idx):
+                if cell.ctype == xlrd.XL_CELL_DATE:
+                    values.append(xlrd.xldate_as_datetime(cell.value, book.datemode))
+                elif cell.ctype == xlrd.XL_CELL_NUMBER:
+                    # xlrd reports every number as float; openpyxl keeps integers
+                    values.append(int(cell.value) if cell.value.is_integer() else cell.value)
+                elif cell.ctype == xlrd.XL_CELL_BOOLEAN:
+                    values.append(bool(cell.value))
+                elif cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+                    values.append(None)
+                else:
+                    values.append(cell.value)
+            yield tuple(values)
+    finally:
+        book.release_resources()
+
+
+def _iter_xlsx_rows(path):
+    wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        yield from wb.active.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def iter_sheet_rows(path):
+    """Stream the rows of an xlsx, xls or csv file"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.xlsx':
+        return _iter_xlsx_rows(path)
+    if extension == '.xls':
+        return _iter_xls_rows(path)
+    if extension == '.csv':
+        return _iter_csv_rows(path)
+    raise ValueError(f"Unsupported import file type: {extension}")
+
+
+def _iter_row_batches(rows, batch_size):
+    first_row = 2
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return
+        yield first_row, batch
+        first_row += len(batch)
+
+
+def open_row_batches(path, batch_size):
+    """Return (headers, iterator of (first_row, rows)) reading the file a single time.
+
+    The parent process reads the file once and hands each batch to the pool
+    (convert_rows / check_rows), so workers never re-parse rows before their
+    range; the readers above cannot seek, so that would cost quadratic time.
+    """
+    rows = iter_sheet_rows(path)
+    headers = list(next(rows, ()))
+    return headers, _iter_row_batches(rows, batch_size)
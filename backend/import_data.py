@@ -6,9 +6,10 @@ import sys
 import os
 import re
 from datetime import datetime, timezone
-import json
 import uuid
 
+from kc_client import KawaleCranesClient, KawaleCranesAPIError
+
 class KawaleCranesDataImporter:
     def __init__(self, excel_file_url, api_base_url="https://fleet-command-28.preview.emergentagent.com/api"):
         self.excel_file_url = excel_file_url
@@ -17,28 +18,18 @@ class KawaleCranesDataImporter:
         self.imported_count = 0
         self.failed_count = 0
         self.failed_records = []
+        self.client = KawaleCranesClient(api_base_url)
         
     def authenticate(self, email="admin@kawalecranes.com", password="admin123"):
         """Authenticate with the API to get access token"""
-        login_data = {"email": email, "password": password}
-        
         try:
-            response = requests.post(
-                f"{self.api_base_url}/auth/login",
-                json=login_data,
-                headers={"Content-Type": "application/json"},
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                self.access_token = data.get('access_token')
-                print(f"✅ Authenticated successfully as {data.get('user', {}).get('full_name')}")
-                return True
-            else:
-                print(f"❌ Authentication failed: {response.status_code}")
-                return False
-                
+            data = self.client.login(email, password)
+            self.access_token = data.get('access_token')
+            print(f"✅ Authenticated successfully as {data.get('user', {}).get('full_name')}")
+            return True
+        except KawaleCranesAPIError as e:
+            print(f"❌ Authentication failed: {e.status_code}")
+            return False
         except Exception as e:
             print(f"❌ Authentication error: {str(e)}")
             return False
@@ -244,37 +235,21 @@ class KawaleCranesDataImporter:
             print(f"❌ Error transforming row {index}: {str(e)}")
             return None
     
-    def import_order(self, order_data, index):
-        """Import a single order via API"""
-        try:
-            headers = {
-                'Content-Type': 'application/json',
-                'Authorization': f'Bearer {self.access_token}'
-            }
-            
-            response = requests.post(
-                f"{self.api_base_url}/orders",
-                json=order_data,
-                headers=headers,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                self.imported_count += 1
-                print(f"✅ Imported order {index}: {order_data['customer_name']} ({order_data['order_type']})")
-                return True
-            else:
-                self.failed_count += 1
-                error_data = response.json() if response.headers.get('content-type', '').startswith('application/json') else response.text
-                print(f"❌ Failed to import order {index}: {response.status_code} - {error_data}")
-                self.failed_records.append({'index': index, 'data': order_data, 'error': error_data})
-                return False
-                
-        except Exception as e:
-            self.failed_count += 1
-            print(f"❌ Error importing order {index}: {str(e)}")
-            self.failed_records.append({'index': index, 'data': order_data, 'error': str(e)})
-            return False
+    def import_orders(self, orders, indexes):
+        """Import transformed orders in bulk batches via the API client"""
+        def report_progress(done, total):
+            print(f"📤 Sent {done}/{total} orders")
+        
+        summary = self.client.create_orders(orders, progress_callback=report_progress)
+        self.imported_count += summary['created']
+        self.failed_count += summary['failed']
+        
+        for result in summary['results']:
+            if result['status'] != 'created':
+                index = indexes[result['index']]
+                error = "; ".join(result['errors'])
+                print(f"❌ Failed to import order {index}: {error}")
+                self.failed_records.append({'index': index, 'data': orders[result['index']], 'error': error})
     
     def import_data(self):
         """Main import process"""
@@ -291,7 +266,9 @@ class KawaleCranesDataImporter:
         
         print(f"\n📋 Processing {len(df)} records...")
         
-        # Process each row
+        # Transform every row first, then send them in bulk batches
+        orders = []
+        indexes = []
         for index, row in df.iterrows():
             # Skip empty rows
             if pd.isna(row.get('Customer Name')) and pd.isna(row.get('Phone')) and pd.isna(row.get('Date-Time')):
@@ -300,8 +277,11 @@ class KawaleCranesDataImporter:
             # Transform row to order format
             order_data = self.transform_row_to_order(row, index + 1)
             if order_data:
-                # Import the order
-                self.import_order(order_data, index + 1)
+                orders.append(order_data)
+                indexes.append(index + 1)
+        
+        self.import_orders(orders, indexes)
+        self.client.close()
         
         # Print summary
         print(f"\n📊 Import Summary:")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Small HTTP client for the Kawale Cranes API, used by the ops scripts.
+
+One pooled requests.Session is shared by every call (keep-alive, connection
+retries with backoff), an access token the server answers 401 to is renewed
+through POST /auth/refresh (logging in again only when the refresh token is
+no longer accepted), and order creation is batched onto POST /orders/bulk
+with a bounded number of batches in flight. Against a server without the bulk
+endpoint it falls back to one POST /orders per order on the same pool.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_API_BASE_URL = "https://fleet-command-28.preview.emergentagent.com/api"
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_TIMEOUT = 30
+
+
+class KawaleCranesAPIError(Exception):
+    def __init__(self, status_code, detail):
+        super().__init__(f"{status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+class KawaleCranesClient:
+    def __init__(self, api_base_url=DEFAULT_API_BASE_URL, email=None, password=None,
+                 max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT, retries=3):
+        self.api_base_url = api_base_url.rstrip('/')
+        self.email = email
+        self.password = password
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.access_token = None
+        self.refresh_token = None
+        self.user = None
+        self._login_lock = threading.Lock()
+        self._bulk_supported = True
+
+        # POST is not in urllib3's default allowed_methods, so only connection
+        # failures (request never sent) are retried for order creation
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(max_workers, 1) * 2, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json'})
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def login(self, email=None, password=None):
+        """Authenticate and keep the access token on the session"""
+        if email is not None:
+            self.email, self.password = email, password
+        response = self.session.post(
+            f"{self.api_base_url}/auth/login",
+            json={"email": self.email, "password": self.password},
+            timeout=self.timeout
+        )
+        if response.status_code != 200:
+            raise KawaleCranesAPIError(response.status_code, self._error_detail(response))
+        return self._store_tokens(response.json())
+
+    def _store_tokens(self, data):
+        self.access_token = data.get('access_token')
+        self.refresh_token = data.get('refresh_token')
+        self.user = data.get('user')
+        self.session.headers['Authorization'] = f"Bearer {self.access_token}"
+        return data
+
+    def refresh(self):
+        """Exchange the refresh token for new tokens; False when the server no longer accepts it"""
+        if not self.refresh_token:
+            return False
+        response = self.session.post(
+            f"{self.api_base_url}/auth/refresh",
+            json={"refresh_token": self.refresh_token},
+            timeout=self.timeout
+        )
+        if response.status_code != 200:
+            return False
+        self._store_tokens(response.json())
+        return True
+
+    def _renew(self, stale_token):
+        # Only the first thread that sees the expired token renews it; refresh
+        # tokens are single use, so a second refresh would fail
+        with self._login_lock:
+            if self.access_token == stale_token and not self.refresh() and self.email:
+                self.login()
+
+    @staticmethod
+    def _error_detail(response):
+        if response.headers.get('content-type', '').startswith('application/json'):
+            body = response.json()
+            return body.get('detail', body) if isinstance(body, dict) else body
+        return response.text
+
+    def request(self, method, path, **kwargs):
+        """Send a request, renewing the access token once if it has expired"""
+        kwargs.setdefault('timeout', self.timeout)
+        url = f"{self.api_base_url}{path}"
+        token = self.access_token
+        response = self.session.request(method, url, **kwargs)
+        if response.status_code == 401 and (self.refresh_token or self.email):
+            self._renew(token)
+            response = self.session.request(method, url, **kwargs)
+        return response
+
+    def _json(self, method, path, **kwargs):
+        response = self.request(method, path, **kwargs)
+        if response.status_code >= 400:
+            raise KawaleCranesAPIError(response.status_code, self._error_detail(response))
+        return response.json()
+
+    def get_orders(self, **params):
+        return self._json('GET', '/orders', params=params)
+
+    def get_order(self, order_id):
+        return self._json('GET', f'/orders/{order_id}')
+
+    def create_order(self, order_data):
+        return self._json('POST', '/orders', json=order_data)
+
+    def _create_batch(self, orders, offset):
+        """Create one batch, returning per-item results indexed into the full input"""
+        if self._bulk_supported:
+            response = self.request('POST', '/orders/bulk', json={"orders": orders})
+            if response.status_code in (404, 405):
+                self._bulk_supported = False
+            elif response.status_code == 200:
+                return [{**item, "index": item["index"] + offset} for item in response.json()["results"]]
+            else:
+                detail = self._error_detail(response)
+                return [
+                    {"index": offset + i, "status": "error", "id": None, "errors": [str(detail)]}
+                    for i in range(len(orders))
+                ]
+
+        results = []
+        for i, order_data in enumerate(orders):
+            try:
+                created = self.create_order(order_data)
+                results.append({"index": offset + i, "status": "created", "id": created.get('id'), "errors": []})
+            except Exception as e:
+                results.append({"index": offset + i, "status": "error", "id": None, "errors": [str(e)]})
+        return results
+
+    def create_orders(self, orders, batch_size=DEFAULT_BATCH_SIZE, progress_callback=None):
+        """Create many orders with at most max_workers batches in flight.
+
+        Returns {"created", "failed", "results"} where results holds one
+        entry per input order, in input order.
+        """
+        batches = [(orders[start:start + batch_size], start) for start in range(0, len(orders), batch_size)]
+        results = []
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._create_batch, batch, offset): (batch, offset) for batch, offset in batches}
+            for future in as_completed(futures):
+                try:
+                    batch_results = future.result()
+                except Exception as e:
+                    # e.g. renewing the token failed: the batch fails, the rest carry on
+                    batch, offset = futures[future]
+                    batch_results = [
+                        {"index": offset + i, "status": "error", "id": None, "errors": [str(e)]}
+                        for i in range(len(batch))
+                    ]
+                results.extend(batch_results)
+                done += len(batch_results)
+                if progress_callback:
+                    progress_callback(done, len(orders))
+
+        results.sort(key=lambda item: item["index"])
+        created = sum(1 for item in results if item["status"] == "created")
+        return {"created": created, "failed": len(results) - created, "results": results}
@@ -0,0 +1,200 @@
+"""Resumable background data migrations.
+
+A migration walks one collection in _id order, rewriting the documents its
+selector matches in batches. Each write only applies while the fields it
+rewrites (and any the transform reads) still hold the values they were read
+with; a document changed in between is read again and redone, so a
+concurrent user write is never overwritten. After every batch the last _id
+is checkpointed in db.migrations, so a restart continues where the previous
+run stopped.
+Completed migrations are remembered in-process (completed_migrations) so
+read paths can drop their compatibility branches once the data is clean.
+The date-based report pipelines use $dateTrunc, so check_server_version()
+refuses MongoDB servers older than MINIMUM_SERVER_VERSION at startup.
+"""
+from datetime import datetime, timezone
+import logging
+
+from pymongo import UpdateOne
+
+MIGRATION_BATCH_SIZE = 500
+# Times a batch is re-read and rewritten while users keep changing its documents
+MIGRATION_WRITE_ATTEMPTS = 5
+
+# $dateTrunc (daily summary buckets) needs MongoDB 5.0
+MINIMUM_SERVER_VERSION = (5, 0)
+
+# Names of migrations whose status is "completed" in db.migrations
+completed_migrations = set()
+
+# Datetime fields that used to be stored as ISO strings, per collection
+DATE_FIELDS = {
+    "crane_orders": ["date_time", "added_time", "reach_time", "drop_time", "updated_at", "incentive_added_at"],
+    "audit_logs": ["timestamp"],
+    "users": ["created_at", "last_login"],
+    "driver_salaries": ["added_at", "updated_at"],
+    "import_history": ["imported_at"],
+    "service_rates": ["created_at", "updated_at"],
+}
+
+
+def to_utc_datetime(value):
+    """Parse a stored ISO string into an aware UTC datetime; naive values are UTC. None if unparseable"""
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def date_migration_name(collection_name):
+    return f"bson_dates:{collection_name}"
+
+
+def _string_dates_selector(fields):
+    return {"$or": [{field: {"$type": "string"}} for field in fields]}
+
+
+def _string_dates_to_bson(fields):
+    def transform(doc):
+        changes = {}
+        for field in fields:
+            value = doc.get(field)
+            if isinstance(value, str):
+                if not value.strip():
+                    changes[field] = None
+                    continue
+                parsed = to_utc_datetime(value)
+                # Unparseable text is left as is rather than thrown away
+                if parsed is not None:
+                    changes[field] = parsed
+        return changes
+    return transform
+
+
+def _update_document(changes):
+    # Plain changes are $set; a transform may also return a full update document
+    return changes if all(key.startswith("$") for key in changes) else {"$set": changes}
+
+
+def _snapshot_filter(doc, update, depends_on):
+    """Match doc only while the fields the update rewrites, and depends_on, are unchanged since it was read"""
+    fields = set(depends_on)
+    for key, value in update.items():
+        fields.update(value if key.startswith("$") else [key])
+    query = {"_id": doc["_id"]}
+    for field in {field.split(".")[0] for field in fields}:
+        query[field] = doc[field] if field in doc else {"$exists": False}
+    return query
+
+
+def server_version(build_info):
+    """(major, minor) from a buildInfo reply"""
+    version = build_info.get("versionArray") or [
+        int(part) for part in build_info["version"].split("-")[0].split(".")[:2]
+    ]
+    return tuple(version[:2])
+
+
+async def check_server_version(db, minimum=MINIMUM_SERVER_VERSION):
+    """Raise RuntimeError naming the required version if the MongoDB server is older than minimum"""
+    build_info = await db.command("buildInfo")
+    version = server_version(build_info)
+    if version < minimum:
+        required = ".".join(str(part) for part in minimum)
+        raise RuntimeError(
+            f"MongoDB {build_info.get('version', '.'.join(map(str, version)))} is not supported: "
+            f"MongoDB {required} or newer is required (the order reports use $dateTrunc)"
+        )
+    return version
+
+
+async def load_completed_migrations(db):
+    async for state in db.migrations.find({"status": "completed"}, {"_id": 0, "name": 1}):
+        completed_migrations.add(state["name"])
+
+
+async def run_migration(db, name, collection_name, selector, transform,
+                        batch_size=MIGRATION_BATCH_SIZE, progress_callback=None, depends_on=()):
+    """Apply transform(doc) -> $set changes (or an update document) to every matching document, resuming from the checkpoint.
+
+    depends_on names fields the transform reads without rewriting them.
+    """
+    state = await db.migrations.find_one({"name": name}) or {}
+    if state.get("status") == "completed":
+        completed_migrations.add(name)
+        return state
+
+    collection = db[collection_name]
+    last_id = state.get("last_id")
+    processed = state.get("processed", 0)
+    await db.migrations.update_one(
+        {"name": name},
+        {"$set": {"status": "running", "collection": collection_name},
+         "$setOnInsert": {"started_at": datetime.now(timezone.utc), "processed": 0}},
+        upsert=True
+    )
+
+    while True:
+        query = {"$and": [selector, {"_id": {"$gt": last_id}}]} if last_id is not None else selector
+        batch = await collection.find(query).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        docs = batch
+        for attempt in range(MIGRATION_WRITE_ATTEMPTS):
+            operations = []
+            for doc in docs:
+                changes = transform(doc)
+                if changes:
+                    update = _update_document(changes)
+                    operations.append(UpdateOne(_snapshot_filter(doc, update, depends_on), update))
+            if not operations:
+                break
+            result = await collection.bulk_write(operations, ordered=False)
+            if result.matched_count == len(operations):
+                break
+            # Some documents were written to since they were read: read those again and redo them
+            ids = [doc["_id"] for doc in docs]
+            docs = await collection.find({"$and": [selector, {"_id": {"$in": ids}}]}).to_list(len(ids))
+        else:
+            logging.warning(f"Migration {name}: documents from _id {batch[0]['_id']} kept changing and were left as they are")
+
+        last_id = batch[-1]["_id"]
+        processed += len(batch)
+        await db.migrations.update_one(
+            {"name": name},
+            {"$set": {"last_id": last_id, "processed": processed, "updated_at": datetime.now(timezone.utc)}}
+        )
+        if progress_callback:
+            progress_callback(processed)
+
+    await db.migrations.update_one(
+        {"name": name},
+        {"$set": {"status": "completed", "completed_at": datetime.now(timezone.utc)}}
+    )
+    completed_migrations.add(name)
+    logging.info(f"Migration {name} completed ({processed} documents)")
+    return await db.migrations.find_one({"name": name}, {"_id": 0})
+
+
+async def migrate_string_dates(db, progress_callback=None):
+    """Convert legacy ISO-string datetimes to BSON dates in every collection"""
+    for collection_name, fields in DATE_FIELDS.items():
+        def report(processed, collection_name=collection_name):
+            if progress_callback:
+                progress_callback(collection_name, processed)
+
+        await run_migration(
+            db,
+            date_migration_name(collection_name),
+            collection_name,
+            _string_dates_selector(fields),
+            _string_dates_to_bson(fields),
+            progress_callback=report
+        )
@@ -0,0 +1,152 @@
+"""Live order change events behind GET /api/orders/stream.
+
+OrderEventBroker fans events out to one bounded queue per connected client.
+When MongoDB runs as a replica set, run_change_stream() feeds the broker from
+a change stream on crane_orders, so writes made by any server process (and by
+the import scripts) are seen. On a standalone server change streams are not
+available and the write paths publish their own events with publish_local().
+
+Events are dicts with a "type" of created, updated, deleted or refresh (the
+client should refetch), the order "id", and where known the full "order" and
+the changed fields as "changes" (response fields only, with their values as
+the client sees them).
+
+Delete events carry the order id only when the server keeps pre-images:
+run_change_stream() enables them on the collection (MongoDB 6.0+) and falls
+back to a refresh event for deletes it cannot identify.
+"""
+import asyncio
+import itertools
+import logging
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+SUBSCRIBER_QUEUE_SIZE = 1000
+CHANGE_STREAM_RETRY_SECONDS = 5
+
+# Server error codes: not a replica set, and unknown option (pre-images need MongoDB 6.0)
+NOT_A_REPLICA_SET = 40573
+UNKNOWN_FIELD = 40415
+
+
+class OrderEventBroker:
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.change_stream_active = False
+        self._subscribers = set()
+        self._sequence = itertools.count(1)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, event):
+        """Queue an event for every subscriber"""
+        event = {"seq": next(self._sequence), **event}
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A client that stopped reading gets one refresh instead of an unbounded backlog
+                self._drain(queue)
+                queue.put_nowait({"seq": event["seq"], "type": "refresh"})
+
+    def publish_local(self, event):
+        """Publish an event from a write path, unless the change stream already reports it"""
+        if not self.change_stream_active:
+            self.publish(event)
+
+    def close(self):
+        """End every subscriber's stream"""
+        for queue in list(self._subscribers):
+            self._drain(queue)
+            queue.put_nowait(None)
+
+    @staticmethod
+    def _drain(queue):
+        while not queue.empty():
+            queue.get_nowait()
+
+
+def change_event(change, shape_order):
+    """Broker event for one change stream document, or None to skip it"""
+    operation = change["operationType"]
+    if operation in ("insert", "replace", "update"):
+        doc = change.get("fullDocument")
+        if doc is None:
+            # Deleted again before the update lookup ran; its delete event follows
+            return None
+        order = shape_order(doc)
+        event = {"type": "created" if operation == "insert" else "updated", "id": doc.get("id"), "order": order}
+        if operation == "update":
+            # Values come from the shaped order: internal fields are left out and
+            # an alias removed by compact storage reads as its canonical value
+            description = change.get("updateDescription", {})
+            fields = [*description.get("updatedFields", {}), *description.get("removedFields", [])]
+            event["changes"] = {field: order[field] for field in fields if field in order}
+        return event
+    if operation == "delete":
+        # The order id is only known when the server keeps pre-images
+        before = change.get("fullDocumentBeforeChange") or {}
+        if before.get("id") is None:
+            return {"type": "refresh"}
+        return {"type": "deleted", "id": before["id"]}
+    if operation in ("drop", "rename", "dropDatabase", "invalidate"):
+        return {"type": "refresh"}
+    return None
+
+
+async def enable_pre_images(collection):
+    """Keep pre-images of collection changes so delete events carry the order id; False where unsupported"""
+    try:
+        await collection.database.command("collMod", collection.name, changeStreamPreAndPostImages={"enabled": True})
+        return True
+    except PyMongoError as e:
+        logging.info(f"Change stream pre-images unavailable for {collection.name}: {str(e)}")
+        return False
+
+
+async def run_change_stream(collection, broker, shape_order):
+    """Feed the broker from a change stream until cancelled; returns at once on a standalone server"""
+    options = {"full_document": "updateLookup", "full_document_before_change": "whenAvailable"}
+    await enable_pre_images(collection)
+    resume_token = None
+    while True:
+        try:
+            async with collection.watch(resume_after=resume_token, **options) as stream:
+                # The first fetch raises if change streams are unsupported
+                change = await stream.try_next()
+                if not broker.change_stream_active:
+                    logging.info("Order events are fed from the MongoDB change stream")
+                broker.change_stream_active = True
+                while stream.alive:
+                    if change is not None:
+                        event = change_event(change, shape_order)
+                        if event is not None:
+                            broker.publish(event)
+                        # An invalidated stream cannot be resumed
+                        resume_token = None if change["operationType"] == "invalidate" else stream.resume_token
+                    change = await stream.try_next()
+        except OperationFailure as e:
+            if e.code == NOT_A_REPLICA_SET:
+                broker.change_stream_active = False
+                logging.info("MongoDB is not a replica set; order events are published in-process")
+                return
+            if e.code == UNKNOWN_FIELD and "full_document_before_change" in options:
+                options.pop("full_document_before_change")
+                continue
+            broker.change_stream_active = False
+            logging.warning(f"Order change stream failed, retrying: {str(e)}")
+            resume_token = None
+        except PyMongoError as e:
+            broker.change_stream_active = False
+            logging.warning(f"Order change stream interrupted, retrying: {str(e)}")
+        await asyncio.sleep(CHANGE_STREAM_RETRY_SECONDS)
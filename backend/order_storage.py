@@ -0,0 +1,104 @@
+"""Compact storage layout for crane orders.
+
+Orders used to be written with every cash and company field present, most of
+them null, and with the driver/towing-vehicle "details" fields repeating the
+name fields they were copied from. Stored orders now:
+
+    omit fields whose value is null (every optional CraneOrder field defaults to None)
+    omit an alias field when it equals its canonical field
+
+expand_order() restores the aliases on read, and missing fields read back as
+None, so API responses are unchanged. ORDER_COMPACTION_MIGRATION rewrites
+orders stored in the old layout.
+"""
+
+ORDER_COMPACTION_MIGRATION = "order_compaction"
+
+# Alias field -> the canonical field it duplicates
+ORDER_FIELD_ALIASES = {
+    "cash_driver_details": "cash_driver_name",
+    "cash_vehicle_details": "cash_towing_vehicle",
+    "company_driver_details": "company_driver_name",
+    "company_vehicle_details": "company_towing_vehicle",
+}
+
+
+def compact_order(order):
+    """Copy of an order document in the compact layout"""
+    compact = {}
+    for field, value in order.items():
+        if value is None:
+            # An explicit null alias still differs from a non-null canonical value
+            canonical = ORDER_FIELD_ALIASES.get(field)
+            if canonical is None or order.get(canonical) is None:
+                continue
+        elif field in ORDER_FIELD_ALIASES and value == order.get(ORDER_FIELD_ALIASES[field]):
+            continue
+        compact[field] = value
+    return compact
+
+
+def expand_order(order):
+    """Restore omitted alias fields in place; returns the order"""
+    if not order:
+        return order
+    for alias, canonical in ORDER_FIELD_ALIASES.items():
+        if alias not in order and canonical in order:
+            order[alias] = order[canonical]
+    return order
+
+
+def compact_update(stored, changes):
+    """$set/$unset update document applying changes to a stored order and keeping it compact"""
+    target = compact_order({**expand_order(dict(stored)), **changes})
+    set_fields = {field: value for field, value in target.items() if field not in stored or stored[field] != value}
+    unset_fields = {field: "" for field in stored if field not in target and field != "_id"}
+    update = {}
+    if set_fields:
+        update["$set"] = set_fields
+    if unset_fields:
+        update["$unset"] = unset_fields
+    return update
+
+
+def compact_set(changes):
+    """Update applying $set changes to a stored order in one write without reading it first.
+
+    A plain $set, unless the changes touch an alias pair: then an update
+    pipeline first pins an omitted alias to its current canonical value (null
+    when that is absent too), applies the changes, and drops the alias again if
+    it ends up equal to the canonical.
+    """
+    touched = {alias: canonical for alias, canonical in ORDER_FIELD_ALIASES.items()
+               if alias in changes or canonical in changes}
+    if not touched:
+        return {"$set": changes}
+    return [
+        {"$set": {
+            alias: {"$cond": [{"$eq": [{"$type": f"${alias}"}, "missing"]}, {"$ifNull": [f"${canonical}", None]}, f"${alias}"]}
+            for alias, canonical in touched.items()
+        }},
+        {"$set": {field: {"$literal": value} for field, value in changes.items()}},
+        {"$set": {
+            alias: {"$cond": [
+                {"$eq": [{"$ifNull": [f"${alias}", None]}, {"$ifNull": [f"${canonical}", None]}]},
+                "$$REMOVE",
+                f"${alias}"
+            ]}
+            for alias, canonical in touched.items()
+        }},
+    ]
+
+
+def apply_set(stored, changes):
+    """The expanded order that compact_set(changes) leaves behind when applied to stored"""
+    order = expand_order(dict(stored))
+    for alias in ORDER_FIELD_ALIASES:
+        order.setdefault(alias, None)
+    order.update(changes)
+    return order
+
+
+def compact_stored_order(doc):
+    """Migration transform: the update that compacts one stored order, or {} when it is already compact"""
+    return compact_update(doc, {})
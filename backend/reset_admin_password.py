@@ -46,7 +46,7 @@ else:
         "hashed_password": hashed_password,
         "full_name": "Super Administrator",
         "role": "super_admin",
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     }
     
     db.users.insert_one(admin_data)
@@ -0,0 +1,72 @@
+"""Normalized search keys stored on every order.
+
+Customer-name and phone searches used to be unanchored case-insensitive
+regexes over the raw fields, which cannot use an index. Each order now also
+carries:
+
+    search_name_tokens  lower-cased alphanumeric tokens of customer_name
+    search_phone        digits-only phone, plus its last 10 digits when longer
+
+Both are multikey-indexed and queried with anchored, case-sensitive prefix
+regexes, which MongoDB turns into index range scans.
+"""
+import re
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+_NON_DIGIT_RE = re.compile(r"\D")
+
+# Local mobile numbers are 10 digits; stored numbers may carry a country code
+LOCAL_PHONE_DIGITS = 10
+
+
+def name_tokens(name):
+    """Lower-cased word tokens of a name, in order, without duplicates"""
+    if not name:
+        return []
+    return list(dict.fromkeys(_TOKEN_RE.findall(str(name).lower())))
+
+
+def phone_keys(phone):
+    """Digits-only phone, plus the local number when a prefix is present"""
+    digits = _NON_DIGIT_RE.sub("", str(phone or ""))
+    if not digits:
+        return []
+    keys = [digits]
+    if len(digits) > LOCAL_PHONE_DIGITS:
+        keys.append(digits[-LOCAL_PHONE_DIGITS:])
+    return keys
+
+
+def search_key_fields(order):
+    """The search key fields for an order with customer_name and phone"""
+    return {
+        "search_name_tokens": name_tokens(order.get("customer_name")),
+        "search_phone": phone_keys(order.get("phone")),
+    }
+
+
+def with_search_keys(order):
+    """Copy of an order document with its search keys filled in"""
+    return {**order, **search_key_fields(order)}
+
+
+def _prefix(value):
+    return {"$regex": "^" + re.escape(value)}
+
+
+def customer_name_search_filter(value):
+    """Every search token must be a prefix of one of the name tokens; None for an empty search"""
+    tokens = name_tokens(value)
+    if not tokens:
+        return None
+    if len(tokens) == 1:
+        return {"search_name_tokens": _prefix(tokens[0])}
+    return {"$and": [{"search_name_tokens": _prefix(token)} for token in tokens]}
+
+
+def phone_search_filter(value):
+    """Digits of the search as a prefix of the stored phone keys; None when there are no digits"""
+    digits = _NON_DIGIT_RE.sub("", str(value or ""))
+    if not digits:
+        return None
+    return {"search_phone": _prefix(digits)}
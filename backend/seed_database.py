@@ -3,30 +3,10 @@ import os
 from pymongo import MongoClient
 from datetime import datetime, timezone
 import uuid
-import re
 import bcrypt
 
-def clean_monetary_value(value):
-    """Clean monetary values like '₹ 2000.00', '500.00 INR', etc."""
-    if pd.isna(value) or value is None:
-        return None
-    if isinstance(value, (int, float)):
-        return float(value)
-    value_str = str(value).strip()
-    cleaned = re.sub(r'[₹,\s]|INR', '', value_str)
-    try:
-        return float(cleaned) if cleaned else None
-    except ValueError:
-        return None
-
-def clean_string(value):
-    """Clean string values, return None for NaN or 'NaN' strings"""
-    if pd.isna(value) or value is None:
-        return None
-    value_str = str(value).strip()
-    if value_str.lower() in ['nan', 'nat', 'na', 'unknown', '']:
-        return None
-    return value_str
+from order_storage import compact_order
+from search_keys import name_tokens, phone_keys
 
 def ensure_super_admin_exists(db):
     """Ensure super admin user exists in the database"""
@@ -48,7 +28,7 @@ def ensure_super_admin_exists(db):
                 "hashed_password": hashed_password.decode('utf-8'),
                 "role": "super_admin",
                 "is_active": True,
-                "created_at": datetime.now(timezone.utc).isoformat()
+                "created_at": datetime.now(timezone.utc)
             }
             
             users_collection.insert_one(user)
@@ -65,8 +45,172 @@ def ensure_super_admin_exists(db):
     except Exception as e:
         print(f"[SEED] Error creating super admin: {str(e)}")
 
-def seed_database_if_empty():
-    """Seed database with Excel data if it's empty or has very few records"""
+# Every order document carries all of these fields, None when not applicable
+ORDER_OPTIONAL_FIELDS = [
+    'incentive_amount', 'incentive_reason', 'incentive_added_by', 'incentive_added_at',
+    'cash_trip_from', 'cash_trip_to', 'care_off', 'care_off_amount', 'cash_vehicle_details',
+    'cash_driver_details', 'cash_vehicle_name', 'cash_vehicle_number', 'cash_service_type',
+    'amount_received', 'advance_amount', 'cash_kms_travelled', 'cash_toll', 'diesel', 'cash_diesel',
+    'cash_diesel_refill_location', 'cash_driver_name', 'cash_towing_vehicle',
+    'name_of_firm', 'company_name', 'case_id_file_number', 'company_vehicle_name',
+    'company_vehicle_number', 'company_service_type', 'company_vehicle_details',
+    'company_driver_details', 'company_trip_from', 'company_trip_to', 'reach_time', 'drop_time',
+    'company_kms_travelled', 'company_toll', 'diesel_name', 'company_diesel',
+    'company_diesel_refill_location', 'company_driver_name', 'company_towing_vehicle',
+]
+
+# Order field -> (spreadsheet column, cleaner) per order type
+CASH_COLUMNS = {
+    'cash_trip_from': ('Cash Trip From:', 'string'),
+    'cash_trip_to': ('Cash Trip To:', 'string'),
+    'care_off': ('Care Off', 'string'),
+    'care_off_amount': ('Care Off Amount', 'money'),
+    'cash_vehicle_details': ('Cash Vehicle Details', 'string'),
+    'cash_driver_details': ('Cash Driver Details', 'string'),
+    'cash_vehicle_name': ('Cash Vehicle Name (Make & Model)', 'string'),
+    'cash_vehicle_number': ('Cash Vehicle Number', 'string'),
+    'cash_service_type': ('Cash Service Type', 'string'),
+    'amount_received': ('Amount', 'money'),
+    'advance_amount': ('Received Advance Amount', 'money'),
+    'cash_kms_travelled': ('Cash Kms Travelled', 'raw'),
+    'cash_toll': ('Cash Toll', 'money'),
+    'diesel': ('Diesel', 'string'),
+    'cash_diesel': ('Cash Diesel', 'raw'),
+    'cash_diesel_refill_location': ('Cash Diesel Re-fill Location', 'string'),
+}
+
+COMPANY_COLUMNS = {
+    'name_of_firm': ('Name of Firm', 'string'),
+    'company_name': ('Company Name', 'string'),
+    'case_id_file_number': ('Case ID / File Number', 'string'),
+    'company_vehicle_name': ('Company Vehicle Name (Make & Model)', 'string'),
+    'company_vehicle_number': ('Company Vehicle Number', 'string'),
+    'company_service_type': ('Company Service Type', 'string'),
+    'company_vehicle_details': ('Company Vehicle Details', 'string'),
+    'company_driver_details': ('Company Driver Details', 'string'),
+    'company_trip_from': ('Company Trip From:', 'string'),
+    'company_trip_to': ('Company Trip To:', 'string'),
+    'reach_time': ('Reach Time', 'timestamp'),
+    'drop_time': ('Drop Time', 'timestamp'),
+    'company_kms_travelled': ('Company Kms Travelled', 'raw'),
+    'company_toll': ('Company Toll', 'money'),
+    'company_diesel': ('Company Diesel', 'raw'),
+    'company_diesel_refill_location': ('Company Diesel Re-fill Location', 'string'),
+}
+
+INSERT_CHUNK_SIZE = 1000
+
+def _to_objects(series):
+    """Object series with None in place of NaN/NaT, ready for to_dict"""
+    series = series.astype(object)
+    return series.where(series.notna(), None)
+
+def clean_string_column(series):
+    """Stripped strings, with None for NaN and placeholder values such as 'nan' or 'unknown'"""
+    cleaned = series.astype(str).str.strip()
+    blank = series.isna() | cleaned.str.lower().isin(['nan', 'nat', 'na', 'unknown', ''])
+    return _to_objects(cleaned.mask(blank))
+
+def clean_monetary_column(series):
+    """Floats from monetary values like '₹ 2000.00' or '500.00 INR', None where unparseable"""
+    cleaned = series.astype(str).str.replace(r'[₹,\s]|INR', '', regex=True)
+    values = pd.to_numeric(cleaned, errors='coerce').astype(float)
+    return _to_objects(values.mask(series.isna()))
+
+def _utc(value):
+    """Naive spreadsheet datetimes are stored as UTC"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def timestamp_column(series, default=None):
+    """UTC datetimes for Timestamp cells, default for everything else"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        present = series.notna().tolist()
+        values = series.dt.to_pydatetime()
+        return pd.Series(
+            [_utc(value) if ok else default for value, ok in zip(values, present)],
+            index=series.index, dtype=object
+        )
+    return series.map(lambda value: _utc(value.to_pydatetime()) if isinstance(value, pd.Timestamp) and pd.notna(value) else default)
+
+def _column(df, name):
+    return df[name] if name in df.columns else pd.Series([None] * len(df), index=df.index, dtype=object)
+
+def _clean_column(df, name, kind):
+    series = _column(df, name)
+    if kind == 'string':
+        return clean_string_column(series)
+    if kind == 'money':
+        return clean_monetary_column(series)
+    if kind == 'timestamp':
+        return timestamp_column(series)
+    return _to_objects(series)
+
+def build_order_documents(df):
+    """Convert a seed/backfill sheet into order documents with whole-column operations.
+
+    Returns (documents, skipped_count); rows without a Cash / Company value are skipped.
+    """
+    order_type = clean_string_column(_column(df, 'Cash / Company'))
+    has_type = order_type.notna()
+    df = df[has_type]
+    order_type = order_type[has_type].str.lower()
+
+    now = datetime.now(timezone.utc)
+    out = pd.DataFrame(index=df.index)
+    out['id'] = [str(uuid.uuid4()) for _ in range(len(df))]
+    out['unique_id'] = [str(uuid.uuid4()) for _ in range(len(df))]
+    out['added_time'] = timestamp_column(_column(df, 'Added Time'), now)
+    out['ip_address'] = clean_string_column(_column(df, 'IP Address'))
+    out['date_time'] = timestamp_column(_column(df, 'Date-Time'), now)
+    out['customer_name'] = clean_string_column(df['Customer Name']) if 'Customer Name' in df.columns else 'Unknown'
+    out['phone'] = _column(df, 'Phone').astype(str) if 'Phone' in df.columns else ''
+    out['order_type'] = order_type
+    out['created_by'] = 'system_import'
+    out['updated_by'] = None
+    out['updated_at'] = None
+
+    for field in ORDER_OPTIONAL_FIELDS:
+        out[field] = pd.Series([None] * len(df), index=df.index, dtype=object)
+
+    is_cash = order_type == 'cash'
+    is_company = order_type == 'company'
+    for mask, columns in ((is_cash, CASH_COLUMNS), (is_company, COMPANY_COLUMNS)):
+        if not mask.any():
+            continue
+        for field, (column, kind) in columns.items():
+            out.loc[mask, field] = _clean_column(df[mask], column, kind)
+
+    # Driver and towing vehicle come from the details columns
+    out.loc[is_cash, 'cash_driver_name'] = out.loc[is_cash, 'cash_driver_details']
+    out.loc[is_cash, 'cash_towing_vehicle'] = out.loc[is_cash, 'cash_vehicle_details']
+    out.loc[is_company, 'company_driver_name'] = out.loc[is_company, 'company_driver_details']
+    out.loc[is_company, 'company_towing_vehicle'] = out.loc[is_company, 'company_vehicle_details']
+
+    out['search_name_tokens'] = [name_tokens(name) for name in out['customer_name'].tolist()]
+    out['search_phone'] = [phone_keys(phone) for phone in out['phone'].tolist()]
+
+    # Column-wise tolist is several times faster than DataFrame.to_dict('records')
+    fields = list(out.columns)
+    columns = [out[field].tolist() for field in fields]
+    documents = [compact_order(dict(zip(fields, values))) for values in zip(*columns)]
+    return documents, int((~has_type).sum())
+
+def insert_in_chunks(collection, documents, chunk_size=INSERT_CHUNK_SIZE, progress_callback=None):
+    """insert_many in fixed-size chunks, returning the number of documents written"""
+    inserted = 0
+    for start in range(0, len(documents), chunk_size):
+        result = collection.insert_many(documents[start:start + chunk_size], ordered=False)
+        inserted += len(result.inserted_ids)
+        if progress_callback:
+            progress_callback(inserted, len(documents))
+    return inserted
+
+def seed_database_if_empty(progress_callback=None):
+    """Seed database with Excel data if it's empty or has very few records.
+
+    Returns True after seeding and False when seeding was skipped; errors are
+    re-raised so the startup warmup reports them.
+    """
     try:
         # MongoDB connection
         MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
@@ -104,135 +248,8 @@ def seed_database_if_empty():
         df = pd.read_excel(seed_file)
         print(f"[SEED] Found {len(df)} records to import")
         
-        imported_count = 0
-        error_count = 0
-        
-        for index, row in df.iterrows():
-            try:
-                # Determine order type
-                order_type_raw = clean_string(row.get('Cash / Company', ''))
-                if not order_type_raw:
-                    error_count += 1
-                    continue
-                
-                order_type = order_type_raw.lower()
-                
-                # Base order data
-                order_data = {
-                    'id': str(uuid.uuid4()),
-                    'unique_id': str(uuid.uuid4()),
-                    'added_time': row['Added Time'].isoformat() if pd.notna(row['Added Time']) else datetime.now(timezone.utc).isoformat(),
-                    'ip_address': clean_string(row.get('IP Address')),
-                    'date_time': row['Date-Time'].isoformat() if pd.notna(row['Date-Time']) else datetime.now(timezone.utc).isoformat(),
-                    'customer_name': clean_string(row.get('Customer Name', 'Unknown')),
-                    'phone': str(row.get('Phone', '')),
-                    'order_type': order_type,
-                    'created_by': 'system_import',
-                    'updated_by': None,
-                    'updated_at': None,
-                }
-                
-                # Initialize all fields
-                order_data.update({
-                    'incentive_amount': None,
-                    'incentive_reason': None,
-                    'incentive_added_by': None,
-                    'incentive_added_at': None,
-                    'cash_trip_from': None,
-                    'cash_trip_to': None,
-                    'care_off': None,
-                    'care_off_amount': None,
-                    'cash_vehicle_details': None,
-                    'cash_driver_details': None,
-                    'cash_vehicle_name': None,
-                    'cash_vehicle_number': None,
-                    'cash_service_type': None,
-                    'amount_received': None,
-                    'advance_amount': None,
-                    'cash_kms_travelled': None,
-                    'cash_toll': None,
-                    'diesel': None,
-                    'cash_diesel': None,
-                    'cash_diesel_refill_location': None,
-                    'cash_driver_name': None,
-                    'cash_towing_vehicle': None,
-                    'name_of_firm': None,
-                    'company_name': None,
-                    'case_id_file_number': None,
-                    'company_vehicle_name': None,
-                    'company_vehicle_number': None,
-                    'company_service_type': None,
-                    'company_vehicle_details': None,
-                    'company_driver_details': None,
-                    'company_trip_from': None,
-                    'company_trip_to': None,
-                    'reach_time': None,
-                    'drop_time': None,
-                    'company_kms_travelled': None,
-                    'company_toll': None,
-                    'diesel_name': None,
-                    'company_diesel': None,
-                    'company_diesel_refill_location': None,
-                    'company_driver_name': None,
-                    'company_towing_vehicle': None,
-                })
-                
-                # Populate fields based on order type
-                if order_type == 'cash':
-                    order_data['cash_trip_from'] = clean_string(row.get('Cash Trip From:'))
-                    order_data['cash_trip_to'] = clean_string(row.get('Cash Trip To:'))
-                    order_data['care_off'] = clean_string(row.get('Care Off'))
-                    order_data['care_off_amount'] = clean_monetary_value(row.get('Care Off Amount'))
-                    order_data['cash_vehicle_details'] = clean_string(row.get('Cash Vehicle Details'))
-                    order_data['cash_driver_details'] = clean_string(row.get('Cash Driver Details'))
-                    order_data['cash_vehicle_name'] = clean_string(row.get('Cash Vehicle Name (Make & Model)'))
-                    order_data['cash_vehicle_number'] = clean_string(row.get('Cash Vehicle Number'))
-                    order_data['cash_service_type'] = clean_string(row.get('Cash Service Type'))
-                    order_data['amount_received'] = clean_monetary_value(row.get('Amount'))
-                    order_data['advance_amount'] = clean_monetary_value(row.get('Received Advance Amount'))
-                    order_data['cash_kms_travelled'] = row.get('Cash Kms Travelled') if pd.notna(row.get('Cash Kms Travelled')) else None
-                    order_data['cash_toll'] = clean_monetary_value(row.get('Cash Toll'))
-                    order_data['diesel'] = clean_string(row.get('Diesel'))
-                    order_data['cash_diesel'] = row.get('Cash Diesel') if pd.notna(row.get('Cash Diesel')) else None
-                    order_data['cash_diesel_refill_location'] = clean_string(row.get('Cash Diesel Re-fill Location'))
-                    order_data['cash_driver_name'] = order_data['cash_driver_details']
-                    order_data['cash_towing_vehicle'] = order_data['cash_vehicle_details']
-                    
-                elif order_type == 'company':
-                    order_data['name_of_firm'] = clean_string(row.get('Name of Firm'))
-                    order_data['company_name'] = clean_string(row.get('Company Name'))
-                    order_data['case_id_file_number'] = clean_string(row.get('Case ID / File Number'))
-                    order_data['company_vehicle_name'] = clean_string(row.get('Company Vehicle Name (Make & Model)'))
-                    order_data['company_vehicle_number'] = clean_string(row.get('Company Vehicle Number'))
-                    order_data['company_service_type'] = clean_string(row.get('Company Service Type'))
-                    order_data['company_vehicle_details'] = clean_string(row.get('Company Vehicle Details'))
-                    order_data['company_driver_details'] = clean_string(row.get('Company Driver Details'))
-                    order_data['company_trip_from'] = clean_string(row.get('Company Trip From:'))
-                    order_data['company_trip_to'] = clean_string(row.get('Company Trip To:'))
-                    
-                    reach_time = row.get('Reach Time')
-                    if pd.notna(reach_time) and isinstance(reach_time, pd.Timestamp):
-                        order_data['reach_time'] = reach_time.isoformat()
-                    
-                    drop_time = row.get('Drop Time')
-                    if pd.notna(drop_time) and isinstance(drop_time, pd.Timestamp):
-                        order_data['drop_time'] = drop_time.isoformat()
-                    
-                    order_data['company_kms_travelled'] = row.get('Company Kms Travelled') if pd.notna(row.get('Company Kms Travelled')) else None
-                    order_data['company_toll'] = clean_monetary_value(row.get('Company Toll'))
-                    order_data['company_diesel'] = row.get('Company Diesel') if pd.notna(row.get('Company Diesel')) else None
-                    order_data['company_diesel_refill_location'] = clean_string(row.get('Company Diesel Re-fill Location'))
-                    order_data['company_driver_name'] = order_data['company_driver_details']
-                    order_data['company_towing_vehicle'] = order_data['company_vehicle_details']
-                
-                # Insert into MongoDB
-                orders_collection.insert_one(order_data)
-                imported_count += 1
-                
-            except Exception as e:
-                print(f"[SEED] Error importing row {index + 1}: {str(e)}")
-                error_count += 1
-                continue
+        documents, error_count = build_order_documents(df)
+        imported_count = insert_in_chunks(orders_collection, documents, progress_callback=progress_callback)
         
         print(f"[SEED] Database seeding complete!")
         print(f"[SEED] Successfully imported: {imported_count} records")
@@ -245,7 +262,7 @@ def seed_database_if_empty():
         print(f"[SEED] Error during database seeding: {str(e)}")
         import traceback
         traceback.print_exc()
-        return False
+        raise
 
 if __name__ == "__main__":
     seed_database_if_empty()
@@ -1,23 +1,28 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query, Depends, status, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Depends, Request, status, UploadFile, File
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import re
 import logging
 from pathlib import Path
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional, Dict, Any
+import functools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+import tempfile
+import shutil
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, ValidationError, create_model
+from typing import List, Optional, Dict, Any, Tuple
 import uuid
 from datetime import datetime, timezone, timedelta
 import calendar
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from enum import Enum
-import bcrypt
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment
 from reportlab.lib import colors
@@ -27,10 +32,35 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 import io
 import json
+import base64
+import hashlib
+import secrets
+import time
+from cachetools import TTLCache
 import openpyxl
 import openpyxl.styles
 from io import BytesIO
 from fastapi.responses import Response
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as DefaultJSONResponse
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+    DefaultJSONResponse = JSONResponse
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from audit_diff import AUDIT_COMPACTION_MIGRATION, HISTORY_ACTIONS, UNKNOWN, compact_audit_entry, document_history, field_changes, pack_pre_image
+from audit_writer import AuditWriter
+from compression import CompressionMiddleware
+from db_indexes import ensure_indexes, index_report
+from migrations import check_server_version, completed_migrations, date_migration_name, load_completed_migrations, migrate_string_dates, run_migration, to_utc_datetime
+from order_events import OrderEventBroker, run_change_stream
+from order_storage import ORDER_COMPACTION_MIGRATION, ORDER_FIELD_ALIASES, apply_set, compact_order, compact_set, compact_stored_order, expand_order
+from search_keys import customer_name_search_filter, phone_search_filter, search_key_fields, with_search_keys
+from excel_import import (
+    SUPPORTED_IMPORT_EXTENSIONS, build_header_lookup, check_rows, convert_row, convert_rows,
+    iter_sheet_rows, open_row_batches
+)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -38,19 +68,59 @@ load_dotenv(ROOT_DIR / '.env')
 # Security configurations
 SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-change-this-in-production')
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Access tokens are short-lived and carry the user's claims; refresh tokens renew them
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get('ACCESS_TOKEN_EXPIRE_MINUTES', 15))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.environ.get('REFRESH_TOKEN_EXPIRE_DAYS', 7))
+# How often each process reloads revoked tokens written by other processes
+REVOCATION_SYNC_SECONDS = int(os.environ.get('REVOCATION_SYNC_SECONDS', 30))
+
+# Parallel import settings
+IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', os.cpu_count() or 2))
+IMPORT_CHUNK_ROWS = int(os.environ.get('IMPORT_CHUNK_ROWS', 5000))
+
+# Dry-run imports: rows per duplicate lookup query, and per-row errors returned
+DRY_RUN_LOOKUP_BATCH = 1000
+DRY_RUN_ROW_ERROR_LIMIT = 1000
+
+# Upper bound on orders accepted by POST /orders/bulk in one request
+BULK_ORDER_LIMIT = int(os.environ.get('BULK_ORDER_LIMIT', 1000))
+# Upper bound on orders changed by one POST /orders/bulk-update
+BULK_UPDATE_LIMIT = int(os.environ.get('BULK_UPDATE_LIMIT', 10000))
 
-# Password hashing
+# Response compression: bodies below the threshold (bytes) are sent as is
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 4))
+ZSTD_LEVEL = int(os.environ.get('ZSTD_LEVEL', 3))
+
+# Decoded access tokens, per process (claims never change; revocations are checked on every use)
+USER_CACHE_TTL_SECONDS = int(os.environ.get('USER_CACHE_TTL_SECONDS', 30))
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+
+# Audit log writes are batched in the background: flushed every AUDIT_BATCH_SIZE entries or AUDIT_FLUSH_MS
+AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', 10000))
+AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 500))
+AUDIT_FLUSH_MS = int(os.environ.get('AUDIT_FLUSH_MS', 200))
+# Delete entries keep the removed document (compressed) so it can be viewed later
+AUDIT_DELETE_PRE_IMAGES = os.environ.get('AUDIT_DELETE_PRE_IMAGES', 'true').lower() == 'true'
+
+# Password hashing; bcrypt runs in a small thread pool so logins never block the event loop
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
 security = HTTPBearer()
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# tz_aware: BSON dates come back as aware UTC datetimes
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
-app = FastAPI(title="Kawale Cranes API", description="Data entry system for Kawale Cranes orders with authentication")
+app = FastAPI(
+    title="Kawale Cranes API",
+    description="Data entry system for Kawale Cranes orders with authentication",
+    default_response_class=DefaultJSONResponse
+)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -93,6 +163,14 @@ class Token(BaseModel):
     access_token: str
     token_type: str
     user: User
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # Access token lifetime in seconds
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
 
 class AuditLog(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -279,6 +357,30 @@ class CraneOrderUpdate(BaseModel):
     incentive_added_by: Optional[str] = None
     incentive_added_at: Optional[datetime] = None
 
+class BulkOrderCreate(BaseModel):
+    # Items stay raw so one bad payload is reported per item instead of rejecting the batch
+    orders: List[Dict[str, Any]] = Field(..., min_length=1, max_length=BULK_ORDER_LIMIT)
+
+class BulkOrderDelete(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=BULK_ORDER_LIMIT)
+
+class BulkOrderFilter(BaseModel):
+    model_config = ConfigDict(extra='forbid')
+    
+    order_type: Optional[str] = None
+    customer_name: Optional[str] = None
+    phone: Optional[str] = None
+    driver_name: Optional[str] = None  # Exact cash or company driver name
+    towing_vehicle: Optional[str] = None  # Exact cash or company towing vehicle
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None  # Inclusive
+
+class BulkOrderUpdate(BaseModel):
+    # Exactly one of ids or filter selects the orders
+    ids: Optional[List[str]] = Field(None, min_length=1, max_length=BULK_ORDER_LIMIT)
+    filter: Optional[BulkOrderFilter] = None
+    patch: CraneOrderUpdate
+
 class ServiceRate(BaseModel):
     model_config = ConfigDict(extra='forbid')
     
@@ -349,21 +451,32 @@ class DriverDefaultSalary(BaseModel):
     sample_data: List[Dict[str, Any]] = []  # First 5 records as preview
 
 def prepare_for_mongo(data):
-    """Convert datetime objects to ISO strings for MongoDB storage"""
+    """Copy a document for MongoDB storage; datetimes are kept as native BSON dates in UTC"""
     doc = dict(data)
     for key, value in doc.items():
         if isinstance(value, datetime):
-            doc[key] = value.isoformat()
+            doc[key] = to_utc_datetime(value)
     return doc
 
+MONGO_DATETIME_FIELDS = ('added_time', 'date_time', 'reach_time', 'drop_time', 'created_at', 'updated_at', 'last_login', 'timestamp', 'incentive_added_at')
+
+# Optional string fields returned as "" rather than null
+BLANK_WHEN_NONE_FIELDS = frozenset([
+    'cash_trip_from', 'cash_trip_to', 'care_off', 'cash_vehicle_details', 'cash_driver_details',
+    'cash_vehicle_name', 'cash_vehicle_number', 'cash_service_type', 'diesel', 'cash_diesel_refill_location',
+    'cash_driver_name', 'cash_towing_vehicle', 'name_of_firm', 'company_name', 'case_id_file_number',
+    'company_vehicle_name', 'company_vehicle_number', 'company_service_type', 'company_vehicle_details',
+    'company_driver_details', 'company_trip_from', 'company_trip_to', 'diesel_name',
+    'company_diesel_refill_location', 'company_driver_name', 'company_towing_vehicle', 'incentive_reason'
+])
+
 def parse_from_mongo(item):
-    """Convert ISO strings back to datetime objects from MongoDB and handle None values"""
+    """Convert legacy ISO strings (not yet migrated) to datetime objects and handle None values"""
     if not item:
         return item
     
     # Convert datetime fields
-    datetime_fields = ['added_time', 'date_time', 'reach_time', 'drop_time', 'created_at', 'updated_at', 'last_login', 'timestamp', 'incentive_added_at']
-    for field in datetime_fields:
+    for field in MONGO_DATETIME_FIELDS:
         if field in item and isinstance(item[field], str):
             try:
                 item[field] = datetime.fromisoformat(item[field])
@@ -372,21 +485,217 @@ def parse_from_mongo(item):
     
     # Handle None values in string fields that should be Optional[str] but not None for Pydantic validation
     # Convert None to empty string for optional string fields to avoid Pydantic validation errors
-    optional_string_fields = [
-        'cash_trip_from', 'cash_trip_to', 'care_off', 'cash_vehicle_details', 'cash_driver_details',
-        'cash_vehicle_name', 'cash_vehicle_number', 'cash_service_type', 'diesel', 'cash_diesel_refill_location',
-        'cash_driver_name', 'cash_towing_vehicle', 'name_of_firm', 'company_name', 'case_id_file_number',
-        'company_vehicle_name', 'company_vehicle_number', 'company_service_type', 'company_vehicle_details',
-        'company_driver_details', 'company_trip_from', 'company_trip_to', 'diesel_name',
-        'company_diesel_refill_location', 'company_driver_name', 'company_towing_vehicle', 'incentive_reason'
-    ]
-    
-    for field in optional_string_fields:
+    for field in BLANK_WHEN_NONE_FIELDS:
         if field in item and item[field] is None:
             item[field] = ""  # Convert None to empty string
     
     return item
 
+def parse_order_from_mongo(order):
+    """parse_from_mongo for an order, first restoring the fields compact storage omits"""
+    if not order:
+        return order
+    expand_order(order)
+    for field in BLANK_WHEN_NONE_FIELDS:
+        order.setdefault(field, "")
+    return parse_from_mongo(order)
+
+# Fast path for list endpoints: documents read back from our own collections are
+# trusted, so they are shaped to the response model's fields and encoded directly
+# instead of being re-validated by Pydantic and run through jsonable_encoder.
+ORDER_RESPONSE_FIELDS = tuple(CraneOrder.model_fields)
+AUDIT_LOG_RESPONSE_FIELDS = tuple(AuditLog.model_fields)
+
+def shape_trusted_documents(docs: List[Dict[str, Any]], fields) -> List[Dict[str, Any]]:
+    """Keep exactly the response fields (missing ones as null), with parse_from_mongo's blank strings"""
+    shaped = []
+    for doc in docs:
+        row = {}
+        for field in fields:
+            value = doc.get(field)
+            if value is None and field in ORDER_FIELD_ALIASES and field not in doc:
+                value = doc.get(ORDER_FIELD_ALIASES[field])
+            if value is None and field in BLANK_WHEN_NONE_FIELDS:
+                value = ""
+            row[field] = value
+        shaped.append(row)
+    return shaped
+
+# Sparse fieldsets: ?fields=id,customer_name,... limits an order response to those fields
+ORDER_FIELDS_DESCRIPTION = "Comma-separated order fields to return (id is always included); all fields when omitted"
+
+def parse_order_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Validated field selection in model order, or None for the full order; 400 on unknown fields"""
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - set(ORDER_RESPONSE_FIELDS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown order fields: {', '.join(unknown)}")
+    requested.add("id")
+    return tuple(name for name in ORDER_RESPONSE_FIELDS if name in requested)
+
+def order_projection(fields: Optional[Tuple[str, ...]], *extra: str) -> Dict[str, int]:
+    """Mongo projection for a field selection, plus any fields needed server-side (e.g. the sort key)"""
+    if fields is None:
+        return {"_id": 0}
+    # Omitted alias fields are rebuilt from their canonical field
+    aliased = [ORDER_FIELD_ALIASES[name] for name in fields if name in ORDER_FIELD_ALIASES]
+    return {"_id": 0, **{name: 1 for name in (*fields, *aliased, *extra)}}
+
+@functools.lru_cache(maxsize=128)
+def slim_order_model(fields: Tuple[str, ...]) -> type:
+    """CraneOrder restricted to the selected fields, with their original types, all optional"""
+    return create_model(
+        "CraneOrderFields",
+        **{name: (Optional[CraneOrder.model_fields[name].annotation], None) for name in fields}
+    )
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        # UTC as "Z", the way Pydantic serializes response models
+        return text[:-6] + "Z" if value.utcoffset() == timedelta(0) else text
+    return str(value)
+
+def encode_json(content: Any) -> bytes:
+    """Compact JSON for already-shaped content; datetimes as ISO strings, formatted as Pydantic does"""
+    if orjson is not None:
+        return orjson.dumps(content, default=str, option=orjson.OPT_UTC_Z)
+    return json.dumps(content, default=_json_default, separators=(",", ":")).encode()
+
+def trusted_json_response(content: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Encode already-shaped content straight to a JSON response"""
+    return Response(content=encode_json(content), media_type="application/json", headers=headers)
+
+# Live order events for GET /orders/stream (see order_events.py)
+order_events = OrderEventBroker()
+
+# Seconds between keep-alive comments on an idle event stream; the stream's
+# token is checked again for expiry and revocation as often
+ORDER_STREAM_HEARTBEAT_SECONDS = 15
+
+# Lifetime of a single-use ticket for opening GET /orders/stream
+ORDER_STREAM_TICKET_SECONDS = 30
+
+def shape_order(order: Dict[str, Any]) -> Dict[str, Any]:
+    return shape_trusted_documents([order], ORDER_RESPONSE_FIELDS)[0]
+
+def publish_order_event(event_type: str, order_id: Optional[str] = None,
+                        order: Optional[Dict[str, Any]] = None, changes: Optional[Dict[str, Any]] = None):
+    """Tell live dashboards about an order write; a no-op while the change stream reports writes"""
+    if order_events.change_stream_active or not order_events.subscriber_count:
+        return
+    event = {"type": event_type, "id": order_id}
+    if order is not None:
+        event["order"] = shape_order(order)
+    if changes is not None:
+        # Write paths pass the stored $set, which also holds internal search keys
+        event["changes"] = {field: value for field, value in changes.items() if field in ORDER_RESPONSE_FIELDS}
+    order_events.publish_local(event)
+
+def legacy_string_dates(collection_name: str) -> bool:
+    """True until the BSON date migration has finished for the collection"""
+    return date_migration_name(collection_name) not in completed_migrations
+
+def date_range_filter(field: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                      inclusive_end: bool = False, collection_name: str = "crane_orders") -> Dict[str, Any]:
+    """Top-level filter for start <= field < end (or <= end) on BSON dates.
+
+    While the collection still holds ISO-string dates a second branch matches
+    those with the equivalent string comparison (naive strings are UTC).
+    """
+    bounds = {}
+    legacy_bounds = {}
+    if start is not None:
+        start = to_utc_datetime(start)
+        bounds["$gte"] = start
+        legacy_bounds["$gte"] = start.replace(tzinfo=None).isoformat()
+    if end is not None:
+        end = to_utc_datetime(end)
+        bounds["$lte" if inclusive_end else "$lt"] = end
+        # Naive bounds match both naive and "+00:00" strings; "~" sorts after any offset suffix
+        legacy_bounds["$lte" if inclusive_end else "$lt"] = end.replace(tzinfo=None).isoformat() + ("~" if inclusive_end else "")
+    if not bounds:
+        return {}
+    if not legacy_string_dates(collection_name):
+        return {field: bounds}
+    return {"$or": [{field: bounds}, {field: legacy_bounds}]}
+
+SEARCH_KEYS_MIGRATION = "order_search_keys"
+
+def order_search_filter(customer_name: Optional[str] = None, phone: Optional[str] = None) -> Dict[str, Any]:
+    """Customer name / phone search, on the indexed search keys once they are backfilled"""
+    indexed = SEARCH_KEYS_MIGRATION in completed_migrations
+    conditions = []
+    if customer_name:
+        condition = customer_name_search_filter(customer_name) if indexed else None
+        conditions.append(condition or {"customer_name": {"$regex": customer_name, "$options": "i"}})
+    if phone:
+        condition = phone_search_filter(phone) if indexed else None
+        conditions.append(condition or {"phone": {"$regex": phone, "$options": "i"}})
+    if len(conditions) > 1:
+        return {"$and": conditions}
+    return conditions[0] if conditions else {}
+
+# Keyset pagination: an opaque cursor holds the sort key of the last item on a page
+def encode_cursor(sort_value, item_id: str) -> str:
+    """Build an opaque cursor from a (sort value, id) pair"""
+    if isinstance(sort_value, datetime):
+        payload = {"d": sort_value.isoformat(), "i": item_id}
+    else:
+        payload = {"v": sort_value, "i": item_id}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    """Return the (sort value, id) pair stored in a cursor, or raise 400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        sort_value = datetime.fromisoformat(payload["d"]) if "d" in payload else payload["v"]
+        item_id = payload["i"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    # Both values go into the query as-is, so anything but a plain value (e.g. {"$ne": null}) is refused
+    if not isinstance(item_id, str) or not isinstance(sort_value, (str, int, float, datetime, type(None))):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return sort_value, item_id
+
+def apply_cursor(query: Dict[str, Any], sort_field: str, cursor: Optional[str], collection_name: str) -> Dict[str, Any]:
+    """Restrict a query to items after the cursor in (sort_field desc, id desc) order"""
+    if not cursor:
+        return query
+    sort_value, item_id = decode_cursor(cursor)
+    branches = [
+        {sort_field: {"$lt": sort_value}},
+        {sort_field: sort_value, "id": {"$lt": item_id}}
+    ]
+    # Strings sort below dates, so unmigrated documents always come after a date cursor
+    if isinstance(sort_value, datetime) and legacy_string_dates(collection_name):
+        branches.append({sort_field: {"$type": "string"}})
+    after = {"$or": branches}
+    return {"$and": [query, after]} if query else after
+
+def next_cursor_headers(page: List[Dict[str, Any]], sort_field: str, limit: int) -> Dict[str, str]:
+    """X-Next-Cursor header for the following page when this page is full"""
+    if len(page) == limit and page:
+        last = page[-1]
+        return {"X-Next-Cursor": encode_cursor(last.get(sort_field), last.get("id"))}
+    return {}
+
+# Process pool for parallel imports, created on first use
+_import_process_pool: Optional[ProcessPoolExecutor] = None
+
+def get_import_process_pool() -> ProcessPoolExecutor:
+    global _import_process_pool
+    if _import_process_pool is None:
+        # spawn keeps workers clear of the event loop and Mongo client threads
+        _import_process_pool = ProcessPoolExecutor(
+            max_workers=IMPORT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _import_process_pool
+
 # Authentication utility functions
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -394,6 +703,55 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+_password_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+# Recent samples behind GET /admin/metrics
+METRIC_SAMPLES = 1000
+password_hash_stats = {
+    "in_flight": 0,
+    "max_in_flight": 0,
+    "completed": 0,
+    "wait_ms": deque(maxlen=METRIC_SAMPLES),
+    "run_ms": deque(maxlen=METRIC_SAMPLES),
+}
+login_stats = {"succeeded": 0, "failed": 0, "latency_ms": deque(maxlen=METRIC_SAMPLES)}
+
+async def _run_password_task(func, *args):
+    """Run a bcrypt call in the password pool, recording queue wait and run time"""
+    submitted = time.perf_counter()
+    
+    def timed():
+        started = time.perf_counter()
+        return func(*args), started, time.perf_counter()
+    
+    password_hash_stats["in_flight"] += 1
+    password_hash_stats["max_in_flight"] = max(password_hash_stats["max_in_flight"], password_hash_stats["in_flight"])
+    try:
+        result, started, finished = await asyncio.get_running_loop().run_in_executor(_password_pool, timed)
+    finally:
+        password_hash_stats["in_flight"] -= 1
+    password_hash_stats["completed"] += 1
+    password_hash_stats["wait_ms"].append((started - submitted) * 1000)
+    password_hash_stats["run_ms"].append((finished - started) * 1000)
+    return result
+
+async def check_password(plain_password, hashed_password) -> bool:
+    return await _run_password_task(verify_password, plain_password, hashed_password)
+
+async def hash_password(password) -> str:
+    return await _run_password_task(get_password_hash, password)
+
+def latency_summary(samples) -> Dict[str, Any]:
+    """Count, p50, p95 and max of millisecond samples"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"samples": 0, "p50": None, "p95": None, "max": None}
+    
+    def percentile(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 1)
+    
+    return {"samples": len(ordered), "p50": percentile(0.5), "p95": percentile(0.95), "max": round(ordered[-1], 1)}
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -404,36 +762,169 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def create_user_access_token(user: Dict[str, Any]) -> str:
+    """Access token whose claims are enough to authorize a request without a user lookup"""
+    return create_access_token(
+        data={
+            "sub": user["email"],
+            "uid": user["id"],
+            "name": user["full_name"],
+            "role": user["role"],
+            "active": user.get("is_active", True),
+            "type": "access",
+            "jti": uuid.uuid4().hex,
+            # Sub-second iat so a token issued right after a user-wide revocation stays valid
+            "iat": time.time()
+        },
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+
+def _secret_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+async def issue_tokens(user: Dict[str, Any]) -> Dict[str, Any]:
+    """New access token plus a single-use refresh token stored (hashed) in db.refresh_tokens"""
+    refresh_token = secrets.token_urlsafe(32)
+    now = datetime.now(timezone.utc)
+    await db.refresh_tokens.insert_one({
+        "id": str(uuid.uuid4()),
+        "token_hash": _secret_hash(refresh_token),
+        "user_id": user["id"],
+        "created_at": now,
+        "expires_at": now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        "revoked_at": None
+    })
+    return {
+        "access_token": create_user_access_token(user),
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    }
+
+# Revoked access tokens, mirrored from db.token_revocations so checks need no query:
+# single tokens (jti -> expiry), and every token of a user issued before a point in time
+# (user id -> (issued_before, expiry)); expiries are Unix timestamps
+revoked_token_ids: Dict[str, float] = {}
+revoked_users: Dict[str, Tuple[float, float]] = {}
+
+def _add_user_revocation(users: Dict[str, Tuple[float, float]], user_id: str, issued_before: float, expires: float):
+    if user_id not in users or users[user_id][0] < issued_before:
+        users[user_id] = (issued_before, expires)
+
+async def sync_revocations():
+    """Reload the unexpired revocations written by any process, dropping expired ones"""
+    now = time.time()
+    token_ids = {}
+    users = {}
+    async for revocation in db.token_revocations.find({"expires_at": {"$gt": datetime.now(timezone.utc)}}, {"_id": 0}):
+        expires = revocation["expires_at"].timestamp()
+        if revocation.get("jti"):
+            token_ids[revocation["jti"]] = expires
+        elif revocation.get("user_id"):
+            _add_user_revocation(users, revocation["user_id"], revocation["issued_before"], expires)
+    # Keep unexpired revocations made here that the query may have missed
+    for jti, expires in revoked_token_ids.items():
+        if expires > now:
+            token_ids.setdefault(jti, expires)
+    for user_id, (issued_before, expires) in revoked_users.items():
+        if expires > now:
+            _add_user_revocation(users, user_id, issued_before, expires)
+    revoked_token_ids.clear()
+    revoked_token_ids.update(token_ids)
+    revoked_users.clear()
+    revoked_users.update(users)
+
+async def revoke_access_token(payload: Dict[str, Any]):
+    """Revoke one access token until it would have expired anyway"""
+    if not payload.get("jti"):
+        return
+    revoked_token_ids[payload["jti"]] = payload["exp"]
+    await db.token_revocations.insert_one({
+        "jti": payload["jti"],
+        "expires_at": datetime.fromtimestamp(payload["exp"], timezone.utc)
+    })
+
+async def revoke_user_tokens(user_id: str):
+    """Revoke every access and refresh token issued to a user so far"""
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    _add_user_revocation(revoked_users, user_id, now.timestamp(), expires_at.timestamp())
+    await db.token_revocations.insert_one({
+        "user_id": user_id,
+        "issued_before": now.timestamp(),
+        "expires_at": expires_at
+    })
+    await db.refresh_tokens.update_many({"user_id": user_id, "revoked_at": None}, {"$set": {"revoked_at": now}})
+
+def is_token_revoked(payload: Dict[str, Any]) -> bool:
+    if payload.get("jti") in revoked_token_ids:
+        return True
+    user_revocation = revoked_users.get(payload.get("uid"))
+    return user_revocation is not None and payload.get("iat", 0) <= user_revocation[0]
+
 async def get_user_by_email(email: str):
     user = await db.users.find_one({"email": email}, {"_id": 0})
     return parse_from_mongo(user) if user else None
 
 async def authenticate_user(email: str, password: str):
-    user = await get_user_by_email(email)
-    if not user:
-        return False
-    
-    # Get user with password for authentication
-    user_with_password = await db.users.find_one({"email": email})
-    if not user_with_password or not verify_password(password, user_with_password["hashed_password"]):
+    user = await db.users.find_one({"email": email}, {"_id": 0})
+    if not user or not await check_password(password, user["hashed_password"]):
         return False
-    return user
+    return parse_from_mongo(user)
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    credentials_exception = HTTPException(
+    return await user_from_token(credentials.credentials)
+
+# token -> decoded claims. Nothing about a user is cached: user writes revoke the
+# user's tokens, and every process picks that up through sync_revocations
+_token_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def token_payload(token: str) -> Dict[str, Any]:
+    """Verified claims of an access token, or raise 401"""
+    payload = _token_cache.get(token)
+    if payload is None or payload.get("exp", float("inf")) <= time.time():
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            raise _credentials_exception()
+        if payload.get("sub") is None:
+            raise _credentials_exception()
+        _token_cache[token] = payload
+    return payload
+
+async def user_from_token(token: str):
+    """Active user for an access token, or raise 401"""
+    return await user_from_payload(token_payload(token))
+
+async def user_from_payload(payload: Dict[str, Any]):
+    """Active user for verified access token claims, or raise 401"""
+    credentials_exception = _credentials_exception()
+    if payload.get("exp", float("inf")) <= time.time():
+        raise credentials_exception
+    email = payload["sub"]
     
-    try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
+    if payload.get("type") == "access":
+        # Claims-based token: authorized from the claims and the in-memory revocation set
+        if is_token_revoked(payload):
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+        if not payload.get("active"):
+            raise HTTPException(status_code=400, detail="Inactive user")
+        return {
+            "id": payload["uid"],
+            "email": email,
+            "full_name": payload.get("name"),
+            "role": payload["role"],
+            "is_active": True
+        }
     
+    # Tokens issued before claims were added still look the user up
     user = await get_user_by_email(email)
     if user is None:
         raise credentials_exception
@@ -453,10 +944,17 @@ def require_role(allowed_roles: List[UserRole]):
         return current_user
     return role_checker
 
+audit_writer = AuditWriter(
+    lambda: db.audit_logs,
+    queue_size=AUDIT_QUEUE_SIZE,
+    batch_size=AUDIT_BATCH_SIZE,
+    flush_ms=AUDIT_FLUSH_MS
+)
+
 async def log_audit(user_id: str, user_email: str, action: str, resource_type: str, 
                    resource_id: str = None, old_data: Dict = None, new_data: Dict = None,
-                   ip_address: str = None, user_agent: str = None):
-    """Log audit trail"""
+                   ip_address: str = None, user_agent: str = None, pre_image: Dict = None):
+    """Log audit trail; pre_image is the document a DELETE removed"""
     audit_log = AuditLog(
         user_id=user_id,
         user_email=user_email,
@@ -470,13 +968,156 @@ async def log_audit(user_id: str, user_email: str, action: str, resource_type: s
     )
     
     doc = prepare_for_mongo(audit_log.model_dump())
-    await db.audit_logs.insert_one(doc)
+    if pre_image is not None and AUDIT_DELETE_PRE_IMAGES:
+        doc["pre_image"] = pack_pre_image(pre_image)
+    await audit_writer.write([doc])
+
+async def log_audit_many(user_id: str, user_email: str, action: str, resource_type: str,
+                         entries: List[Dict[str, Any]]):
+    """Log one audit entry per item with a single insert; entries carry resource_id/old_data/new_data/pre_image"""
+    if not entries:
+        return
+    docs = []
+    for entry in entries:
+        entry = dict(entry)
+        pre_image = entry.pop("pre_image", None)
+        doc = prepare_for_mongo(AuditLog(
+            user_id=user_id,
+            user_email=user_email,
+            action=action,
+            resource_type=resource_type,
+            **entry
+        ).model_dump())
+        if pre_image is not None and AUDIT_DELETE_PRE_IMAGES:
+            doc["pre_image"] = pack_pre_image(pre_image)
+        docs.append(doc)
+    await audit_writer.write(docs)
+
+COMPANY_MANDATORY_FIELDS = [
+    ("company_name", "Company Name"),
+    ("company_service_type", "Service Type"),
+    ("company_driver_details", "Driver"),
+    ("company_towing_vehicle", "Towing Vehicle"),
+]
+
+def _is_blank(value: Any) -> bool:
+    return not value or (isinstance(value, str) and value.strip() == "")
+
+def missing_company_fields(order_data: Dict[str, Any]) -> List[str]:
+    """Return labels of mandatory company-order fields that are empty"""
+    if order_data.get("order_type") != "company":
+        return []
+    missing_fields = []
+    for field, label in COMPANY_MANDATORY_FIELDS:
+        if _is_blank(order_data.get(field, "")):
+            missing_fields.append(label)
+    return missing_fields
+
+def company_fields_error(missing_fields: List[str]) -> str:
+    return f"The following fields are required for company orders: {', '.join(missing_fields)}"
+
+def _filled_filter(field: str) -> Dict[str, Any]:
+    """Stored field holds a non-blank string"""
+    condition = {field: {"$regex": r"\S"}}
+    canonical = ORDER_FIELD_ALIASES.get(field)
+    if canonical is None:
+        return condition
+    # Compact storage omits an alias that equals its canonical field
+    return {"$or": [condition, {field: {"$exists": False}, canonical: {"$regex": r"\S"}}]}
+
+def company_rule_filter(update_dict: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Filter on the stored order that matches only when applying update_dict keeps the
+    company mandatory-field rule satisfied; None when no stored order could pass"""
+    blank_update = any(field in update_dict and _is_blank(update_dict[field]) for field, _ in COMPANY_MANDATORY_FIELDS)
+    stored_checks = [_filled_filter(field) for field, _ in COMPANY_MANDATORY_FIELDS if field not in update_dict]
+    if blank_update:
+        company_ok = None
+    else:
+        company_ok = {"$and": stored_checks} if stored_checks else {}
+    
+    order_type = update_dict.get("order_type")
+    if order_type is not None and order_type != "company":
+        return {}
+    if order_type == "company" or company_ok == {}:
+        return company_ok
+    # Order type unchanged: the rule only applies if the stored order is a company order
+    not_company = {"order_type": {"$ne": "company"}}
+    return not_company if company_ok is None else {"$or": [not_company, company_ok]}
+
+# Startup warmup (admin user, service rates, seeding) runs as tracked background tasks
+APP_STARTED_AT = datetime.now(timezone.utc)
+warmup_status: Dict[str, Dict[str, Any]] = {}
+_background_tasks = set()
+
+def track_background_task(coro, name: str) -> asyncio.Task:
+    """Create a task and keep a reference to it until it finishes"""
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+def start_warmup_task(name: str, coro_factory, required: bool = True) -> asyncio.Task:
+    """Run a warmup step in the background and record its progress for /health/ready.
+
+    Tasks with required=False (online migrations) are reported but do not hold back readiness.
+    """
+    state = warmup_status[name] = {
+        "status": "running",
+        "required": required,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "finished_at": None,
+        "progress": None,
+        "error": None
+    }
+    
+    async def runner():
+        try:
+            await coro_factory(state)
+            state["status"] = "done"
+        except asyncio.CancelledError:
+            state["status"] = "cancelled"
+            raise
+        except Exception as e:
+            state["status"] = "failed"
+            state["error"] = str(e)
+            logging.error(f"Warmup task {name} failed: {str(e)}")
+        finally:
+            state["finished_at"] = datetime.now(timezone.utc).isoformat()
+    
+    return track_background_task(runner(), f"warmup:{name}")
 
 # API Endpoints
 @api_router.get("/")
 async def root():
     return {"message": "Kawale Cranes Data Entry System with Authentication"}
 
+@api_router.get("/health/live")
+async def health_live():
+    """Liveness probe: the process is up and serving requests"""
+    return {
+        "status": "alive",
+        "uptime_seconds": round((datetime.now(timezone.utc) - APP_STARTED_AT).total_seconds(), 1)
+    }
+
+@api_router.get("/health/ready")
+async def health_ready():
+    """Readiness probe: the database answers and every warmup task has finished"""
+    try:
+        await asyncio.wait_for(db.command("ping"), timeout=2)
+        database_ok = True
+    except Exception:
+        database_ok = False
+    
+    ready = database_ok and all(state["status"] == "done" for state in warmup_status.values() if state["required"])
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "starting",
+            "database": "ok" if database_ok else "unreachable",
+            "tasks": warmup_status
+        }
+    )
+
 # Authentication endpoints
 @api_router.post("/auth/register", response_model=User)
 async def register_user(user_data: UserCreate, current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN, UserRole.ADMIN]))):
@@ -487,7 +1128,7 @@ async def register_user(user_data: UserCreate, current_user: dict = Depends(requ
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Hash password
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     
     # Create user
     user = User(
@@ -518,25 +1159,26 @@ async def register_user(user_data: UserCreate, current_user: dict = Depends(requ
 @api_router.post("/auth/login", response_model=Token)
 async def login(user_credentials: UserLogin):
     """Authenticate user and return token"""
+    started = time.perf_counter()
     user = await authenticate_user(user_credentials.email, user_credentials.password)
+    login_stats["latency_ms"].append((time.perf_counter() - started) * 1000)
     if not user:
+        login_stats["failed"] += 1
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    login_stats["succeeded"] += 1
+    
     # Update last login
     await db.users.update_one(
         {"email": user["email"]},
-        {"$set": {"last_login": datetime.now(timezone.utc).isoformat()}}
+        {"$set": {"last_login": datetime.now(timezone.utc)}}
     )
     
-    # Create access token
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user["email"]}, expires_delta=access_token_expires
-    )
+    tokens = await issue_tokens(user)
     
     # Log audit
     await log_audit(
@@ -547,20 +1189,58 @@ async def login(user_credentials: UserLogin):
         resource_id=user["id"]
     )
     
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "user": User(**user)
-    }
+    return {**tokens, "user": User(**user)}
+
+@api_router.post("/auth/refresh", response_model=Token)
+async def refresh_access_token(refresh_request: RefreshRequest):
+    """Exchange a refresh token for a new access token and refresh token"""
+    now = datetime.now(timezone.utc)
+    # Refresh tokens are single use: the lookup also revokes it
+    record = await db.refresh_tokens.find_one_and_update(
+        {"token_hash": _secret_hash(refresh_request.refresh_token), "revoked_at": None, "expires_at": {"$gt": now}},
+        {"$set": {"revoked_at": now}}
+    )
+    if not record:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    user = await db.users.find_one({"id": record["user_id"]}, {"_id": 0, "hashed_password": 0})
+    if not user or not user.get("is_active", True):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User is no longer active",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    user = parse_from_mongo(user)
+    return {**await issue_tokens(user), "user": User(**user)}
 
 @api_router.get("/auth/me", response_model=User)
 async def get_current_user_info(current_user: dict = Depends(get_current_user)):
     """Get current user information"""
-    return User(**current_user)
+    user = await get_user_by_email(current_user["email"])
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return User(**user)
 
 @api_router.post("/auth/logout")
-async def logout(current_user: dict = Depends(get_current_user)):
-    """Logout user (mainly for audit trail)"""
+async def logout(
+    logout_request: Optional[LogoutRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: dict = Depends(get_current_user)
+):
+    """Logout user: revoke the access token and, if given, the refresh token"""
+    payload = jwt.get_unverified_claims(credentials.credentials)
+    await revoke_access_token(payload)
+    if logout_request and logout_request.refresh_token:
+        await db.refresh_tokens.update_one(
+            {"token_hash": _secret_hash(logout_request.refresh_token), "user_id": current_user["id"], "revoked_at": None},
+            {"$set": {"revoked_at": datetime.now(timezone.utc)}}
+        )
+    
     # Log audit
     await log_audit(
         user_id=current_user["id"],
@@ -596,7 +1276,7 @@ async def change_password(
             raise HTTPException(status_code=404, detail="User not found")
         
         # Verify current password
-        if not bcrypt.checkpw(current_password.encode('utf-8'), user["hashed_password"].encode('utf-8')):
+        if not await check_password(current_password, user["hashed_password"]):
             raise HTTPException(status_code=400, detail="Current password is incorrect")
         
         # Check if new password is same as current
@@ -604,7 +1284,7 @@ async def change_password(
             raise HTTPException(status_code=400, detail="New password must be different from current password")
         
         # Hash new password
-        hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        hashed_password = await hash_password(new_password)
         
         # Update password
         result = await db.users.update_one(
@@ -626,7 +1306,9 @@ async def change_password(
             new_data={"password": "***", "changed_by": "self"}
         )
         
-        return {"message": "Password changed successfully"}
+        # Sign out every other session; this one continues with a fresh token pair
+        await revoke_user_tokens(current_user["id"])
+        return {"message": "Password changed successfully", **await issue_tokens(user)}
     
     except Exception as e:
         if isinstance(e, HTTPException):
@@ -666,19 +1348,23 @@ async def update_user(
             {"id": user_id},
             {"$set": prepared_update}
         )
+        # Tokens carry these as claims, so outstanding ones would keep the old values
+        if any(field in update_dict and update_dict[field] != existing_user.get(field) for field in ("role", "is_active", "email", "full_name")):
+            await revoke_user_tokens(user_id)
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Log audit
+        old_values, new_values = field_changes(existing_user, prepared_update)
         await log_audit(
             user_id=current_user["id"],
             user_email=current_user["email"],
             action="UPDATE",
             resource_type="USER",
             resource_id=user_id,
-            old_data=existing_user,
-            new_data=update_dict
+            old_data=old_values,
+            new_data=new_values
         )
     
     # Return updated user
@@ -702,6 +1388,7 @@ async def delete_user(
             raise HTTPException(status_code=404, detail="User not found")
         
         result = await db.users.delete_one({"id": user_id})
+        await revoke_user_tokens(user_id)
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="User not found")
@@ -713,7 +1400,7 @@ async def delete_user(
             action="DELETE",
             resource_type="USER",
             resource_id=user_id,
-            old_data=existing_user
+            pre_image=existing_user
         )
         
         return {"message": "User deleted successfully"}
@@ -747,13 +1434,14 @@ async def reset_user_password(
             raise HTTPException(status_code=404, detail="User not found")
         
         # Hash new password
-        hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        hashed_password = await hash_password(new_password)
         
         # Update password
         result = await db.users.update_one(
             {"id": user_id},
             {"$set": {"hashed_password": hashed_password}}
         )
+        await revoke_user_tokens(user_id)
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="User not found")
@@ -795,30 +1483,12 @@ async def create_order(
     order_obj = CraneOrder(**order_dict)
     
     # Validate mandatory fields for company orders
-    if order_obj.order_type == "company":
-        missing_fields = []
-        
-        if not order_obj.company_name or order_obj.company_name.strip() == "":
-            missing_fields.append("Company Name")
-        
-        if not order_obj.company_service_type or order_obj.company_service_type.strip() == "":
-            missing_fields.append("Service Type")
-        
-        if not order_obj.company_driver_details or order_obj.company_driver_details.strip() == "":
-            missing_fields.append("Driver")
-        
-        if not order_obj.company_towing_vehicle or order_obj.company_towing_vehicle.strip() == "":
-            missing_fields.append("Towing Vehicle")
-        
-        if missing_fields:
-            field_list = ", ".join(missing_fields)
-            raise HTTPException(
-                status_code=422, 
-                detail=f"The following fields are required for company orders: {field_list}"
-            )
+    missing_fields = missing_company_fields(order_obj.model_dump())
+    if missing_fields:
+        raise HTTPException(status_code=422, detail=company_fields_error(missing_fields))
     
     # Convert to dict and serialize datetime fields for MongoDB
-    doc = prepare_for_mongo(order_obj.model_dump())
+    doc = compact_order(with_search_keys(prepare_for_mongo(order_obj.model_dump())))
     
     try:
         result = await db.crane_orders.insert_one(doc)
@@ -832,12 +1502,243 @@ async def create_order(
             resource_id=order_obj.id,
             new_data=order_dict
         )
+        publish_order_event("created", order_obj.id, order=doc)
         
         return order_obj
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating order: {str(e)}")
 
-@api_router.get("/orders", response_model=List[CraneOrder])
+def _build_order(payload: Dict[str, Any], created_by: str):
+    """Validate one create payload the same way create_order does; returns (order_obj, new_data, errors)"""
+    try:
+        order_input = CraneOrderCreate.model_validate(payload)
+    except ValidationError as e:
+        errors = [f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()]
+        return None, None, errors
+    
+    order_dict = order_input.model_dump(exclude_unset=True)
+    if not order_dict.get('date_time'):
+        order_dict['date_time'] = datetime.now(timezone.utc)
+    order_dict['created_by'] = created_by
+    
+    order_obj = CraneOrder(**order_dict)
+    missing_fields = missing_company_fields(order_obj.model_dump())
+    if missing_fields:
+        return None, None, [company_fields_error(missing_fields)]
+    return order_obj, order_dict, []
+
+@api_router.post("/orders/bulk")
+async def create_orders_bulk(
+    bulk_request: BulkOrderCreate,
+    current_user: dict = Depends(get_current_user)
+):
+    """Create many crane orders in one request with per-item results"""
+    try:
+        results = []
+        valid = []  # (index, order_obj, order_dict)
+        
+        for index, payload in enumerate(bulk_request.orders):
+            order_obj, order_dict, errors = _build_order(payload, current_user["id"])
+            if errors:
+                results.append({"index": index, "status": "invalid", "id": None, "errors": errors})
+            else:
+                valid.append((index, order_obj, order_dict))
+        
+        failed_positions = {}
+        if valid:
+            docs = [compact_order(with_search_keys(prepare_for_mongo(order_obj.model_dump()))) for _, order_obj, _ in valid]
+            try:
+                await db.crane_orders.insert_many(docs, ordered=False)
+            except BulkWriteError as bwe:
+                for err in bwe.details.get("writeErrors", []):
+                    failed_positions[err["index"]] = err.get("errmsg", "Write failed")
+        
+        audit_entries = []
+        for position, (index, order_obj, order_dict) in enumerate(valid):
+            if position in failed_positions:
+                results.append({"index": index, "status": "error", "id": order_obj.id, "errors": [failed_positions[position]]})
+            else:
+                results.append({"index": index, "status": "created", "id": order_obj.id, "errors": []})
+                audit_entries.append({"resource_id": order_obj.id, "new_data": order_dict})
+                publish_order_event("created", order_obj.id, order=docs[position])
+        
+        await log_audit_many(
+            user_id=current_user["id"],
+            user_email=current_user["email"],
+            action="CREATE",
+            resource_type="ORDER",
+            entries=audit_entries
+        )
+        
+        results.sort(key=lambda item: item["index"])
+        created_count = len(audit_entries)
+        return {
+            "total": len(bulk_request.orders),
+            "created": created_count,
+            "failed": len(bulk_request.orders) - created_count,
+            "results": results
+        }
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
+        raise HTTPException(status_code=500, detail=f"Error creating orders: {str(e)}")
+
+@api_router.post("/orders/bulk-delete")
+async def delete_orders_bulk(
+    bulk_request: BulkOrderDelete,
+    current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN, UserRole.ADMIN]))
+):
+    """Delete many crane orders with one lookup, one delete and one audit insert (Admin and Super Admin only)"""
+    try:
+        order_ids = list(dict.fromkeys(bulk_request.ids))
+        
+        # Capture pre-images for the audit log
+        existing_orders = await db.crane_orders.find({"id": {"$in": order_ids}}, {"_id": 0}).to_list(len(order_ids))
+        found_ids = [order["id"] for order in existing_orders]
+        
+        deleted_count = 0
+        if found_ids:
+            result = await db.crane_orders.delete_many({"id": {"$in": found_ids}})
+            deleted_count = result.deleted_count
+        
+        await log_audit_many(
+            user_id=current_user["id"],
+            user_email=current_user["email"],
+            action="DELETE",
+            resource_type="ORDER",
+            entries=[{"resource_id": order["id"], "pre_image": order} for order in existing_orders]
+        )
+        for order_id in found_ids:
+            publish_order_event("deleted", order_id)
+        
+        found = set(found_ids)
+        return {
+            "requested": len(order_ids),
+            "deleted": deleted_count,
+            "not_found": [order_id for order_id in order_ids if order_id not in found]
+        }
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
+        raise HTTPException(status_code=500, detail=f"Error deleting orders: {str(e)}")
+
+def bulk_filter_query(order_filter: BulkOrderFilter) -> Dict[str, Any]:
+    """Mongo query for a bulk update filter; 400 when it has no conditions"""
+    conditions = []
+    if order_filter.order_type:
+        conditions.append({"order_type": order_filter.order_type})
+    search = order_search_filter(order_filter.customer_name, order_filter.phone)
+    if search:
+        conditions.append(search)
+    if order_filter.driver_name:
+        conditions.append({"$or": [
+            {"cash_driver_name": order_filter.driver_name},
+            {"company_driver_name": order_filter.driver_name}
+        ]})
+    if order_filter.towing_vehicle:
+        conditions.append({"$or": [
+            {"cash_towing_vehicle": order_filter.towing_vehicle},
+            {"company_towing_vehicle": order_filter.towing_vehicle}
+        ]})
+    date_range = date_range_filter("date_time", order_filter.start_date, order_filter.end_date, inclusive_end=True)
+    if date_range:
+        conditions.append(date_range)
+    if not conditions:
+        raise HTTPException(status_code=400, detail="filter needs at least one condition")
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+@api_router.post("/orders/bulk-update")
+async def update_orders_bulk(
+    bulk_request: BulkOrderUpdate,
+    current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN, UserRole.ADMIN]))
+):
+    """Apply one field patch to many crane orders, selected by ids or a filter (Admin and Super Admin only)"""
+    if (bulk_request.ids is None) == (bulk_request.filter is None):
+        raise HTTPException(status_code=400, detail="Provide either ids or filter")
+    
+    update_dict = bulk_request.patch.model_dump(exclude_unset=True, exclude_none=True)
+    if not update_dict:
+        raise HTTPException(status_code=400, detail="patch has no fields to set")
+    
+    # The company rule is checked once for the patch; orders it would break are skipped
+    rule_filter = company_rule_filter(update_dict)
+    if rule_filter is None:
+        blank = [label for field, label in COMPANY_MANDATORY_FIELDS if field in update_dict and _is_blank(update_dict[field])]
+        raise HTTPException(status_code=422, detail=company_fields_error(blank))
+    
+    if bulk_request.ids is not None:
+        selector = {"id": {"$in": list(dict.fromkeys(bulk_request.ids))}}
+    else:
+        selector = bulk_filter_query(bulk_request.filter)
+    
+    try:
+        matched_count = await db.crane_orders.count_documents(selector)
+        if matched_count > BULK_UPDATE_LIMIT:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Filter matches {matched_count} orders; at most {BULK_UPDATE_LIMIT} can be updated at once"
+            )
+        
+        # Previous values of the patched fields, for the batch audit entry
+        patched_fields = (*update_dict, "updated_by", "updated_at")
+        targets = await db.crane_orders.find(
+            {"$and": [selector, rule_filter]} if rule_filter else selector,
+            order_projection(patched_fields, "id")
+        ).to_list(matched_count)
+        target_ids = [order["id"] for order in targets]
+        
+        update_dict['updated_by'] = current_user["id"]
+        update_dict['updated_at'] = datetime.now(timezone.utc)
+        prepared_update = prepare_for_mongo(update_dict)
+        search_keys = search_key_fields(update_dict)
+        if "customer_name" in update_dict:
+            prepared_update["search_name_tokens"] = search_keys["search_name_tokens"]
+        if "phone" in update_dict:
+            prepared_update["search_phone"] = search_keys["search_phone"]
+        
+        modified_count = 0
+        if target_ids:
+            # The rule filter is repeated so an order changed since the lookup is not broken
+            result = await db.crane_orders.update_many(
+                {"id": {"$in": target_ids}, **rule_filter},
+                compact_set(prepared_update)
+            )
+            modified_count = result.modified_count
+            for order_id in target_ids:
+                publish_order_event("updated", order_id, changes=prepared_update)
+        
+        # One audit entry for the batch: the patch, and the old values per order
+        await log_audit(
+            user_id=current_user["id"],
+            user_email=current_user["email"],
+            action="BULK_UPDATE",
+            resource_type="ORDER",
+            resource_id=f"{len(target_ids)} orders",
+            old_data={
+                order["id"]: {field: expand_order(order).get(field) for field in patched_fields}
+                for order in targets
+            },
+            new_data={
+                "patch": update_dict,
+                "selector": {"ids": bulk_request.ids} if bulk_request.ids is not None
+                            else {"filter": bulk_request.filter.model_dump(exclude_none=True)},
+                "order_ids": target_ids
+            }
+        )
+        
+        return {
+            "matched": matched_count,
+            "updated": modified_count,
+            "skipped": matched_count - len(target_ids),
+            "message": f"Updated {modified_count} order(s)"
+        }
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
+        raise HTTPException(status_code=500, detail=f"Error updating orders: {str(e)}")
+
+# Responses are shaped and encoded directly (trusted_json_response); the model only documents them
+@api_router.get("/orders", response_model=None, responses={200: {"model": List[CraneOrder]}})
 async def get_orders(
     current_user: dict = Depends(get_current_user),
     order_type: Optional[str] = Query(None, description="Filter by order type (cash/company)"),
@@ -845,46 +1746,196 @@ async def get_orders(
     phone: Optional[str] = Query(None, description="Filter by phone number"),
     date: Optional[str] = Query(None, description="Filter by specific date (YYYY-MM-DD format)"),
     limit: int = Query(100, ge=1, le=1000, description="Number of orders to return"),
-    skip: int = Query(0, ge=0, description="Number of orders to skip")
+    skip: int = Query(0, ge=0, description="Number of orders to skip"),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    fields: Optional[str] = Query(None, description=ORDER_FIELDS_DESCRIPTION)
 ):
-    """Get all crane orders"""
+    """Get all crane orders, newest first; follow X-Next-Cursor with after= to page"""
+    selected = parse_order_fields(fields)
     query = {}
     
     # Build query filters
     if order_type:
         query["order_type"] = order_type
-    if customer_name:
-        query["customer_name"] = {"$regex": customer_name, "$options": "i"}
-    if phone:
-        query["phone"] = {"$regex": phone, "$options": "i"}
+    query.update(order_search_filter(customer_name, phone))
     if date:
-        # Filter by date (match orders where date_time starts with the given date)
-        query["date_time"] = {"$regex": f"^{date}"}
+        # Filter by calendar day (UTC) as an index range
+        try:
+            day_start = datetime.strptime(date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="date must be in YYYY-MM-DD format")
+        query.update(date_range_filter("date_time", day_start, day_start + timedelta(days=1)))
     
     try:
         # Exclude MongoDB's _id field from results
-        orders = await db.crane_orders.find(query, {"_id": 0}).sort("date_time", -1).skip(skip).limit(limit).to_list(limit)
-        
-        # Parse datetime fields from MongoDB
-        parsed_orders = [parse_from_mongo(order) for order in orders]
-        
-        return parsed_orders
+        query = apply_cursor(query, "date_time", after, "crane_orders")
+        # date_time is always read back because the next-page cursor is built from it
+        projection = order_projection(selected, "date_time")
+        orders = await db.crane_orders.find(query, projection).sort([("date_time", -1), ("id", -1)]).skip(skip).limit(limit).to_list(limit)
+        
+        return trusted_json_response(
+            shape_trusted_documents(orders, selected or ORDER_RESPONSE_FIELDS),
+            headers=next_cursor_headers(orders, "date_time", limit)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching orders: {str(e)}")
 
+async def _order_event_source(request: Request, queue: asyncio.Queue, payload: Dict[str, Any]):
+    loop = asyncio.get_running_loop()
+    try:
+        # Reconnect delay for EventSource after a dropped connection
+        yield "retry: 5000\n\n"
+        next_auth_check = loop.time() + ORDER_STREAM_HEARTBEAT_SECONDS
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=ORDER_STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                event = False
+            if loop.time() >= next_auth_check:
+                next_auth_check = loop.time() + ORDER_STREAM_HEARTBEAT_SECONDS
+                try:
+                    await user_from_payload(payload)
+                except HTTPException as e:
+                    # Expired or revoked since the stream opened; the client needs a new ticket
+                    yield f"event: unauthorized\ndata: {encode_json({'detail': e.detail}).decode()}\n\n"
+                    break
+            if event is False:
+                if await request.is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                break
+            yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {encode_json(event).decode()}\n\n"
+    finally:
+        order_events.unsubscribe(queue)
+
+@api_router.post("/orders/stream/ticket")
+async def create_order_stream_ticket(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Single-use ticket for opening GET /orders/stream from EventSource clients.
+
+    EventSource cannot send an Authorization header, and an access token in
+    the URL would end up in access logs and browser history. The ticket is
+    valid for ORDER_STREAM_TICKET_SECONDS and only for the first connection.
+    """
+    payload = token_payload(credentials.credentials)
+    await user_from_payload(payload)
+    ticket = secrets.token_urlsafe(32)
+    now = datetime.now(timezone.utc)
+    await db.stream_tickets.insert_one({
+        "ticket_hash": _secret_hash(ticket),
+        "payload": payload,
+        "created_at": now,
+        "expires_at": now + timedelta(seconds=ORDER_STREAM_TICKET_SECONDS)
+    })
+    return {"ticket": ticket, "expires_in": ORDER_STREAM_TICKET_SECONDS}
+
+@api_router.get("/orders/stream")
+async def stream_order_events(
+    request: Request,
+    ticket: Optional[str] = Query(None, description="Single-use ticket from POST /orders/stream/ticket, for EventSource clients that cannot send an Authorization header")
+):
+    """Server-sent events for order creates, updates and deletes.
+
+    The stream ends with an "unauthorized" event once its access token expires
+    or is revoked.
+    """
+    if ticket is not None:
+        # Tickets are single use: the lookup also removes it
+        record = await db.stream_tickets.find_one_and_delete(
+            {"ticket_hash": _secret_hash(ticket), "expires_at": {"$gt": datetime.now(timezone.utc)}}
+        )
+        if not record:
+            raise HTTPException(status_code=401, detail="Invalid or expired stream ticket")
+        payload = record["payload"]
+    else:
+        scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not credentials:
+            raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+        payload = token_payload(credentials)
+    await user_from_payload(payload)
+    
+    return StreamingResponse(
+        _order_event_source(request, order_events.subscribe(), payload),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/orders/search")
+async def search_orders(
+    current_user: dict = Depends(get_current_user),
+    q: str = Query(..., min_length=1, max_length=200, description="Words or \"quoted phrases\" to find in vehicle numbers, case IDs, trip locations, drivers and customers"),
+    order_type: Optional[str] = Query(None, description="Filter by order type (cash/company)"),
+    limit: int = Query(20, ge=1, le=100, description="Number of results to return"),
+    skip: int = Query(0, ge=0, description="Number of results to skip"),
+    fields: Optional[str] = Query(None, description=ORDER_FIELDS_DESCRIPTION)
+):
+    """Full-text order search ranked by relevance, then newest first.
+
+    The text index matches whole words only: "MH12" finds "MH12 AB 1234" but
+    not "MH12AB1234". When no order matches whole words, the search falls
+    back to prefixes of customer-name words, or of the phone number when q is
+    a number ("match": "prefix", newest first, no score).
+    """
+    selected = parse_order_fields(fields)
+    type_filter = {"order_type": order_type} if order_type else {}
+    query = {"$text": {"$search": q}, **type_filter}
+    
+    try:
+        # Fetch one extra result to know whether another page exists
+        orders = await db.crane_orders.find(
+            query,
+            {**order_projection(selected), "score": {"$meta": "textScore"}}
+        ).sort([("score", {"$meta": "textScore"}), ("date_time", -1)]).skip(skip).limit(limit + 1).to_list(limit + 1)
+        
+        match = "text"
+        if not orders and (skip == 0 or await db.crane_orders.find_one(query, {"_id": 1}) is None):
+            is_phone = re.fullmatch(r"[\d\s+()-]+", q) is not None
+            fragment_filter = order_search_filter(phone=q) if is_phone else order_search_filter(customer_name=q)
+            match = "prefix"
+            orders = await db.crane_orders.find(
+                {**fragment_filter, **type_filter},
+                order_projection(selected)
+            ).sort([("date_time", -1), ("id", -1)]).skip(skip).limit(limit + 1).to_list(limit + 1)
+        
+        page = orders[:limit]
+        results = shape_trusted_documents(page, selected or ORDER_RESPONSE_FIELDS)
+        for result, order in zip(results, page):
+            result["score"] = round(order["score"], 3) if "score" in order else None
+        
+        return trusted_json_response({
+            "query": q,
+            "match": match,
+            "results": results,
+            "skip": skip,
+            "limit": limit,
+            "has_more": len(orders) > limit
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching orders: {str(e)}")
+
 @api_router.get("/orders/{order_id}", response_model=CraneOrder)
 async def get_order(
     order_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    fields: Optional[str] = Query(None, description=ORDER_FIELDS_DESCRIPTION)
 ):
     """Get a specific crane order by ID"""
+    selected = parse_order_fields(fields)
     try:
-        order = await db.crane_orders.find_one({"id": order_id}, {"_id": 0})
+        order = await db.crane_orders.find_one({"id": order_id}, order_projection(selected))
         
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
         
-        return parse_from_mongo(order)
+        if selected is not None:
+            slim = slim_order_model(selected).model_validate(parse_order_from_mongo(order))
+            return trusted_json_response(slim.model_dump(mode="json"))
+        return parse_order_from_mongo(order)
     except Exception as e:
         if isinstance(e, HTTPException):
             raise e
@@ -898,75 +1949,67 @@ async def update_order(
 ):
     """Update a specific crane order"""
     try:
-        # Check if order exists
-        existing_order = await db.crane_orders.find_one({"id": order_id}, {"_id": 0})
-        if not existing_order:
-            raise HTTPException(status_code=404, detail="Order not found")
-        
         # Prepare update data
         update_dict = update_data.model_dump(exclude_unset=True, exclude_none=True)
         
-        if update_dict:
-            # Create a combined dict of existing order + updates for validation
-            combined_data = {**existing_order, **update_dict}
-            
-            # Validate mandatory fields for company orders
-            if combined_data.get("order_type") == "company":
-                missing_fields = []
-                
-                company_name = combined_data.get("company_name", "")
-                if not company_name or (isinstance(company_name, str) and company_name.strip() == ""):
-                    missing_fields.append("Company Name")
-                
-                company_service_type = combined_data.get("company_service_type", "")
-                if not company_service_type or (isinstance(company_service_type, str) and company_service_type.strip() == ""):
-                    missing_fields.append("Service Type")
-                
-                company_driver_details = combined_data.get("company_driver_details", "")
-                if not company_driver_details or (isinstance(company_driver_details, str) and company_driver_details.strip() == ""):
-                    missing_fields.append("Driver")
-                
-                company_towing_vehicle = combined_data.get("company_towing_vehicle", "")
-                if not company_towing_vehicle or (isinstance(company_towing_vehicle, str) and company_towing_vehicle.strip() == ""):
-                    missing_fields.append("Towing Vehicle")
-                
-                if missing_fields:
-                    field_list = ", ".join(missing_fields)
-                    raise HTTPException(
-                        status_code=422, 
-                        detail=f"The following fields are required for company orders: {field_list}"
-                    )
-            
-            # Add audit fields
-            update_dict['updated_by'] = current_user["id"]
-            update_dict['updated_at'] = datetime.now(timezone.utc)
-            
-            # Serialize datetime fields
-            prepared_update = prepare_for_mongo(update_dict)
-            
-            # Update the order
-            result = await db.crane_orders.update_one(
-                {"id": order_id},
-                {"$set": prepared_update}
-            )
-            
-            if result.matched_count == 0:
+        if not update_dict:
+            order = await db.crane_orders.find_one({"id": order_id}, {"_id": 0})
+            if not order:
                 raise HTTPException(status_code=404, detail="Order not found")
-            
-            # Log audit
-            await log_audit(
-                user_id=current_user["id"],
-                user_email=current_user["email"],
-                action="UPDATE",
-                resource_type="ORDER",
-                resource_id=order_id,
-                old_data=existing_order,
-                new_data=update_dict
+            return parse_order_from_mongo(order)
+        
+        # Add audit fields
+        update_dict['updated_by'] = current_user["id"]
+        now = datetime.now(timezone.utc)
+        # BSON dates keep milliseconds; match what a re-read would return
+        update_dict['updated_at'] = now.replace(microsecond=now.microsecond - now.microsecond % 1000)
+        
+        # Serialize datetime fields
+        prepared_update = prepare_for_mongo(update_dict)
+        search_keys = search_key_fields(update_dict)
+        if "customer_name" in update_dict:
+            prepared_update["search_name_tokens"] = search_keys["search_name_tokens"]
+        if "phone" in update_dict:
+            prepared_update["search_phone"] = search_keys["search_phone"]
+        
+        # The mandatory company fields are checked against the pre-image by the
+        # filter, so the update is a single round trip returning the old order
+        rule_filter = company_rule_filter(update_dict)
+        previous_order = None
+        if rule_filter is not None:
+            previous_order = await db.crane_orders.find_one_and_update(
+                {"id": order_id, **rule_filter},
+                compact_set(prepared_update),
+                projection={"_id": 0},
+                return_document=ReturnDocument.BEFORE
             )
         
-        # Fetch and return updated order
-        updated_order = await db.crane_orders.find_one({"id": order_id}, {"_id": 0})
-        return parse_from_mongo(updated_order)
+        if previous_order is None:
+            # Either the order is missing or the update breaks the company rule
+            order = await db.crane_orders.find_one({"id": order_id}, {"_id": 0})
+            if not order:
+                raise HTTPException(status_code=404, detail="Order not found")
+            missing_fields = missing_company_fields({**expand_order(order), **update_dict})
+            if missing_fields:
+                raise HTTPException(status_code=422, detail=company_fields_error(missing_fields))
+            raise HTTPException(status_code=409, detail="Order changed during the update, please retry")
+        
+        # Log audit: only the fields this update changed
+        old_values, new_values = field_changes(expand_order(dict(previous_order)), prepared_update)
+        await log_audit(
+            user_id=current_user["id"],
+            user_email=current_user["email"],
+            action="UPDATE",
+            resource_type="ORDER",
+            resource_id=order_id,
+            old_data=old_values,
+            new_data=new_values
+        )
+        
+        # The updated order is the pre-image with the $set values applied
+        updated_order = apply_set(previous_order, prepared_update)
+        publish_order_event("updated", order_id, order=updated_order, changes=prepared_update)
+        return parse_order_from_mongo(updated_order)
     
     except Exception as e:
         if isinstance(e, HTTPException):
@@ -1008,6 +2051,7 @@ async def delete_all_orders(
             resource_type="ORDER",
             new_data={"deleted_count": result.deleted_count}
         )
+        publish_order_event("refresh")
         
         return {
             "message": f"Successfully deleted all {result.deleted_count} orders",
@@ -1054,16 +2098,11 @@ async def delete_order(
 ):
     """Delete a specific crane order (Admin and Super Admin only)"""
     try:
-        # Get order for audit log
-        existing_order = await db.crane_orders.find_one({"id": order_id}, {"_id": 0})
+        # The deleted document comes back for the audit log
+        existing_order = await db.crane_orders.find_one_and_delete({"id": order_id}, projection={"_id": 0})
         if not existing_order:
             raise HTTPException(status_code=404, detail="Order not found")
         
-        result = await db.crane_orders.delete_one({"id": order_id})
-        
-        if result.deleted_count == 0:
-            raise HTTPException(status_code=404, detail="Order not found")
-        
         # Log audit
         await log_audit(
             user_id=current_user["id"],
@@ -1071,8 +2110,9 @@ async def delete_order(
             action="DELETE",
             resource_type="ORDER",
             resource_id=order_id,
-            old_data=existing_order
+            pre_image=existing_order
         )
+        publish_order_event("deleted", order_id)
         
         return {"message": "Order deleted successfully"}
     
@@ -1130,14 +2170,15 @@ async def get_orders_summary(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=f"Error fetching summary: {str(e)}")
 
 # Audit endpoints
-@api_router.get("/audit-logs", response_model=List[AuditLog])
+@api_router.get("/audit-logs", response_model=None, responses={200: {"model": List[AuditLog]}})
 async def get_audit_logs(
     current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN, UserRole.ADMIN])),
     resource_type: Optional[str] = Query(None, description="Filter by resource type (USER/ORDER)"),
     action: Optional[str] = Query(None, description="Filter by action (CREATE/UPDATE/DELETE/LOGIN/LOGOUT)"),
     user_email: Optional[str] = Query(None, description="Filter by user email"),
     limit: int = Query(100, ge=1, le=1000, description="Number of logs to return"),
-    skip: int = Query(0, ge=0, description="Number of logs to skip")
+    skip: int = Query(0, ge=0, description="Number of logs to skip"),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page")
 ):
     """Get audit logs (Admin and Super Admin only)"""
     query = {}
@@ -1150,11 +2191,143 @@ async def get_audit_logs(
         query["user_email"] = {"$regex": user_email, "$options": "i"}
     
     try:
-        logs = await db.audit_logs.find(query, {"_id": 0}).sort("timestamp", -1).skip(skip).limit(limit).to_list(limit)
-        return [AuditLog(**parse_from_mongo(log)) for log in logs]
+        query = apply_cursor(query, "timestamp", after, "audit_logs")
+        logs = await db.audit_logs.find(query, {"_id": 0, "pre_image": 0}).sort([("timestamp", -1), ("id", -1)]).skip(skip).limit(limit).to_list(limit)
+        return trusted_json_response(
+            shape_trusted_documents(logs, AUDIT_LOG_RESPONSE_FIELDS),
+            headers=next_cursor_headers(logs, "timestamp", limit)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching audit logs: {str(e)}")
 
+# Resource types whose documents can be rebuilt from their audit entries
+AUDITED_COLLECTIONS = {
+    "ORDER": "crane_orders",
+    "USER": "users",
+    "SERVICE_RATE": "service_rates",
+    "DRIVER_SALARY": "driver_salaries",
+}
+
+def shape_audited_document(resource_type: str, doc: Optional[Dict[str, Any]]):
+    if doc is None:
+        return None
+    doc = {key: value for key, value in doc.items() if key not in ("_id", "hashed_password")}
+    if resource_type == "ORDER":
+        return CraneOrder(**parse_order_from_mongo(doc))
+    if resource_type == "USER":
+        return User(**parse_from_mongo(doc))
+    return parse_from_mongo(doc)
+
+@api_router.get("/audit-logs/{log_id}/document")
+async def get_audit_log_document(
+    log_id: str,
+    resource_id: Optional[str] = Query(None, description="Order id, required for BULK_UPDATE entries"),
+    current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN, UserRole.ADMIN]))
+):
+    """The audited document as it was before and after one audit entry (Admin and Super Admin only).
+
+    A null before/after means the document did not exist; sides the audit trail
+    does not reach are null and listed in "unrecoverable". Sides that differ
+    depending on whether they are rebuilt from the live document or replayed
+    from the create (the document changed without an audit entry) are listed
+    in "unrecoverable" too, with the disagreeing fields under "conflicts".
+    """
+    try:
+        entry = await db.audit_logs.find_one({"id": log_id}, {"_id": 0, "old_data": 0, "pre_image": 0})
+        if not entry:
+            raise HTTPException(status_code=404, detail="Audit log not found")
+        
+        resource_type = entry["resource_type"]
+        collection_name = AUDITED_COLLECTIONS.get(resource_type)
+        if collection_name is None or entry["action"] not in HISTORY_ACTIONS:
+            raise HTTPException(status_code=400, detail="This audit entry does not change a document")
+        if entry["action"] == "BULK_UPDATE":
+            if resource_id not in (entry.get("new_data") or {}).get("order_ids", []):
+                raise HTTPException(status_code=400, detail="resource_id must be one of the orders in this bulk update")
+        else:
+            resource_id = entry["resource_id"]
+        
+        # Every entry that changed the document, replayed against its current state
+        entries = await db.audit_logs.find(
+            {
+                "resource_type": resource_type,
+                "action": {"$in": list(HISTORY_ACTIONS)},
+                "$or": [{"resource_id": resource_id}, {"new_data.order_ids": resource_id}]
+            },
+            {"_id": 0, "id": 1, "action": 1, "old_data": 1, "new_data": 1, "pre_image": 1}
+        ).sort([("timestamp", 1), ("id", 1)]).to_list(None)
+        current = await db[collection_name].find_one({"id": resource_id}, {"_id": 0})
+        if current is not None and resource_type == "ORDER":
+            expand_order(current)
+        
+        position = next(index for index, history_entry in enumerate(entries) if history_entry["id"] == log_id)
+        before, after, conflicts = document_history(entries, current, resource_id)[position]
+        if before is UNKNOWN and after is UNKNOWN:
+            raise HTTPException(status_code=404, detail="The audit trail does not reach this document")
+        
+        return {
+            "audit_log": shape_trusted_documents([entry], ("id", "user_email", "action", "resource_type", "timestamp"))[0],
+            "resource_id": resource_id,
+            "before": None if before is UNKNOWN else shape_audited_document(resource_type, before),
+            "after": None if after is UNKNOWN else shape_audited_document(resource_type, after),
+            "unrecoverable": [
+                side for side, state in (("before", before), ("after", after))
+                if state is UNKNOWN or side in conflicts
+            ],
+            "conflicts": conflicts
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error rebuilding audited document: {str(e)}")
+
+@api_router.get("/admin/indexes")
+async def get_index_report(
+    current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN]))
+):
+    """Report missing, drifted, extra and unused MongoDB indexes (Super Admin only)"""
+    try:
+        return await index_report(db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error building index report: {str(e)}")
+
+@api_router.get("/admin/metrics")
+async def get_metrics(
+    current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN]))
+):
+    """Login latency, password hashing and audit queues, and in-process cache/stream figures (Super Admin only)"""
+    in_flight = password_hash_stats["in_flight"]
+    return {
+        "uptime_seconds": round((datetime.now(timezone.utc) - APP_STARTED_AT).total_seconds(), 1),
+        "login": {
+            "succeeded": login_stats["succeeded"],
+            "failed": login_stats["failed"],
+            "latency_ms": latency_summary(login_stats["latency_ms"])
+        },
+        "password_hashing": {
+            "workers": PASSWORD_HASH_WORKERS,
+            "in_flight": in_flight,
+            "queued": max(0, in_flight - PASSWORD_HASH_WORKERS),
+            "max_in_flight": password_hash_stats["max_in_flight"],
+            "completed": password_hash_stats["completed"],
+            "wait_ms": latency_summary(password_hash_stats["wait_ms"]),
+            "run_ms": latency_summary(password_hash_stats["run_ms"])
+        },
+        "token_cache": {"tokens": len(_token_cache)},
+        "audit_writer": {
+            "running": audit_writer.running,
+            "queue_depth": audit_writer.queue_depth,
+            "queue_size": AUDIT_QUEUE_SIZE,
+            **audit_writer.stats
+        },
+        "order_stream": {
+            "subscribers": order_events.subscriber_count,
+            "change_stream": order_events.change_stream_active
+        }
+    }
+
 # Export endpoints
 @api_router.get("/export/excel")
 async def export_orders_excel(
@@ -1170,10 +2343,7 @@ async def export_orders_excel(
         query = {}
         if order_type:
             query["order_type"] = order_type
-        if customer_name:
-            query["customer_name"] = {"$regex": customer_name, "$options": "i"}
-        if phone:
-            query["phone"] = {"$regex": phone, "$options": "i"}
+        query.update(order_search_filter(customer_name, phone))
         
         # Get orders
         orders = await db.crane_orders.find(query, {"_id": 0}).limit(limit).to_list(limit)
@@ -1202,7 +2372,7 @@ async def export_orders_excel(
         
         # Data rows
         for row, order in enumerate(orders, 2):
-            parsed_order = parse_from_mongo(order)
+            parsed_order = parse_order_from_mongo(order)
             
             ws.cell(row, 1, parsed_order.get("unique_id", "")[:8])
             ws.cell(row, 2, parsed_order.get("date_time", "").strftime("%Y-%m-%d %H:%M") if parsed_order.get("date_time") else "")
@@ -1285,10 +2455,7 @@ async def export_orders_pdf(
         query = {}
         if order_type:
             query["order_type"] = order_type
-        if customer_name:
-            query["customer_name"] = {"$regex": customer_name, "$options": "i"}
-        if phone:
-            query["phone"] = {"$regex": phone, "$options": "i"}
+        query.update(order_search_filter(customer_name, phone))
         
         # Get orders
         orders = await db.crane_orders.find(query, {"_id": 0}).limit(limit).to_list(limit)
@@ -1336,7 +2503,7 @@ async def export_orders_pdf(
         data = [headers]
         
         for order in orders:
-            parsed_order = parse_from_mongo(order)
+            parsed_order = parse_order_from_mongo(order)
             row = [
                 parsed_order.get("unique_id", "")[:8],
                 parsed_order.get("date_time").strftime("%Y-%m-%d") if parsed_order.get("date_time") else "",
@@ -1441,28 +2608,31 @@ async def update_service_rate(
         # Prepare for MongoDB
         prepared_update = prepare_for_mongo(update_dict)
         
-        # Update the rate
-        result = await db.service_rates.update_one(
+        # Update the rate; the previous values come back for the audit log
+        previous_rate = await db.service_rates.find_one_and_update(
             {"id": rate_id},
-            {"$set": prepared_update}
+            {"$set": prepared_update},
+            projection={"_id": 0},
+            return_document=ReturnDocument.BEFORE
         )
         
-        if result.matched_count == 0:
+        if previous_rate is None:
             raise HTTPException(status_code=404, detail="Service rate not found")
         
         # Log audit
+        old_values, new_values = field_changes(previous_rate, prepared_update)
         await log_audit(
             user_id=current_user["id"],
             user_email=current_user["email"],
             action="UPDATE",
             resource_type="SERVICE_RATE",
             resource_id=rate_id,
-            new_data=update_dict
+            old_data=old_values,
+            new_data=new_values
         )
         
         # Return updated rate
-        updated_rate = await db.service_rates.find_one({"id": rate_id}, {"_id": 0})
-        return parse_from_mongo(updated_rate)
+        return parse_from_mongo({**previous_rate, **prepared_update})
         
     except HTTPException:
         raise
@@ -1544,7 +2714,7 @@ async def delete_service_rate(
             action="DELETE",
             resource_type="SERVICE_RATE",
             resource_id=rate_id,
-            old_data=existing_rate
+            pre_image=existing_rate
         )
         
         return {"message": "Service rate deleted successfully"}
@@ -1617,7 +2787,7 @@ async def set_driver_default_salary(
                         "default_salary": default_salary,
                         "updated_by": current_user["full_name"],
                         "updated_by_email": current_user["email"],
-                        "updated_at": datetime.now(timezone.utc).isoformat()
+                        "updated_at": datetime.now(timezone.utc)
                     }
                 }
             )
@@ -1678,7 +2848,7 @@ async def set_bulk_default_salary(
                             "default_salary": default_salary,
                             "updated_by": current_user["full_name"],
                             "updated_by_email": current_user["email"],
-                            "updated_at": datetime.now(timezone.utc).isoformat()
+                            "updated_at": datetime.now(timezone.utc)
                         }
                     }
                 )
@@ -1762,10 +2932,7 @@ async def create_driver_salary(
                         {"cash_driver_name": salary_data.get("driver_name")},
                         {"company_driver_name": salary_data.get("driver_name")}
                     ],
-                    "date_time": {
-                        "$gte": start_date.isoformat(),
-                        "$lt": end_date.isoformat()
-                    },
+                    "$and": [date_range_filter("date_time", start_date, end_date)],
                     "incentive_amount": {"$ne": None, "$gt": 0}
                 }
             },
@@ -1841,10 +3008,7 @@ async def update_driver_salary(
                         {"cash_driver_name": driver_name},
                         {"company_driver_name": driver_name}
                     ],
-                    "date_time": {
-                        "$gte": start_date.isoformat(),
-                        "$lt": end_date.isoformat()
-                    },
+                    "$and": [date_range_filter("date_time", start_date, end_date)],
                     "incentive_amount": {"$ne": None, "$gt": 0}
                 }
             },
@@ -1865,7 +3029,7 @@ async def update_driver_salary(
             "deductions": float(salary_data.get("deductions", existing.get("deductions", 0.0))),
             "notes": salary_data.get("notes", existing.get("notes")),
             "updated_by": current_user["full_name"],
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "updated_at": datetime.now(timezone.utc)
         }
         
         result = await db.driver_salaries.update_one(
@@ -1875,6 +3039,7 @@ async def update_driver_salary(
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Salary record not found")
+        old_values, new_values = field_changes(existing, update_data)
         
         # Log audit
         await log_audit(
@@ -1883,8 +3048,8 @@ async def update_driver_salary(
             action="UPDATE",
             resource_type="DRIVER_SALARY",
             resource_id=salary_id,
-            old_data=existing,
-            new_data=update_data
+            old_data=old_values,
+            new_data=new_values
         )
         
         return {"message": "Driver salary updated successfully"}
@@ -1916,7 +3081,7 @@ async def delete_driver_salary(
             action="DELETE",
             resource_type="DRIVER_SALARY",
             resource_id=salary_id,
-            old_data=existing
+            pre_image=existing
         )
         
         return {"message": "Driver salary deleted successfully"}
@@ -1946,10 +3111,7 @@ async def calculate_driver_incentives(
                 {"cash_driver_name": driver_name},
                 {"company_driver_name": driver_name}
             ],
-            "date_time": {
-                "$gte": start_date.isoformat(),
-                "$lt": end_date.isoformat()
-            },
+            "$and": [date_range_filter("date_time", start_date, end_date)],
             "incentive_amount": {"$ne": None, "$gt": 0}
         }, {"_id": 0, "unique_id": 1, "customer_name": 1, "date_time": 1, "incentive_amount": 1, "incentive_reason": 1, "order_type": 1}).to_list(length=None)
         
@@ -1984,14 +3146,11 @@ async def get_expense_report_by_driver(
         
         # Query orders for the specified month
         query = {
-            "date_time": {
-                "$gte": start_date.isoformat(),
-                "$lt": end_date.isoformat()
-            }
+            "$and": [date_range_filter("date_time", start_date, end_date)]
         }
         
         orders = await db.crane_orders.find(query, {"_id": 0}).to_list(10000)
-        parsed_orders = [parse_from_mongo(order) for order in orders]
+        parsed_orders = [parse_order_from_mongo(order) for order in orders]
         
         # Aggregate expenses by driver
         driver_expenses = {}
@@ -2068,14 +3227,11 @@ async def get_revenue_report_by_towing_vehicle(
         
         # Query orders for the specified month
         query = {
-            "date_time": {
-                "$gte": start_date.isoformat(),
-                "$lt": end_date.isoformat()
-            }
+            "$and": [date_range_filter("date_time", start_date, end_date)]
         }
         
         orders = await db.crane_orders.find(query, {"_id": 0}).to_list(10000)
-        parsed_orders = [parse_from_mongo(order) for order in orders]
+        parsed_orders = [parse_order_from_mongo(order) for order in orders]
         
         # Aggregate revenue by towing vehicle
         vehicle_revenue = {}
@@ -2154,14 +3310,11 @@ async def get_revenue_report_by_vehicle_type(
         
         # Query orders for the specified month
         query = {
-            "date_time": {
-                "$gte": start_date.isoformat(),
-                "$lt": end_date.isoformat()
-            }
+            "$and": [date_range_filter("date_time", start_date, end_date)]
         }
         
         orders = await db.crane_orders.find(query, {"_id": 0}).to_list(10000)
-        parsed_orders = [parse_from_mongo(order) for order in orders]
+        parsed_orders = [parse_order_from_mongo(order) for order in orders]
         
         # Aggregate revenue by vehicle type (service type)
         vehicle_revenue = {}
@@ -2492,17 +3645,14 @@ async def generate_custom_report(
         
         # Query orders for the date range
         query = {
-            "date_time": {
-                "$gte": start_date.isoformat(),
-                "$lte": end_date.isoformat()
-            }
+            "$and": [date_range_filter("date_time", start_date, end_date, inclusive_end=True)]
         }
         
         if order_types and len(order_types) < 2:
             query["order_type"] = {"$in": order_types}
         
         orders = await db.crane_orders.find(query, {"_id": 0}).to_list(10000)
-        parsed_orders = [parse_from_mongo(order) for order in orders]
+        parsed_orders = [parse_order_from_mongo(order) for order in orders]
         
         # Group data based on configuration
         grouped_data = {}
@@ -2745,65 +3895,56 @@ async def get_daily_summary(
         start = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
         end = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
         
-        # Query orders in date range
-        orders = await db.crane_orders.find({
-            "date_time": {
-                "$gte": start.isoformat(),
-                "$lte": end.isoformat()
-            }
-        }, {"_id": 0}).to_list(10000)
-        
-        # Group by date
-        daily_data = {}
-        
-        for order in orders:
-            date_str = order.get('date_time', '')[:10]  # Get YYYY-MM-DD
-            
-            if date_str not in daily_data:
-                daily_data[date_str] = {
-                    'date': date_str,
-                    'total_orders': 0,
-                    'cash_orders': 0,
-                    'company_orders': 0,
-                    'total_expense': 0.0,
-                    'total_revenue': 0.0,
-                    'cash_revenue': 0.0,
-                    'company_revenue': 0.0
-                }
-            
-            daily_data[date_str]['total_orders'] += 1
-            
-            if order.get('order_type') == 'cash':
-                daily_data[date_str]['cash_orders'] += 1
-                # Cash expenses (diesel, toll, etc.)
-                cash_diesel = order.get('cash_diesel', 0) or 0
-                cash_toll = order.get('cash_toll', 0) or 0
-                expense = float(cash_diesel) + float(cash_toll)
-                daily_data[date_str]['total_expense'] += expense
-                
-                # Cash revenue
-                amount = order.get('amount_received', 0) or 0
-                daily_data[date_str]['cash_revenue'] += float(amount)
-                daily_data[date_str]['total_revenue'] += float(amount)
-                
-            elif order.get('order_type') == 'company':
-                daily_data[date_str]['company_orders'] += 1
-                # Company expenses
-                company_diesel = order.get('company_diesel', 0) or 0
-                company_toll = order.get('company_toll', 0) or 0
-                expense = float(company_diesel) + float(company_toll)
-                daily_data[date_str]['total_expense'] += expense
-                
-                # Company revenue (calculated from rates if available)
-                # For now, use a placeholder calculation
-                # This can be enhanced with actual rate calculation
-                company_revenue = 0.0
-                # You can call calculate_financials here if needed
-                daily_data[date_str]['company_revenue'] += company_revenue
-                daily_data[date_str]['total_revenue'] += company_revenue
+        def number(field):
+            return {"$convert": {"input": f"${field}", "to": "double", "onError": 0.0, "onNull": 0.0}}
+        
+        is_cash = {"$eq": ["$order_type", "cash"]}
+        is_company = {"$eq": ["$order_type", "company"]}
+        order_date = "$date_time"
+        if legacy_string_dates("crane_orders"):
+            # Unmigrated ISO strings: parse the "YYYY-MM-DDTHH:MM:SS" prefix as UTC
+            order_date = {"$cond": [
+                {"$eq": [{"$type": "$date_time"}, "string"]},
+                {"$dateFromString": {"dateString": {"$substrCP": ["$date_time", 0, 19]}, "timezone": "UTC", "onError": None}},
+                "$date_time"
+            ]}
+        
+        # Bucket by UTC day in the database instead of slicing date strings
+        pipeline = [
+            {"$match": date_range_filter("date_time", start, end, inclusive_end=True)},
+            {"$group": {
+                "_id": {"$dateTrunc": {"date": order_date, "unit": "day", "timezone": "UTC"}},
+                "total_orders": {"$sum": 1},
+                "cash_orders": {"$sum": {"$cond": [is_cash, 1, 0]}},
+                "company_orders": {"$sum": {"$cond": [is_company, 1, 0]}},
+                "total_expense": {"$sum": {"$switch": {
+                    "branches": [
+                        {"case": is_cash, "then": {"$add": [number("cash_diesel"), number("cash_toll")]}},
+                        {"case": is_company, "then": {"$add": [number("company_diesel"), number("company_toll")]}}
+                    ],
+                    "default": 0.0
+                }}},
+                "cash_revenue": {"$sum": {"$cond": [is_cash, number("amount_received"), 0.0]}}
+            }},
+            {"$match": {"_id": {"$ne": None}}},
+            {"$sort": {"_id": 1}}
+        ]
         
-        # Convert to sorted list
-        summary = sorted(daily_data.values(), key=lambda x: x['date'])
+        summary = []
+        async for day in db.crane_orders.aggregate(pipeline):
+            # Company revenue (calculated from rates if available)
+            # For now, use a placeholder calculation
+            company_revenue = 0.0
+            summary.append({
+                'date': day['_id'].strftime('%Y-%m-%d'),
+                'total_orders': day['total_orders'],
+                'cash_orders': day['cash_orders'],
+                'company_orders': day['company_orders'],
+                'total_expense': day['total_expense'],
+                'total_revenue': day['cash_revenue'] + company_revenue,
+                'cash_revenue': day['cash_revenue'],
+                'company_revenue': company_revenue
+            })
         
         return {
             "summary": summary,
@@ -2838,22 +3979,18 @@ async def get_custom_column_report(
         
         # Build query
         query = {
-            "date_time": {
-                "$gte": start.isoformat(),
-                "$lte": end.isoformat()
-            }
+            "$and": [date_range_filter("date_time", start, end, inclusive_end=True)]
         }
         
         if order_type_filter != "all":
             query["order_type"] = order_type_filter
         
-        # Build projection for selected columns
-        projection = {"_id": 0, "id": 1}
-        for col in selected_columns:
-            projection[col] = 1
+        # Build projection for selected columns (plus the canonical fields compacted aliases are rebuilt from)
+        projection = order_projection(tuple(selected_columns), "id")
         
         # Fetch orders with only selected columns
         orders = await db.crane_orders.find(query, projection).to_list(10000)
+        orders = [expand_order(order) for order in orders]
         
         # Parse and format data
         formatted_orders = []
@@ -2909,22 +4046,18 @@ async def export_custom_columns_excel(
         
         # Build query
         query = {
-            "date_time": {
-                "$gte": start.isoformat(),
-                "$lte": end.isoformat()
-            }
+            "$and": [date_range_filter("date_time", start, end, inclusive_end=True)]
         }
         
         if order_type_filter != "all":
             query["order_type"] = order_type_filter
         
-        # Build projection for selected columns
-        projection = {"_id": 0, "id": 1}
-        for col in selected_columns:
-            projection[col] = 1
+        # Build projection for selected columns (plus the canonical fields compacted aliases are rebuilt from)
+        projection = order_projection(tuple(selected_columns), "id")
         
         # Fetch orders with only selected columns
         orders = await db.crane_orders.find(query, projection).to_list(10000)
+        orders = [expand_order(order) for order in orders]
         
         # Create workbook
         wb = openpyxl.Workbook()
@@ -2993,6 +4126,8 @@ async def export_custom_columns_excel(
             row = []
             for col in selected_columns:
                 value = order.get(col, "")
+                if isinstance(value, datetime):
+                    value = value.isoformat()
                 if isinstance(value, (int, float)):
                     row.append(value)
                 else:
@@ -3059,22 +4194,18 @@ async def export_custom_columns_pdf(
         
         # Build query
         query = {
-            "date_time": {
-                "$gte": start.isoformat(),
-                "$lte": end.isoformat()
-            }
+            "$and": [date_range_filter("date_time", start, end, inclusive_end=True)]
         }
         
         if order_type_filter != "all":
             query["order_type"] = order_type_filter
         
-        # Build projection for selected columns
-        projection = {"_id": 0, "id": 1}
-        for col in selected_columns:
-            projection[col] = 1
+        # Build projection for selected columns (plus the canonical fields compacted aliases are rebuilt from)
+        projection = order_projection(tuple(selected_columns), "id")
         
         # Fetch orders with only selected columns (limit to 1000 for PDF)
         orders = await db.crane_orders.find(query, projection).limit(1000).to_list(1000)
+        orders = [expand_order(order) for order in orders]
         
         # Create PDF
         buffer = io.BytesIO()
@@ -3129,6 +4260,8 @@ async def export_custom_columns_pdf(
             row = []
             for col in display_columns:
                 value = order.get(col, "")
+                if isinstance(value, datetime):
+                    value = value.isoformat()
                 if isinstance(value, (int, float)):
                     row.append(str(value))
                 else:
@@ -3260,10 +4393,7 @@ async def get_driver_report(
         
         # Get all orders in the month
         orders = await db.crane_orders.find({
-            "date_time": {
-                "$gte": start_date.isoformat(),
-                "$lt": end_date.isoformat()
-            }
+            "$and": [date_range_filter("date_time", start_date, end_date)]
         }, {"_id": 0}).to_list(length=None)
         
         # Get driver default salaries
@@ -3465,196 +4595,276 @@ async def export_driver_report(
         raise HTTPException(status_code=500, detail=f"Error exporting driver report: {str(e)}")
 
 # Data import endpoint
+async def _insert_imported_orders(orders: List[Dict[str, Any]]):
+    """Insert a converted batch, returning (inserted_count, errors)"""
+    if not orders:
+        return 0, []
+    try:
+        result = await db.crane_orders.insert_many([compact_order(order) for order in orders], ordered=False)
+        return len(result.inserted_ids), []
+    except BulkWriteError as bwe:
+        write_errors = bwe.details.get("writeErrors", [])
+        errors = [f"Order {orders[err['index']].get('unique_id')}: {err.get('errmsg')}" for err in write_errors]
+        return bwe.details.get("nInserted", 0), errors
+
+
+async def _map_row_batches(batches, worker, executor):
+    """Run worker(rows, first_row) on each row batch in executor, yielding results as they finish.
+
+    Batches are read in a thread; at most two per import worker are in flight
+    so a large file is never held in memory at once.
+    """
+    loop = asyncio.get_running_loop()
+    pending = set()
+    try:
+        while True:
+            batch = await loop.run_in_executor(None, next, batches, None)
+            if batch is None:
+                break
+            first_row, rows = batch
+            pending.add(loop.run_in_executor(executor, worker, rows, first_row))
+            if len(pending) >= IMPORT_WORKERS * 2:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for next_result in asyncio.as_completed(pending):
+            yield await next_result
+    finally:
+        batches.close()
+
+async def _import_rows_parallel(path: str):
+    """Read the file once, convert row batches in the process pool and stream them to a single writer"""
+    loop = asyncio.get_running_loop()
+    pool = get_import_process_pool()
+    headers, batches = await loop.run_in_executor(None, open_row_batches, path, IMPORT_CHUNK_ROWS)
+    logging.info(f"Import file headers: {headers}")
+    
+    imported_count = 0
+    failed_count = 0
+    errors = []
+    
+    # Batches are written as soon as any worker finishes its rows
+    async for orders, row_errors in _map_row_batches(batches, functools.partial(convert_rows, headers), pool):
+        failed_count += len(row_errors)
+        errors.extend(row_errors)
+        
+        inserted, insert_errors = await _insert_imported_orders(orders)
+        imported_count += inserted
+        failed_count += len(orders) - inserted
+        errors.extend(insert_errors)
+    
+    return imported_count, failed_count, errors
+
+
+async def _import_rows_sequential(path: str):
+    """Convert and insert rows one at a time on the event loop"""
+    rows = iter_sheet_rows(path)
+    
+    # Get headers from first row
+    headers = list(next(rows, ()))
+    
+    # Log headers for debugging
+    logging.info(f"Import file headers: {headers}")
+    
+    header_lookup = build_header_lookup(headers)
+    
+    imported_count = 0
+    failed_count = 0
+    errors = []
+    
+    # Process each row (skip header)
+    for row_idx, row in enumerate(rows, start=2):
+        try:
+            order_data = convert_row(headers, header_lookup, row)
+            
+            # Skip empty rows
+            if order_data is None:
+                continue
+            
+            # Log first few records for debugging
+            if imported_count < 3:
+                logging.info(f"Sample import row {row_idx}: order_type={order_data['order_type']}, amount={order_data.get('amount_received', 0)}")
+            
+            # Insert directly to database without Pydantic validation
+            # This allows more flexible import of data
+            await db.crane_orders.insert_one(compact_order(order_data))
+            imported_count += 1
+            
+        except Exception as row_error:
+            failed_count += 1
+            error_msg = f"Row {row_idx}: {str(row_error)}"
+            errors.append(error_msg)
+            # Log detailed error for debugging
+            logging.error(f"Import error - {error_msg}")
+            continue
+    
+    return imported_count, failed_count, errors
+
+
+def _check_company_fields(order: Dict[str, Any]) -> List[str]:
+    """Company mandatory-field check for an imported row; imports fill driver name, not details"""
+    return missing_company_fields({
+        **order,
+        "company_driver_details": order.get("company_driver_details") or order.get("company_driver_name")
+    })
+
+
+async def _find_existing_duplicates(batch: List[Dict[str, Any]]):
+    """Look up a batch of checked rows against stored orders with two $in queries"""
+    orders = [item["order"] for item in batch if item["order"] is not None]
+    unique_ids = list({order["unique_id"] for order in orders})
+    phones = list({order["phone"] for order in orders if order["phone"]})
+    date_times = list({order["date_time"] for order in orders if order["phone"]})
+    
+    existing_unique_ids = set()
+    if unique_ids:
+        async for doc in db.crane_orders.find({"unique_id": {"$in": unique_ids}}, {"_id": 0, "unique_id": 1}):
+            existing_unique_ids.add(doc["unique_id"])
+    
+    existing_phone_dates = set()
+    if phones:
+        if legacy_string_dates("crane_orders"):
+            # Unmigrated orders hold the same instant as a naive or "+00:00" ISO string
+            date_times = date_times + [dt.replace(tzinfo=None).isoformat() for dt in date_times] + [dt.isoformat() for dt in date_times]
+        cursor = db.crane_orders.find(
+            {"phone": {"$in": phones}, "date_time": {"$in": date_times}},
+            {"_id": 0, "phone": 1, "date_time": 1}
+        )
+        async for doc in cursor:
+            existing_phone_dates.add((doc.get("phone"), to_utc_datetime(doc.get("date_time"))))
+    
+    return existing_unique_ids, existing_phone_dates
+
+
+async def _dry_run_import(path: str, parallel: bool):
+    """Run conversion and validation over the whole file without writing anything.
+
+    Only conversion failures are errors: those are the rows the import
+    rejects. Date fallbacks, missing company fields and duplicates are
+    reported as warnings, because the import stores those rows as they are.
+    """
+    loop = asyncio.get_running_loop()
+    headers, batches = await loop.run_in_executor(None, open_row_batches, path, IMPORT_CHUNK_ROWS)
+    executor = get_import_process_pool() if parallel else None
+    
+    summary = {
+        "total_rows": 0,
+        "valid": 0,
+        "invalid": 0,
+        "with_warnings": 0,
+        "date_errors": 0,
+        "missing_company_fields": 0,
+        "duplicates_in_file": 0,
+        "duplicates_existing": 0
+    }
+    row_errors = []
+    row_warnings = []
+    seen_unique_ids = set()
+    seen_phone_dates = set()
+    
+    async for checked in _map_row_batches(batches, functools.partial(check_rows, headers), executor):
+        # Keep lookups batched but bounded, whatever size the worker chunk was
+        for start in range(0, len(checked), DRY_RUN_LOOKUP_BATCH):
+            batch = checked[start:start + DRY_RUN_LOOKUP_BATCH]
+            existing_unique_ids, existing_phone_dates = await _find_existing_duplicates(batch)
+            
+            for item in batch:
+                errors = item["errors"]
+                warnings = list(item["warnings"])
+                order = item["order"]
+                if item["date_invalid"]:
+                    summary["date_errors"] += 1
+                
+                if order is not None:
+                    missing_fields = _check_company_fields(order)
+                    if missing_fields:
+                        summary["missing_company_fields"] += 1
+                        warnings.append(company_fields_error(missing_fields))
+                    
+                    phone_date = (order["phone"], order["date_time"]) if order["phone"] else None
+                    if order["unique_id"] in seen_unique_ids or (phone_date and phone_date in seen_phone_dates):
+                        summary["duplicates_in_file"] += 1
+                        warnings.append("Duplicate of another row in this file")
+                    elif order["unique_id"] in existing_unique_ids or (phone_date and phone_date in existing_phone_dates):
+                        summary["duplicates_existing"] += 1
+                        warnings.append("Order already exists in the database")
+                    seen_unique_ids.add(order["unique_id"])
+                    if phone_date:
+                        seen_phone_dates.add(phone_date)
+                
+                summary["total_rows"] += 1
+                if errors:
+                    summary["invalid"] += 1
+                    row_errors.append({"row": item["row"], "errors": errors})
+                else:
+                    summary["valid"] += 1
+                if warnings:
+                    summary["with_warnings"] += 1
+                    row_warnings.append({"row": item["row"], "warnings": warnings})
+    
+    # Workers finish out of order
+    row_errors.sort(key=lambda entry: entry["row"])
+    row_warnings.sort(key=lambda entry: entry["row"])
+    return summary, row_errors, row_warnings
+
+
+def _spool_upload_to_disk(upload: UploadFile) -> str:
+    """Copy an upload to a named temp file keeping its extension, for the format readers"""
+    suffix = os.path.splitext(upload.filename)[1].lower()
+    upload.file.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        shutil.copyfileobj(upload.file, tmp)
+        return tmp.name
+
+
 @api_router.post("/import/excel")
 async def import_excel_data(
     file: UploadFile = File(...),
+    parallel: bool = Query(False, description="Convert rows in a process pool and insert in batches (for very large workbooks)"),
+    dry_run: bool = Query(False, description="Validate the file and report per-row errors and warnings without writing anything"),
     current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN, UserRole.ADMIN])),
 ):
-    """Import orders from Excel file (Admin and Super Admin only)"""
+    """Import orders from an Excel (.xlsx, .xls) or CSV file (Admin and Super Admin only)"""
     try:
         # Validate file type
-        if not file.filename.endswith(('.xlsx', '.xls')):
-            raise HTTPException(status_code=400, detail="Only Excel files (.xlsx, .xls) are supported")
-        
-        # Read the Excel file
-        contents = await file.read()
-        wb = openpyxl.load_workbook(BytesIO(contents))
-        ws = wb.active
-        
-        # Get headers from first row
-        headers = [cell.value for cell in ws[1]]
+        if not file.filename.lower().endswith(SUPPORTED_IMPORT_EXTENSIONS):
+            raise HTTPException(status_code=400, detail="Only Excel (.xlsx, .xls) and CSV (.csv) files are supported")
         
-        # Log headers for debugging
-        logging.info(f"Excel file headers: {headers}")
+        # Stream the upload to disk so the readers never hold the whole file in memory
+        path = await asyncio.get_running_loop().run_in_executor(None, _spool_upload_to_disk, file)
         
-        # Create case-insensitive header mapping
-        header_map = {}
-        for i, header in enumerate(headers):
-            if header:
-                header_map[str(header).strip().lower()] = i
-        
-        imported_count = 0
-        failed_count = 0
-        errors = []
-        
-        # Process each row (skip header)
-        for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+        if dry_run:
             try:
-                # Create a dictionary from row data
-                row_data = dict(zip(headers, row))
-                
-                # Skip empty rows
-                if not any(row_data.values()):
-                    continue
-                
-                # Helper function to safely convert values
-                def safe_str(val, default=""):
-                    if val is None or (isinstance(val, str) and val.strip().lower() in ['nan', 'nat', 'none', '']):
-                        return default
-                    return str(val).strip()
-                
-                def safe_float(val, default=0.0):
-                    if val is None or val == '':
-                        return default
-                    try:
-                        # Handle string representations of numbers with currency symbols
-                        if isinstance(val, str):
-                            val = val.replace('₹', '').replace(',', '').strip()
-                        return float(val)
-                    except (ValueError, TypeError):
-                        return default
-                
-                # Helper to get value from row_data with multiple possible column names (case-insensitive)
-                def get_value(possible_names, default=""):
-                    for name in possible_names:
-                        # Try exact match first
-                        if name in row_data and row_data[name] is not None:
-                            return row_data[name]
-                        # Try case-insensitive match
-                        for key in row_data.keys():
-                            if key and str(key).strip().lower() == name.lower():
-                                if row_data[key] is not None:
-                                    return row_data[key]
-                    return default
-                
-                # Determine order type with multiple possible column names
-                order_type_raw = get_value(["Order Type", "order_type", "Type", "OrderType", "Order_Type", "Cash / Company"])
-                order_type = safe_str(order_type_raw, "cash").lower()
-                
-                # Normalize order type
-                if order_type in ['company', 'comp', 'corporate']:
-                    order_type = "company"
-                elif 'company' in order_type:
-                    order_type = "company"
-                else:
-                    order_type = "cash"
-                
-                # Extract and parse date/time from Excel
-                date_time_raw = get_value(["Date-Time", "Date Time", "DateTime", "date_time", "Date", "Order Date"])
-                
-                # Helper function to convert Excel serial date number to datetime
-                def excel_serial_to_datetime(serial_number):
-                    """Convert Excel serial date number to Python datetime"""
-                    try:
-                        # Excel's epoch is January 1, 1900 (for Windows)
-                        # Note: Excel incorrectly treats 1900 as a leap year, so dates before March 1, 1900 are off by 1 day
-                        excel_epoch = datetime(1899, 12, 30)  # Using Dec 30, 1899 to account for Excel's quirk
-                        return excel_epoch + timedelta(days=float(serial_number))
-                    except (ValueError, TypeError, OverflowError):
-                        return None
-                
-                # Convert to ISO format string
-                if isinstance(date_time_raw, datetime):
-                    # Already a datetime object from Excel
-                    order_date_time = date_time_raw.isoformat()
-                elif isinstance(date_time_raw, (int, float)) and date_time_raw > 0:
-                    # Excel serial number (numeric value)
-                    converted_date = excel_serial_to_datetime(date_time_raw)
-                    if converted_date:
-                        order_date_time = converted_date.isoformat()
-                    else:
-                        # Conversion failed, use current time
-                        order_date_time = datetime.now(timezone.utc).isoformat()
-                elif isinstance(date_time_raw, str) and date_time_raw.strip():
-                    # String format - try to parse
-                    try:
-                        parsed_date = datetime.fromisoformat(date_time_raw.replace('Z', '+00:00'))
-                        order_date_time = parsed_date.isoformat()
-                    except:
-                        # If parsing fails, use current time
-                        order_date_time = datetime.now(timezone.utc).isoformat()
-                else:
-                    # No date provided, use current time
-                    order_date_time = datetime.now(timezone.utc).isoformat()
-                
-                # Base order data - required fields
-                order_data = {
-                    "id": str(uuid.uuid4()),
-                    "added_time": datetime.now(timezone.utc).isoformat(),
-                    "unique_id": safe_str(get_value(["Unique ID", "unique_id", "Order ID", "OrderID", "ID"]), f"IMP-{uuid.uuid4().hex[:8]}"),
-                    "date_time": order_date_time,  # Use actual date from Excel
-                    "customer_name": safe_str(get_value(["Customer Name", "customer_name", "Customer", "Name"]), "Unknown"),
-                    "phone": safe_str(get_value(["Phone", "phone", "Mobile", "Contact"]), ""),
-                    "order_type": order_type,
-                    "created_by": "system_import"
-                }
-                
-                # Add cash-specific fields
-                if order_data["order_type"] == "cash":
-                    order_data.update({
-                        "cash_trip_from": safe_str(get_value(["Trip From", "cash_trip_from", "From", "TripFrom"])),
-                        "cash_trip_to": safe_str(get_value(["Trip To", "cash_trip_to", "To", "TripTo"])),
-                        "cash_driver_name": safe_str(get_value(["Driver", "cash_driver_name", "Driver Name", "DriverName", "Cash Driver Details"])),
-                        "cash_towing_vehicle": safe_str(get_value(["Towing Vehicle", "cash_towing_vehicle", "Towing", "Vehicle", "Cash Vehicle Details"])),
-                        "cash_service_type": safe_str(get_value(["Service Type", "cash_service_type", "Service", "ServiceType", "Cash Service Type"])),
-                        "cash_vehicle_name": safe_str(get_value(["Vehicle Name", "cash_vehicle_name", "VehicleName", "Cash Vehicle Name (Make & Model)"])),
-                        "cash_vehicle_number": safe_str(get_value(["Vehicle Number", "cash_vehicle_number", "VehicleNumber", "Vehicle No", "Cash Vehicle Number"])),
-                        "amount_received": safe_float(get_value(["Amount Received", "amount_received", "Amount", "Cash Amount", "Total Amount"])),
-                        "advance_amount": safe_float(get_value(["Advance Amount", "advance_amount", "Advance", "AdvanceAmount", "Received Advance Amount"])),
-                        "cash_kms_travelled": safe_float(get_value(["KMs Travelled", "cash_kms_travelled", "KMs", "Distance", "KM", "Cash Kms Travelled"])),
-                        "cash_toll": safe_float(get_value(["Toll", "cash_toll", "Toll Amount", "Cash Toll"])),
-                        "cash_diesel": safe_float(get_value(["Diesel", "cash_diesel", "Diesel Amount", "Cash Diesel"])),
-                        "cash_diesel_refill_location": safe_str(get_value(["Diesel Location", "cash_diesel_refill_location", "Diesel Place", "Cash Diesel Re-fill Location"])),
-                    })
-                else:  # company order
-                    order_data.update({
-                        "company_name": safe_str(get_value(["Company", "company_name", "Company Name", "CompanyName"])),
-                        "case_id_file_number": safe_str(get_value(["Case ID", "case_id_file_number", "CaseID", "File Number"])),
-                        "company_trip_from": safe_str(get_value(["Trip From", "company_trip_from", "From", "TripFrom"])),
-                        "company_trip_to": safe_str(get_value(["Trip To", "company_trip_to", "To", "TripTo"])),
-                        "company_driver_name": safe_str(get_value(["Driver", "company_driver_name", "Driver Name", "DriverName", "Company Driver Details"])),
-                        "company_towing_vehicle": safe_str(get_value(["Towing Vehicle", "company_towing_vehicle", "Towing", "Vehicle", "Company Vehicle Details"])),
-                        "company_service_type": safe_str(get_value(["Service Type", "company_service_type", "Service", "ServiceType", "Company Service Type"])),
-                        "company_vehicle_name": safe_str(get_value(["Vehicle Name", "company_vehicle_name", "VehicleName", "Company Vehicle Name (Make & Model)"])),
-                        "company_vehicle_number": safe_str(get_value(["Vehicle Number", "company_vehicle_number", "VehicleNumber", "Vehicle No", "Company Vehicle Number"])),
-                        "company_kms_travelled": safe_float(get_value(["KMs Travelled", "company_kms_travelled", "KMs", "Distance", "KM", "Company Kms Travelled"])),
-                        "company_toll": safe_float(get_value(["Toll", "company_toll", "Toll Amount", "Company Toll"])),
-                        "company_diesel": safe_float(get_value(["Diesel", "company_diesel", "Diesel Amount", "Company Diesel"])),
-                        "name_of_firm": safe_str(get_value(["Firm", "name_of_firm", "Firm Name"], "Kawale Cranes")),
-                    })
-                
-                # Log first few records for debugging
-                if imported_count < 3:
-                    logging.info(f"Sample import row {row_idx}: order_type={order_data['order_type']}, amount={order_data.get('amount_received', 0)}")
-                
-                # Insert directly to database without Pydantic validation
-                # This allows more flexible import of data
-                await db.crane_orders.insert_one(order_data)
-                imported_count += 1
-                
-            except Exception as row_error:
-                failed_count += 1
-                error_msg = f"Row {row_idx}: {str(row_error)}"
-                errors.append(error_msg)
-                # Log detailed error for debugging
-                logging.error(f"Import error - {error_msg}")
-                continue
+                summary, row_errors, row_warnings = await _dry_run_import(path, parallel)
+            finally:
+                os.remove(path)
+            
+            return {
+                "message": (
+                    f"Dry run completed: {summary['valid']} valid rows, {summary['invalid']} rows with errors, "
+                    f"{summary['with_warnings']} rows with warnings"
+                ),
+                "dry_run": True,
+                **summary,
+                "row_errors": row_errors[:DRY_RUN_ROW_ERROR_LIMIT],
+                "row_errors_truncated": len(row_errors) > DRY_RUN_ROW_ERROR_LIMIT,
+                "row_warnings": row_warnings[:DRY_RUN_ROW_ERROR_LIMIT],
+                "row_warnings_truncated": len(row_warnings) > DRY_RUN_ROW_ERROR_LIMIT
+            }
+        
+        try:
+            if parallel:
+                imported_count, failed_count, errors = await _import_rows_parallel(path)
+            else:
+                imported_count, failed_count, errors = await _import_rows_sequential(path)
+        finally:
+            os.remove(path)
         
         # Save import history
         import_history = {
             "id": str(uuid.uuid4()),
             "filename": file.filename,
-            "imported_at": datetime.now(timezone.utc).isoformat(),
+            "imported_at": datetime.now(timezone.utc),
             "imported_by": current_user["email"],
             "total_records": imported_count + failed_count,
             "successful": imported_count,
@@ -3672,9 +4882,12 @@ async def import_excel_data(
             new_data={
                 "filename": file.filename,
                 "imported": imported_count,
-                "failed": failed_count
+                "failed": failed_count,
+                "parallel": parallel
             }
         )
+        if imported_count:
+            publish_order_event("refresh")
         
         result_message = f"Import completed! {imported_count} records imported successfully"
         if failed_count > 0:
@@ -3831,7 +5044,7 @@ async def create_default_super_admin():
         )
         
         admin_doc = prepare_for_mongo(default_admin.model_dump())
-        admin_doc["hashed_password"] = get_password_hash("admin123")
+        admin_doc["hashed_password"] = await hash_password("admin123")
         
         await db.users.insert_one(admin_doc)
         print("Default super admin created: admin@kawalecranes.com / admin123")
@@ -3845,6 +5058,15 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
+)
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MIN_SIZE,
+    gzip_level=GZIP_LEVEL,
+    brotli_quality=BROTLI_QUALITY,
+    zstd_level=ZSTD_LEVEL,
 )
 
 # Configure logging
@@ -3854,21 +5076,139 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("startup")
-async def startup_event():
+async def _warmup_indexes(state):
+    """Create or reconcile the indexes declared in db_indexes"""
+    state["progress"] = await ensure_indexes(db)
+
+async def _warmup_server_version(state):
+    """Fail readiness with a clear error on MongoDB servers the reports cannot run on"""
+    try:
+        version = await check_server_version(db)
+    except RuntimeError as e:
+        logger.critical(str(e))
+        raise
+    state["progress"] = {"mongodb": ".".join(str(part) for part in version)}
+
+async def _warmup_migrate_dates(state):
+    """Online migration of ISO-string dates to BSON dates; reads handle both until it finishes"""
+    await load_completed_migrations(db)
+    progress = state["progress"] = {}
+    
+    def report_progress(collection_name, processed):
+        progress[collection_name] = processed
+    
+    await migrate_string_dates(db, progress_callback=report_progress)
+
+async def _warmup_backfill_search_keys(state):
+    """Online backfill of search keys on orders written before they existed"""
+    await load_completed_migrations(db)
+    
+    def report_progress(processed):
+        state["progress"] = {"processed": processed}
+    
+    await run_migration(
+        db,
+        SEARCH_KEYS_MIGRATION,
+        "crane_orders",
+        {"search_phone": {"$exists": False}},
+        search_key_fields,
+        progress_callback=report_progress,
+        depends_on=("customer_name", "phone")
+    )
+
+async def _warmup_compact_orders(state):
+    """Online rewrite of orders stored with null padding and duplicated alias fields"""
+    await load_completed_migrations(db)
+    
+    def report_progress(processed):
+        state["progress"] = {"processed": processed}
+    
+    await run_migration(
+        db,
+        ORDER_COMPACTION_MIGRATION,
+        "crane_orders",
+        {},
+        compact_stored_order,
+        progress_callback=report_progress,
+        # Whether an alias can be dropped depends on its canonical field
+        depends_on=[*ORDER_FIELD_ALIASES, *ORDER_FIELD_ALIASES.values()]
+    )
+
+async def _sync_revocations_forever():
+    while True:
+        await asyncio.sleep(REVOCATION_SYNC_SECONDS)
+        try:
+            await sync_revocations()
+        except Exception as e:
+            logger.warning(f"Could not sync token revocations: {str(e)}")
+
+async def _warmup_token_revocations(state):
+    """Load revocations before serving authenticated requests, then keep them in sync with other processes"""
+    await sync_revocations()
+    track_background_task(_sync_revocations_forever(), name="token_revocation_sync")
+
+async def _warmup_compact_audit_logs(state):
+    """Online rewrite of audit entries that copied whole documents"""
+    await load_completed_migrations(db)
+    
+    def report_progress(processed):
+        state["progress"] = {"processed": processed}
+    
+    await run_migration(
+        db,
+        AUDIT_COMPACTION_MIGRATION,
+        "audit_logs",
+        {
+            "action": {"$in": ["UPDATE", "DELETE"] if AUDIT_DELETE_PRE_IMAGES else ["UPDATE"]},
+            "old_data.id": {"$exists": True}
+        },
+        functools.partial(compact_audit_entry, keep_pre_images=AUDIT_DELETE_PRE_IMAGES),
+        progress_callback=report_progress
+    )
+
+async def _warmup_default_admin(state):
     await create_default_super_admin()
+
+async def _warmup_service_rates(state):
     await initialize_service_rates()
+
+async def _warmup_seed_database(state):
+    """Seed database with Excel data if empty, in a worker thread"""
+    from seed_database import seed_database_if_empty
     
-    # Seed database with Excel data if empty (run in background)
-    try:
-        from seed_database import seed_database_if_empty
-        # Run seeding in a separate thread to avoid blocking startup
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor() as executor:
-            await loop.run_in_executor(executor, seed_database_if_empty)
-    except Exception as e:
-        logging.error(f"Error during database seeding: {str(e)}")
+    def report_progress(inserted, total):
+        state["progress"] = {"inserted": inserted, "total": total}
+    
+    loop = asyncio.get_running_loop()
+    # Failures raise, so readiness reports the seed as failed rather than done
+    seeded = await loop.run_in_executor(None, functools.partial(seed_database_if_empty, progress_callback=report_progress))
+    if not seeded:
+        state["progress"] = {"skipped": True}
+
+@app.on_event("startup")
+async def startup_event():
+    # Nothing here is awaited so uvicorn starts serving (and passing liveness) immediately
+    audit_writer.start()
+    start_warmup_task("server_version", _warmup_server_version)
+    start_warmup_task("indexes", _warmup_indexes)
+    start_warmup_task("default_admin", _warmup_default_admin)
+    start_warmup_task("token_revocations", _warmup_token_revocations)
+    start_warmup_task("service_rates", _warmup_service_rates)
+    start_warmup_task("seed_database", _warmup_seed_database)
+    start_warmup_task("migrate_dates", _warmup_migrate_dates, required=False)
+    start_warmup_task("backfill_search_keys", _warmup_backfill_search_keys, required=False)
+    start_warmup_task("compact_orders", _warmup_compact_orders, required=False)
+    start_warmup_task("compact_audit_logs", _warmup_compact_audit_logs, required=False)
+    track_background_task(run_change_stream(db.crane_orders, order_events, shape_order), name="order_change_stream")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    order_events.close()
+    # Flush queued audit entries while the client is still open
+    await audit_writer.close()
+    for task in list(_background_tasks):
+        task.cancel()
+    if _import_process_pool is not None:
+        _import_process_pool.shutdown(wait=False, cancel_futures=True)
+    _password_pool.shutdown(wait=False, cancel_futures=True)
     client.close()
@@ -1,4 +1,5 @@
 import os
+from datetime import datetime, timezone
 from pymongo import MongoClient
 
 # MongoDB connection
@@ -57,11 +58,12 @@ else:
 
 # Check for September 2025 data
 print("\n4. Checking September 2025 data:")
+# Dates are BSON dates; the string branch covers documents not yet migrated
 sept_2025_count = orders_collection.count_documents({
-    'date_time': {
-        '$gte': '2025-09-01T00:00:00',
-        '$lt': '2025-10-01T00:00:00'
-    }
+    '$or': [
+        {'date_time': {'$gte': datetime(2025, 9, 1, tzinfo=timezone.utc), '$lt': datetime(2025, 10, 1, tzinfo=timezone.utc)}},
+        {'date_time': {'$gte': '2025-09-01T00:00:00', '$lt': '2025-10-01T00:00:00'}}
+    ]
 })
 print(f"   Orders in September 2025: {sept_2025_count}")
 
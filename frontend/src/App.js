@@ -43,6 +43,9 @@ const getBackendURL = () => {
 const BACKEND_URL = getBackendURL();
 const API = `${BACKEND_URL}/api`;
 
+// Most ids POST /orders/bulk-delete accepts per request (the backend's BULK_ORDER_LIMIT)
+const BULK_ORDER_LIMIT = 1000;
+
 // Log the configuration for debugging (only in development)
 if (process.env.NODE_ENV === 'development' || window.location.hostname === 'localhost') {
   console.log('🔗 Backend URL Configuration:', BACKEND_URL);
@@ -65,6 +68,67 @@ const AuthProvider = ({ children }) => {
   const [token, setToken] = useState(localStorage.getItem('token'));
   const [loading, setLoading] = useState(true);
 
+  const storeTokens = (accessToken, refreshToken) => {
+    localStorage.setItem('token', accessToken);
+    if (refreshToken) {
+      localStorage.setItem('refresh_token', refreshToken);
+    }
+    axios.defaults.headers.common['Authorization'] = `Bearer ${accessToken}`;
+    setToken(accessToken);
+  };
+
+  const clearTokens = () => {
+    setUser(null);
+    setToken(null);
+    localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
+    delete axios.defaults.headers.common['Authorization'];
+  };
+
+  // Access tokens are short-lived: on a 401, trade the refresh token for a new pair and retry once
+  useEffect(() => {
+    let refreshing = null;
+
+    const refreshTokens = async (failedToken) => {
+      // Another tab may already have rotated the tokens
+      const storedToken = localStorage.getItem('token');
+      if (storedToken && storedToken !== failedToken) {
+        axios.defaults.headers.common['Authorization'] = `Bearer ${storedToken}`;
+        return storedToken;
+      }
+      const refreshToken = localStorage.getItem('refresh_token');
+      if (!refreshToken) {
+        throw new Error('No refresh token');
+      }
+      const response = await axios.post(`${API}/auth/refresh`, { refresh_token: refreshToken });
+      storeTokens(response.data.access_token, response.data.refresh_token);
+      return response.data.access_token;
+    };
+
+    const interceptor = axios.interceptors.response.use(
+      (response) => response,
+      async (error) => {
+        const original = error.config;
+        if (error.response?.status !== 401 || !original || original._retried || original.url?.endsWith('/auth/login') || original.url?.endsWith('/auth/refresh')) {
+          return Promise.reject(error);
+        }
+        original._retried = true;
+        const failedToken = (original.headers?.Authorization || '').replace('Bearer ', '');
+        try {
+          // Concurrent 401s share one refresh request
+          refreshing = refreshing || refreshTokens(failedToken).finally(() => { refreshing = null; });
+          const newToken = await refreshing;
+          original.headers.Authorization = `Bearer ${newToken}`;
+          return axios(original);
+        } catch (refreshError) {
+          clearTokens();
+          return Promise.reject(error);
+        }
+      }
+    );
+    return () => axios.interceptors.response.eject(interceptor);
+  }, []);
+
   useEffect(() => {
     const initAuth = async () => {
       if (token) {
@@ -74,9 +138,7 @@ const AuthProvider = ({ children }) => {
           setUser(response.data);
         } catch (error) {
           console.error('Auth check failed:', error);
-          localStorage.removeItem('token');
-          setToken(null);
-          delete axios.defaults.headers.common['Authorization'];
+          clearTokens();
         }
       }
       setLoading(false);
@@ -88,12 +150,10 @@ const AuthProvider = ({ children }) => {
   const login = async (email, password) => {
     try {
       const response = await axios.post(`${API}/auth/login`, { email, password });
-      const { access_token, user: userData } = response.data;
+      const { access_token, refresh_token, user: userData } = response.data;
       
-      setToken(access_token);
+      storeTokens(access_token, refresh_token);
       setUser(userData);
-      localStorage.setItem('token', access_token);
-      axios.defaults.headers.common['Authorization'] = `Bearer ${access_token}`;
       
       return { success: true };
     } catch (error) {
@@ -108,15 +168,12 @@ const AuthProvider = ({ children }) => {
   const logout = async () => {
     try {
       if (token) {
-        await axios.post(`${API}/auth/logout`);
+        await axios.post(`${API}/auth/logout`, { refresh_token: localStorage.getItem('refresh_token') });
       }
     } catch (error) {
       console.error('Logout API call failed:', error);
     } finally {
-      setUser(null);
-      setToken(null);
-      localStorage.removeItem('token');
-      delete axios.defaults.headers.common['Authorization'];
+      clearTokens();
     }
   };
 
@@ -129,7 +186,7 @@ const AuthProvider = ({ children }) => {
   };
 
   return (
-    <AuthContext.Provider value={{ user, token, loading, login, logout, hasRole }}>
+    <AuthContext.Provider value={{ user, token, loading, login, logout, hasRole, storeTokens }}>
       {children}
     </AuthContext.Provider>
   );
@@ -264,7 +321,7 @@ const ProtectedRoute = ({ children, requiredRoles }) => {
 
 // Header Component
 const Header = () => {
-  const { user, logout, hasRole } = useAuth();
+  const { user, logout, hasRole, storeTokens } = useAuth();
   const [mobileMenuOpen, setMobileMenuOpen] = useState(false);
   const navigate = useNavigate();
   const [showChangePasswordDialog, setShowChangePasswordDialog] = useState(false);
@@ -294,10 +351,12 @@ const Header = () => {
 
     setChangingPassword(true);
     try {
-      await axios.put(`${API}/auth/change-password`, {
+      const response = await axios.put(`${API}/auth/change-password`, {
         current_password: currentPassword,
         new_password: newPassword
       });
+      // Changing the password signs out every session, so continue with the new tokens
+      storeTokens(response.data.access_token, response.data.refresh_token);
       toast.success('Password changed successfully');
       setShowChangePasswordDialog(false);
       setCurrentPassword('');
@@ -817,19 +876,16 @@ const Dashboard = () => {
     }
     
     setBulkDeleting(true);
-    let deletedCount = 0;
-    let failedCount = 0;
     
+    let deletedCount = 0;
     try {
-      for (const orderId of selectedOrders) {
-        try {
-          await axios.delete(`${API}/orders/${orderId}`);
-          deletedCount++;
-        } catch (error) {
-          console.error(`Failed to delete order ${orderId}:`, error);
-          failedCount++;
-        }
+      // Large selections go in several requests
+      for (let start = 0; start < selectedOrders.length; start += BULK_ORDER_LIMIT) {
+        const ids = selectedOrders.slice(start, start + BULK_ORDER_LIMIT);
+        const response = await axios.post(`${API}/orders/bulk-delete`, { ids });
+        deletedCount += response.data.deleted;
       }
+      const failedCount = selectedOrders.length - deletedCount;
       
       if (deletedCount > 0) {
         toast.success(`Successfully deleted ${deletedCount} order(s)`);
@@ -844,7 +900,15 @@ const Dashboard = () => {
       }
     } catch (error) {
       console.error('Bulk delete error:', error);
-      toast.error('Failed to delete orders');
+      if (deletedCount > 0) {
+        // Earlier chunks went through; show what is left
+        toast.error(`Deleted ${deletedCount} order(s), then failed to delete the rest`);
+        setSelectedOrders([]);
+        fetchOrders();
+        fetchStats();
+      } else {
+        toast.error('Failed to delete orders');
+      }
     } finally {
       setBulkDeleting(false);
     }
@@ -1825,13 +1889,13 @@ const DataImport = () => {
                       Drop your Excel file here or click to browse
                     </p>
                     <p className="text-sm text-slate-500 mt-1">
-                      Supports .xlsx and .xls files
+                      Supports .xlsx, .xls and .csv files
                     </p>
                   </div>
                   
                   <input
                     type="file"
-                    accept=".xlsx,.xls"
+                    accept=".xlsx,.xls,.csv"
                     onChange={handleFileSelect}
                     className="hidden"
                     id="excel-upload"
@@ -4997,11 +5061,11 @@ const DataImportSection = () => {
   const handleDrop = (e) => {
     e.preventDefault();
     const file = e.dataTransfer.files[0];
-    if (file && (file.name.endsWith('.xlsx') || file.name.endsWith('.xls'))) {
+    if (file && (file.name.endsWith('.xlsx') || file.name.endsWith('.xls') || file.name.endsWith('.csv'))) {
       setSelectedFile(file);
       setImportStatus(null);
     } else {
-      toast.error('Please upload an Excel file (.xlsx or .xls)');
+      toast.error('Please upload an Excel or CSV file (.xlsx, .xls or .csv)');
     }
   };
 
@@ -5105,7 +5169,7 @@ const DataImportSection = () => {
                 <input
                   id="file-upload"
                   type="file"
-                  accept=".xlsx,.xls"
+                  accept=".xlsx,.xls,.csv"
                   onChange={handleFileSelect}
                   className="hidden"
                 />
@@ -0,0 +1,94 @@
+from datetime import datetime, timezone
+
+from audit_diff import (
+    UNKNOWN, compact_audit_entry, document_history, field_changes, pack_pre_image, unpack_pre_image
+)
+
+
+def test_field_changes_keeps_only_changed_fields():
+    before = {"id": "1", "customer_name": "Ram", "amount_received": 100, "phone": "98765"}
+    old, new = field_changes(before, {"customer_name": "Shyam", "amount_received": 100, "care_off": "Sita"})
+    assert old == {"customer_name": "Ram", "care_off": None}
+    assert new == {"customer_name": "Shyam", "care_off": "Sita"}
+
+
+def test_field_changes_treats_blank_and_missing_alike():
+    assert field_changes({"care_off": None}, {"care_off": "", "diesel": None}) == ({}, {})
+
+
+def test_pre_image_round_trip():
+    doc = {"_id": "mongo id", "id": "1", "customer_name": "Ram", "date_time": datetime(2024, 5, 1, 10, 30, tzinfo=timezone.utc)}
+    restored = unpack_pre_image(pack_pre_image(doc))
+    assert restored == {key: value for key, value in doc.items() if key != "_id"}
+    assert restored["date_time"].tzinfo is not None
+
+
+def _order_history():
+    return [
+        {"id": "c", "action": "CREATE", "new_data": {"id": "1", "customer_name": "Ram", "amount_received": 100}},
+        {"id": "u", "action": "UPDATE", "old_data": {"customer_name": "Ram"}, "new_data": {"customer_name": "Shyam"}},
+        {"id": "b", "action": "BULK_UPDATE", "old_data": {"1": {"amount_received": 100}, "2": {"amount_received": 80}},
+         "new_data": {"patch": {"amount_received": 250}, "order_ids": ["1", "2"]}},
+    ]
+
+
+def test_document_history_from_live_document():
+    current = {"id": "1", "customer_name": "Shyam", "amount_received": 250}
+    history = document_history(_order_history(), current, "1")
+    assert history == [
+        (None, {"id": "1", "customer_name": "Ram", "amount_received": 100}, {}),
+        ({"id": "1", "customer_name": "Ram", "amount_received": 100},
+         {"id": "1", "customer_name": "Shyam", "amount_received": 100}, {}),
+        ({"id": "1", "customer_name": "Shyam", "amount_received": 100}, current, {}),
+    ]
+
+
+def test_document_history_after_delete_uses_pre_image():
+    entries = _order_history() + [
+        {"id": "d", "action": "DELETE", "old_data": None,
+         "pre_image": pack_pre_image({"id": "1", "customer_name": "Shyam", "amount_received": 250})},
+    ]
+    history = document_history(entries, None, "1")
+    assert history[3] == ({"id": "1", "customer_name": "Shyam", "amount_received": 250}, None, {})
+    assert history[0][1] == {"id": "1", "customer_name": "Ram", "amount_received": 100}
+
+
+def test_document_history_reports_changes_missing_from_the_trail():
+    # amount_received went from 250 to 300 without an audit entry
+    current = {"id": "1", "customer_name": "Shyam", "amount_received": 300}
+    history = document_history(_order_history(), current, "1")
+    assert history[2][2] == {"after": ["amount_received"]}
+    assert history[2][1] == current
+    # A create's after is what it stored, not what walking back suggests
+    assert history[0][1] == {"id": "1", "customer_name": "Ram", "amount_received": 100}
+
+
+def test_document_history_without_create_or_pre_image():
+    entries = [{"id": "d", "action": "DELETE", "old_data": None}]
+    assert document_history(entries, None, "1") == [(UNKNOWN, None, {})]
+
+
+def test_document_history_fills_forward_past_an_unaudited_delete():
+    entries = [{"id": "c", "action": "CREATE", "new_data": {"id": "1", "customer_name": "Ram"}},
+               {"id": "u", "action": "UPDATE", "old_data": {"customer_name": "Ram"}, "new_data": {"customer_name": "Shyam"}}]
+    history = document_history(entries, None, "1")
+    assert history[1][1] == {"id": "1", "customer_name": "Shyam"}
+    assert history[1][2] == {}
+
+
+def test_compact_audit_entry_update():
+    entry = {"action": "UPDATE", "old_data": {"id": "1", "a": 1, "b": 2}, "new_data": {"a": 1, "b": 3}}
+    assert compact_audit_entry(entry) == {"old_data": {"b": 2}, "new_data": {"b": 3}}
+
+
+def test_compact_audit_entry_delete():
+    entry = {"action": "DELETE", "old_data": {"id": "1", "customer_name": "Ram"}}
+    update = compact_audit_entry(entry)
+    assert update["old_data"] is None
+    assert unpack_pre_image(update["pre_image"]) == {"id": "1", "customer_name": "Ram"}
+    assert compact_audit_entry(entry, keep_pre_images=False) == {}
+
+
+def test_compact_audit_entry_leaves_compact_entries_alone():
+    assert compact_audit_entry({"action": "UPDATE", "old_data": {"b": 2}, "new_data": {"b": 3}}) == {}
+    assert compact_audit_entry({"action": "LOGIN", "old_data": None}) == {}
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+from bson.errors import InvalidDocument
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+import audit_writer
+from audit_writer import AuditWriter
+
+
+class FakeCollection:
+    """Records insert_many calls; failures holds exceptions raised by the next calls"""
+
+    def __init__(self, failures=()):
+        self.batches = []
+        self.failures = list(failures)
+
+    async def insert_many(self, docs, ordered=True):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.batches.append(list(docs))
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(audit_writer, "RETRY_SECONDS", 0)
+
+
+def _run(collection, scenario, **options):
+    async def main():
+        writer = AuditWriter(lambda: collection, **options)
+        await scenario(writer)
+        return writer
+    return asyncio.run(main())
+
+
+def test_batches_queued_entries():
+    collection = FakeCollection()
+
+    async def scenario(writer):
+        writer.start()
+        for index in range(5):
+            await writer.write([{"id": index}])
+        await writer.close()
+
+    writer = _run(collection, scenario, batch_size=2, flush_ms=1000)
+    assert [len(batch) for batch in collection.batches] == [2, 2, 1]
+    assert writer.stats["written"] == 5
+    assert writer.stats["batches"] == 3
+
+
+def test_flushes_after_flush_ms():
+    collection = FakeCollection()
+
+    async def scenario(writer):
+        writer.start()
+        await writer.write([{"id": 1}])
+        await asyncio.sleep(0.05)
+        assert collection.batches == [[{"id": 1}]]
+        await writer.close()
+
+    _run(collection, scenario, flush_ms=10)
+
+
+def test_writes_inline_when_not_started_or_full():
+    collection = FakeCollection()
+
+    async def scenario(writer):
+        await writer.write([{"id": 1}])
+        assert collection.batches == [[{"id": 1}]]
+        writer.start()
+        await writer.write([{"id": 2}, {"id": 3}, {"id": 4}])
+        await writer.close()
+
+    writer = _run(collection, scenario, queue_size=2, flush_ms=1000)
+    assert writer.stats["overflowed"] == 1
+    assert sorted(doc["id"] for batch in collection.batches for doc in batch) == [1, 2, 3, 4]
+
+
+def test_retries_database_errors():
+    collection = FakeCollection([AutoReconnect("primary stepped down")])
+
+    async def scenario(writer):
+        await writer.write([{"id": 1}])
+
+    writer = _run(collection, scenario)
+    assert collection.batches == [[{"id": 1}]]
+    assert writer.stats["dropped"] == 0
+
+
+def test_drops_after_last_attempt():
+    collection = FakeCollection([AutoReconnect("down")] * audit_writer.WRITE_ATTEMPTS)
+
+    async def scenario(writer):
+        await writer.write([{"id": 1}, {"id": 2}])
+
+    writer = _run(collection, scenario)
+    assert writer.stats["dropped"] == 2
+    assert writer.stats["last_error"] == "down"
+
+
+def test_duplicates_from_an_earlier_attempt_count_as_written():
+    error = BulkWriteError({"writeErrors": [
+        {"index": 0, "code": audit_writer.DUPLICATE_KEY, "errmsg": "duplicate"},
+        {"index": 1, "code": 2, "errmsg": "bad value"},
+    ]})
+    collection = FakeCollection([error])
+
+    async def scenario(writer):
+        await writer.write([{"id": 1}, {"id": 2}, {"id": 3}])
+
+    writer = _run(collection, scenario)
+    assert writer.stats["written"] == 2
+    assert writer.stats["dropped"] == 1
+
+
+def test_background_task_survives_unencodable_entries():
+    collection = FakeCollection([InvalidDocument("cannot encode object")])
+
+    async def scenario(writer):
+        writer.start()
+        await writer.write([{"id": 1}])
+        await asyncio.sleep(0.05)
+        assert writer.running
+        await writer.write([{"id": 2}])
+        await writer.close()
+
+    writer = _run(collection, scenario, flush_ms=10)
+    assert writer.stats["dropped"] == 1
+    assert collection.batches == [[{"id": 2}]]
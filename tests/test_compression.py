@@ -0,0 +1,146 @@
+import asyncio
+import gzip
+
+import pytest
+
+import compression
+from compression import CompressionMiddleware, choose_encoding
+
+BODY = b'{"orders": [' + b'{"id": "1", "customer_name": "Ram"},' * 200 + b"]}"
+
+
+def _app(body, content_type=b"application/json", headers=(), chunks=1):
+    """ASGI app sending body in the given number of chunks"""
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())] + list(headers)})
+        size = -(-len(body) // chunks) if body else 0
+        parts = [body[index:index + size] for index in range(0, len(body), size)] if body else [b""]
+        for index, part in enumerate(parts):
+            await send({"type": "http.response.body", "body": part, "more_body": index < len(parts) - 1})
+    return app
+
+
+def _request(app, accept_encoding=None, **options):
+    """Run one request through the middleware; returns (headers, body, messages)"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding is not None else []
+    scope = {"type": "http", "method": "GET", "path": "/api/orders", "headers": headers}
+    asyncio.run(CompressionMiddleware(app, **options)(scope, receive, send))
+    start = messages[0]
+    assert start["type"] == "http.response.start"
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return {key.decode(): value.decode() for key, value in start["headers"]}, body, messages
+
+
+@pytest.fixture
+def gzip_only(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    monkeypatch.setattr(compression, "zstandard", None)
+
+
+def test_gzip(gzip_only):
+    headers, body, _ = _request(_app(BODY), "gzip, deflate")
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert "content-length" not in headers
+    assert gzip.decompress(body) == BODY
+
+
+def test_brotli_is_preferred_when_installed():
+    brotli = pytest.importorskip("brotli")
+    headers, body, _ = _request(_app(BODY), "gzip, br")
+    assert headers["content-encoding"] == "br"
+    assert brotli.decompress(body) == BODY
+
+
+def test_identity_without_accept_encoding():
+    headers, body, _ = _request(_app(BODY))
+    assert "content-encoding" not in headers
+    assert headers["content-length"] == str(len(BODY))
+    assert body == BODY
+
+
+@pytest.mark.parametrize("accept_encoding", ["identity", "gzip;q=0", "deflate", "*;q=0"])
+def test_identity_when_nothing_supported_is_accepted(gzip_only, accept_encoding):
+    headers, body, _ = _request(_app(BODY), accept_encoding)
+    assert "content-encoding" not in headers
+    assert body == BODY
+
+
+def test_choose_encoding_honours_q_values():
+    assert choose_encoding("gzip;q=0.5, br;q=0.9", ["br", "gzip"]) == "br"
+    assert choose_encoding("gzip;q=0.9, br;q=0.5", ["br", "gzip"]) == "gzip"
+    # Ties go to the server's preference
+    assert choose_encoding("gzip, br", ["br", "gzip"]) == "br"
+    assert choose_encoding("*", ["br", "gzip"]) == "br"
+    assert choose_encoding("*, br;q=0", ["br", "gzip"]) == "gzip"
+    assert choose_encoding("gzip;q=abc", ["gzip"]) is None
+
+
+def test_small_bodies_are_not_compressed(gzip_only):
+    small = BODY[:100]
+    headers, body, _ = _request(_app(small), "gzip", minimum_size=1024)
+    assert "content-encoding" not in headers
+    assert headers["content-length"] == str(len(small))
+    assert body == small
+
+
+def test_body_at_the_threshold_is_compressed(gzip_only):
+    headers, body, _ = _request(_app(BODY[:1024]), "gzip", minimum_size=1024)
+    assert headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body) == BODY[:1024]
+
+
+def test_streamed_body_is_compressed_as_it_arrives(gzip_only):
+    # The first chunk is under the threshold, but more body follows
+    headers, body, messages = _request(_app(BODY, chunks=20), "gzip", minimum_size=len(BODY))
+    assert headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body) == BODY
+    assert messages[-1]["more_body"] is False
+
+
+@pytest.mark.parametrize("content_type", [
+    b"text/event-stream",
+    b"application/pdf",
+    b"application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    b"image/png",
+])
+def test_skipped_content_types_pass_through(gzip_only, content_type):
+    headers, body, messages = _request(_app(BODY, content_type=content_type, chunks=3), "gzip")
+    assert "content-encoding" not in headers
+    assert "vary" not in headers
+    assert body == BODY
+    # Each event is forwarded as soon as the app sends it
+    assert len(messages) == 4
+
+
+def test_already_encoded_responses_pass_through(gzip_only):
+    encoded = gzip.compress(BODY)
+    headers, body, _ = _request(_app(encoded, headers=[(b"content-encoding", b"gzip")]), "gzip")
+    assert headers["content-encoding"] == "gzip"
+    assert body == encoded
+
+
+def test_vary_is_extended_not_replaced(gzip_only):
+    headers, _, _ = _request(_app(BODY, headers=[(b"vary", b"Origin")]), "gzip")
+    assert headers["vary"] == "Origin, Accept-Encoding"
+    headers, _, _ = _request(_app(BODY, headers=[(b"vary", b"accept-encoding")]), "gzip")
+    assert headers["vary"] == "accept-encoding"
+
+
+def test_non_http_scopes_pass_through():
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["type"])
+
+    asyncio.run(CompressionMiddleware(app)({"type": "lifespan"}, None, None))
+    assert calls == ["lifespan"]
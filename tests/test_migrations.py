@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from migrations import (
+    _snapshot_filter, _string_dates_selector, _string_dates_to_bson, _update_document,
+    check_server_version, server_version, to_utc_datetime
+)
+
+
+def test_snapshot_filter_pins_rewritten_fields():
+    doc = {"_id": 7, "date_time": "2024-05-01T10:30:00", "customer_name": "Ram"}
+    update = {"$set": {"date_time": datetime(2024, 5, 1, 10, 30, tzinfo=timezone.utc)}}
+    assert _snapshot_filter(doc, update, ()) == {"_id": 7, "date_time": "2024-05-01T10:30:00"}
+
+
+def test_snapshot_filter_pins_depends_on_and_missing_fields():
+    doc = {"_id": 7, "customer_name": "Ram"}
+    update = {"$set": {"search_name": ["ram"]}, "$unset": {"care_off": ""}}
+    assert _snapshot_filter(doc, update, ("customer_name", "phone")) == {
+        "_id": 7,
+        "customer_name": "Ram",
+        "phone": {"$exists": False},
+        "search_name": {"$exists": False},
+        "care_off": {"$exists": False},
+    }
+
+
+def test_snapshot_filter_pins_the_top_level_of_dotted_paths():
+    doc = {"_id": 7, "old_data": {"id": "1", "a": 1}}
+    update = {"$set": {"old_data.a": 2}}
+    assert _snapshot_filter(doc, update, ()) == {"_id": 7, "old_data": {"id": "1", "a": 1}}
+
+
+def test_update_document_wraps_plain_changes():
+    assert _update_document({"a": 1}) == {"$set": {"a": 1}}
+    assert _update_document({"$unset": {"a": ""}}) == {"$unset": {"a": ""}}
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-05-01T10:30:00", datetime(2024, 5, 1, 10, 30, tzinfo=timezone.utc)),
+    ("2024-05-01T10:30:00Z", datetime(2024, 5, 1, 10, 30, tzinfo=timezone.utc)),
+    ("2024-05-01T16:00:00+05:30", datetime(2024, 5, 1, 10, 30, tzinfo=timezone.utc)),
+    (" 2024-05-01 ", datetime(2024, 5, 1, tzinfo=timezone.utc)),
+    (datetime(2024, 5, 1, 10, 30), datetime(2024, 5, 1, 10, 30, tzinfo=timezone.utc)),
+    ("yesterday", None),
+])
+def test_to_utc_datetime(value, expected):
+    parsed = to_utc_datetime(value)
+    assert parsed == expected
+    if parsed is not None:
+        assert parsed.utcoffset() == timedelta(0)
+
+
+def test_string_dates_transform():
+    transform = _string_dates_to_bson(["date_time", "reach_time", "drop_time", "updated_at"])
+    already = datetime(2024, 5, 2, tzinfo=timezone.utc)
+    changes = transform({
+        "date_time": "2024-05-01T10:30:00.123000+00:00",
+        "reach_time": "   ",
+        "drop_time": "not a date",
+        "updated_at": already,
+    })
+    # Blank strings become null, unparseable text and existing dates are left alone
+    assert changes == {
+        "date_time": datetime(2024, 5, 1, 10, 30, 0, 123000, tzinfo=timezone.utc),
+        "reach_time": None,
+    }
+
+
+def test_string_dates_transform_skips_clean_documents():
+    transform = _string_dates_to_bson(["date_time"])
+    assert transform({"date_time": datetime(2024, 5, 1, tzinfo=timezone.utc)}) == {}
+    assert transform({}) == {}
+
+
+def test_string_dates_selector():
+    assert _string_dates_selector(["a", "b"]) == {"$or": [{"a": {"$type": "string"}}, {"b": {"$type": "string"}}]}
+
+
+class FakeDatabase:
+    def __init__(self, build_info):
+        self.build_info = build_info
+        self.commands = []
+
+    async def command(self, name):
+        self.commands.append(name)
+        return self.build_info
+
+
+@pytest.mark.parametrize("build_info, expected", [
+    ({"version": "7.0.12", "versionArray": [7, 0, 12, 0]}, (7, 0)),
+    ({"version": "5.0.0"}, (5, 0)),
+    ({"version": "6.1.0-rc2"}, (6, 1)),
+])
+def test_server_version(build_info, expected):
+    assert server_version(build_info) == expected
+
+
+def test_check_server_version_accepts_5_0():
+    db = FakeDatabase({"version": "5.0.3", "versionArray": [5, 0, 3, 0]})
+    assert asyncio.run(check_server_version(db)) == (5, 0)
+    assert db.commands == ["buildInfo"]
+
+
+def test_check_server_version_rejects_older_servers():
+    db = FakeDatabase({"version": "4.4.29", "versionArray": [4, 4, 29, 0]})
+    with pytest.raises(RuntimeError, match=r"MongoDB 4\.4\.29 is not supported: MongoDB 5\.0 or newer is required"):
+        asyncio.run(check_server_version(db))
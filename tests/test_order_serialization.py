@@ -0,0 +1,70 @@
+import json
+import os
+from datetime import datetime, timezone
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+
+# server.py reads these at import time; the client it creates never connects here
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+
+import server  # noqa: E402
+from order_storage import compact_order  # noqa: E402
+
+ORDERS = [
+    server.CraneOrder(
+        customer_name="Ram Kumar",
+        phone="9876543210",
+        order_type="cash",
+        date_time=datetime(2024, 5, 1, 10, 30, 15, 123000, tzinfo=timezone.utc),
+        cash_driver_name="Suresh",
+        cash_driver_details="Suresh",
+        amount_received=1500,
+    ),
+    server.CraneOrder(
+        customer_name="Shyam",
+        phone="",
+        order_type="company",
+        date_time=datetime(2024, 5, 2, tzinfo=timezone.utc),
+        company_name="Europ Assistance",
+        company_driver_name="Mahesh",
+        company_driver_details="Mahesh (night)",
+        incentive_amount=250.5,
+    ),
+]
+
+
+def _pydantic_json(orders):
+    """What GET /orders returned when it parsed full stored documents through response_model=List[CraneOrder]"""
+    adapter = TypeAdapter(List[server.CraneOrder])
+    parsed = adapter.validate_python([server.parse_from_mongo(server.prepare_for_mongo(order.model_dump())) for order in orders])
+    return adapter.dump_python(parsed, mode="json")
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_fast_path_matches_pydantic_serialization(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(server, "orjson", None)
+    elif server.orjson is None:
+        pytest.skip("orjson is not installed")
+    # Stored the way the write paths store orders now
+    docs = [compact_order(server.prepare_for_mongo(order.model_dump())) for order in ORDERS]
+    fast = json.loads(server.encode_json(server.shape_trusted_documents(docs, server.ORDER_RESPONSE_FIELDS)))
+    assert fast == _pydantic_json(ORDERS)
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_utc_datetimes_end_in_z(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(server, "orjson", None)
+    elif server.orjson is None:
+        pytest.skip("orjson is not installed")
+    encoded = json.loads(server.encode_json({"at": datetime(2024, 5, 1, 10, 30, tzinfo=timezone.utc)}))
+    assert encoded == {"at": "2024-05-01T10:30:00Z"}
+
+
+def test_order_list_documents_the_order_model():
+    response = server.app.openapi()["paths"]["/api/orders"]["get"]["responses"]["200"]
+    assert response["content"]["application/json"]["schema"]["items"] == {"$ref": "#/components/schemas/CraneOrder"}
@@ -0,0 +1,141 @@
+import itertools
+
+import pytest
+
+from order_storage import (
+    ORDER_FIELD_ALIASES, apply_set, compact_order, compact_set, compact_stored_order, compact_update, expand_order
+)
+
+_MISSING = object()
+
+
+def _evaluate(expression, doc):
+    """Evaluate the aggregation expressions compact_set() emits against one document"""
+    if isinstance(expression, str):
+        if expression == "$$REMOVE":
+            return _MISSING
+        if expression.startswith("$"):
+            return doc.get(expression[1:], _MISSING)
+        return expression
+    if isinstance(expression, dict) and len(expression) == 1:
+        operator, args = next(iter(expression.items()))
+        if operator == "$literal":
+            return args
+        if operator == "$type":
+            return "missing" if _evaluate(args, doc) is _MISSING else "value"
+        if operator == "$ifNull":
+            value = _evaluate(args[0], doc)
+            return _evaluate(args[1], doc) if value is _MISSING or value is None else value
+        if operator == "$eq":
+            left, right = (_evaluate(arg, doc) for arg in args)
+            return left == right
+        if operator == "$cond":
+            condition, then, otherwise = args
+            return _evaluate(then if _evaluate(condition, doc) else otherwise, doc)
+        raise AssertionError(f"Unexpected operator {operator}")
+    return expression
+
+
+def _apply_update(stored, update):
+    """What MongoDB stores after applying a $set document or an update pipeline"""
+    doc = dict(stored)
+    if isinstance(update, dict):
+        doc.update(update["$set"])
+        return doc
+    for stage in update:
+        # $set stages evaluate every expression against the document the stage started from
+        values = {field: _evaluate(expression, doc) for field, expression in stage["$set"].items()}
+        for field, value in values.items():
+            if value is _MISSING:
+                doc.pop(field, None)
+            else:
+                doc[field] = value
+    return doc
+
+
+def _read_back(order, fields):
+    """Fields of an order as the API returns them: aliases restored, missing fields None"""
+    expanded = expand_order(dict(order))
+    return {field: expanded.get(field) for field in fields}
+
+
+STORED_ORDERS = [
+    {"id": "1", "customer_name": "Ram"},
+    {"id": "2", "cash_driver_name": "Suresh"},
+    {"id": "3", "cash_driver_name": "Suresh", "cash_driver_details": "Suresh (night)"},
+    {"id": "4", "cash_driver_details": None, "cash_driver_name": "Suresh"},
+    {"id": "5", "company_towing_vehicle": "MH12", "company_vehicle_details": "MH14"},
+]
+
+CHANGES = [
+    {"customer_name": "Shyam"},
+    {"cash_driver_name": "Mahesh"},
+    {"cash_driver_name": None},
+    {"cash_driver_details": "Mahesh"},
+    {"cash_driver_details": None},
+    {"cash_driver_name": "Mahesh", "cash_driver_details": "Mahesh"},
+    {"company_towing_vehicle": "MH14"},
+    {"company_vehicle_details": "MH12", "amount_received": 500},
+]
+
+
+@pytest.mark.parametrize("stored,changes", list(itertools.product(STORED_ORDERS, CHANGES)))
+def test_apply_set_matches_compact_set(stored, changes):
+    written = _apply_update(stored, compact_set(changes))
+    expected = apply_set(stored, changes)
+    assert _read_back(written, set(written) | set(expected)) == _read_back(expected, set(written) | set(expected))
+
+
+def test_compact_set_is_plain_set_without_aliases():
+    assert compact_set({"customer_name": "Ram", "amount_received": 100}) == {
+        "$set": {"customer_name": "Ram", "amount_received": 100}
+    }
+
+
+def test_compact_set_drops_alias_equal_to_canonical():
+    written = _apply_update({"id": "1", "cash_driver_name": "Suresh"}, compact_set({"cash_driver_details": "Suresh"}))
+    assert "cash_driver_details" not in written
+
+
+@pytest.mark.parametrize("order", [
+    {"id": "1", "customer_name": "Ram", "phone": None, "cash_driver_name": "Suresh", "cash_driver_details": "Suresh"},
+    {"id": "2", "cash_driver_name": "Suresh", "cash_driver_details": "Mahesh"},
+    {"id": "3", "company_driver_name": None, "company_driver_details": None},
+    {"id": "4", "cash_towing_vehicle": "MH12", "cash_vehicle_details": "MH12", "amount_received": 0},
+])
+def test_compact_order_round_trips(order):
+    compact = compact_order(order)
+    assert _read_back(compact, order) == _read_back(order, order)
+
+
+def test_compact_order_omits_nulls_and_duplicate_aliases():
+    order = {"id": "1", "phone": None, "cash_driver_name": "Suresh", "cash_driver_details": "Suresh"}
+    assert compact_order(order) == {"id": "1", "cash_driver_name": "Suresh"}
+
+
+def test_compact_order_keeps_null_alias_of_set_canonical():
+    order = {"id": "1", "cash_driver_name": "Suresh", "cash_driver_details": None}
+    compact = compact_order(order)
+    assert compact == order
+    assert expand_order(dict(compact))["cash_driver_details"] is None
+
+
+def test_expand_order_restores_every_alias():
+    order = expand_order({canonical: f"value of {canonical}" for canonical in ORDER_FIELD_ALIASES.values()})
+    for alias, canonical in ORDER_FIELD_ALIASES.items():
+        assert order[alias] == order[canonical]
+
+
+def test_expand_order_passes_none_through():
+    assert expand_order(None) is None
+
+
+def test_compact_update_sets_and_unsets():
+    stored = {"_id": 1, "id": "1", "customer_name": "Ram", "phone": "98765"}
+    update = compact_update(stored, {"phone": None, "amount_received": 100})
+    assert update == {"$set": {"amount_received": 100}, "$unset": {"phone": ""}}
+
+
+def test_compact_stored_order_leaves_compact_orders_alone():
+    assert compact_stored_order({"_id": 1, "id": "1", "customer_name": "Ram"}) == {}
+    assert compact_stored_order({"_id": 1, "id": "1", "phone": None}) == {"$unset": {"phone": ""}}
@@ -0,0 +1,120 @@
+import base64
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+
+import server  # noqa: E402
+from migrations import date_migration_name  # noqa: E402
+
+
+def _raw_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def _matches(doc, query):
+    """Evaluate the subset of MongoDB filters apply_cursor builds"""
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(_matches(doc, part) for part in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(doc, part) for part in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = doc.get(key)
+            for operator, operand in condition.items():
+                if operator == "$lt" and not (type(value) is type(operand) and value < operand):
+                    return False
+                if operator == "$type" and not (operand == "string" and isinstance(value, str)):
+                    return False
+        elif doc.get(key) != condition:
+            return False
+    return True
+
+
+def _pages(docs, query, limit):
+    """Follow X-Next-Cursor through docs sorted by (date_time desc, id desc)"""
+    ordered = sorted(docs, key=lambda doc: (doc["date_time"], doc["id"]), reverse=True)
+    cursor = None
+    while True:
+        page = [doc for doc in ordered if _matches(doc, server.apply_cursor(query, "date_time", cursor, "crane_orders"))][:limit]
+        yield page
+        cursor = server.next_cursor_headers(page, "date_time", limit).get("X-Next-Cursor")
+        if cursor is None:
+            return
+
+
+@pytest.fixture
+def migrated(monkeypatch):
+    monkeypatch.setattr(server, "completed_migrations", {date_migration_name("crane_orders")})
+
+
+@pytest.mark.parametrize("sort_value", [
+    datetime(2024, 5, 1, 10, 30, 15, 123000, tzinfo=timezone.utc),
+    "2024-05-01T10:30:00",
+    42,
+    12.5,
+    None,
+])
+def test_cursor_round_trips(sort_value):
+    cursor = server.encode_cursor(sort_value, "order-1")
+    assert "=" not in cursor
+    assert server.decode_cursor(cursor) == (sort_value, "order-1")
+
+
+def test_pages_cover_equal_sort_keys_once(migrated):
+    same_time = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    docs = [{"id": f"{index:03d}", "date_time": same_time} for index in range(7)]
+    docs += [{"id": f"x{index}", "date_time": same_time - timedelta(days=index + 1)} for index in range(5)]
+    pages = list(_pages(docs, {}, 3))
+    seen = [doc["id"] for page in pages for doc in page]
+    assert sorted(seen) == sorted(doc["id"] for doc in docs)
+    assert len(seen) == len(set(seen))
+    # Ties on date_time are broken by id, descending
+    assert seen[:7] == [f"{index:03d}" for index in reversed(range(7))]
+
+
+def test_cursor_keeps_the_filter(migrated):
+    query = {"order_type": "cash"}
+    cursor = server.encode_cursor(datetime(2024, 5, 1, tzinfo=timezone.utc), "b")
+    combined = server.apply_cursor(query, "date_time", cursor, "crane_orders")
+    assert combined["$and"][0] == query
+    assert not _matches({"order_type": "company", "date_time": datetime(2024, 4, 1, tzinfo=timezone.utc), "id": "a"}, combined)
+    assert _matches({"order_type": "cash", "date_time": datetime(2024, 4, 1, tzinfo=timezone.utc), "id": "a"}, combined)
+
+
+def test_unmigrated_string_dates_come_after_a_date_cursor(monkeypatch):
+    monkeypatch.setattr(server, "completed_migrations", set())
+    cursor = server.encode_cursor(datetime(2024, 5, 1, tzinfo=timezone.utc), "b")
+    query = server.apply_cursor({}, "date_time", cursor, "crane_orders")
+    assert _matches({"date_time": "2030-01-01T00:00:00", "id": "z"}, query)
+
+
+def test_no_cursor_leaves_the_query_alone():
+    assert server.apply_cursor({"order_type": "cash"}, "date_time", None, "crane_orders") == {"order_type": "cash"}
+
+
+def test_partial_page_has_no_next_cursor():
+    assert server.next_cursor_headers([{"id": "a", "date_time": None}], "date_time", 2) == {}
+    assert server.next_cursor_headers([], "date_time", 0) == {}
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64 at all!",
+    "e30",  # {}
+    _raw_cursor(["v", "i"]),
+    _raw_cursor({"d": "yesterday", "i": "a"}),
+    _raw_cursor({"v": {"$ne": None}, "i": "a"}),
+    _raw_cursor({"v": 1, "i": {"$gt": ""}}),
+    _raw_cursor({"v": [1, 2], "i": "a"}),
+])
+def test_malformed_or_tampered_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        server.apply_cursor({}, "date_time", cursor, "crane_orders")
+    assert error.value.status_code == 400
@@ -0,0 +1,80 @@
+import re
+
+import pytest
+
+from search_keys import (
+    customer_name_search_filter, name_tokens, phone_keys, phone_search_filter, search_key_fields, with_search_keys
+)
+
+
+def _matches(condition, values):
+    return any(re.search(condition["$regex"], value) for value in values)
+
+
+def test_name_tokens_lowercase_split_and_deduplicate():
+    assert name_tokens("  Ram KUMAR-Sharma ram_2 ") == ["ram", "kumar", "sharma", "2"]
+
+
+@pytest.mark.parametrize("name", [None, "", "  ", "--"])
+def test_name_tokens_of_blank_names(name):
+    assert name_tokens(name) == []
+
+
+def test_name_tokens_keep_accented_letters():
+    assert name_tokens("José Müller") == ["josé", "müller"]
+
+
+def test_phone_keys_strip_formatting():
+    assert phone_keys("98765 43210") == ["9876543210"]
+
+
+def test_phone_keys_add_local_number_after_country_code():
+    assert phone_keys("+91 (987) 654-3210") == ["919876543210", "9876543210"]
+
+
+@pytest.mark.parametrize("phone", [None, "", "n/a"])
+def test_phone_keys_without_digits(phone):
+    assert phone_keys(phone) == []
+
+
+def test_phone_keys_accept_numbers():
+    assert phone_keys(9876543210) == ["9876543210"]
+
+
+def test_with_search_keys_copies_the_order():
+    order = {"id": "1", "customer_name": "Ram Kumar", "phone": "+919876543210"}
+    keyed = with_search_keys(order)
+    assert keyed == {**order, **search_key_fields(order)}
+    assert keyed["search_name_tokens"] == ["ram", "kumar"]
+    assert keyed["search_phone"] == ["919876543210", "9876543210"]
+    assert "search_name_tokens" not in order
+
+
+def test_customer_name_filter_single_token():
+    assert customer_name_search_filter("Ram") == {"search_name_tokens": {"$regex": "^ram"}}
+
+
+def test_customer_name_filter_requires_every_token_as_a_prefix():
+    condition = customer_name_search_filter("kum RA")
+    tokens = name_tokens("Ram Kumar")
+    assert all(_matches(part["search_name_tokens"], tokens) for part in condition["$and"])
+    assert not _matches(customer_name_search_filter("amk")["search_name_tokens"], tokens)
+
+
+def test_customer_name_filter_of_blank_search():
+    assert customer_name_search_filter(" - ") is None
+
+
+def test_phone_filter_matches_local_number_prefix():
+    condition = phone_search_filter("98765-4")["search_phone"]
+    assert condition == {"$regex": "^987654"}
+    assert _matches(condition, phone_keys("+91 98765 43210"))
+
+
+def test_phone_filter_without_digits():
+    assert phone_search_filter("abc") is None
+
+
+def test_filters_keep_regex_characters_out():
+    assert customer_name_search_filter("r.a*m")["$and"][0] == {"search_name_tokens": {"$regex": "^r"}}
+    assert phone_search_filter("+1.2*")["search_phone"]["$regex"] == "^12"